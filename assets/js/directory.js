@@ -2,23 +2,13 @@ document.addEventListener("DOMContentLoaded", function () {
   const pathPrefix = window.location.pathname.split("/").slice(0, -1).join("/");
   const searchInput = document.getElementById("searchInput");
   const clearIcon = document.getElementById("clearIcon");
-  let userData = [];
+  const userList = document.querySelector(".user-list");
+  const pagination = document.querySelector(".directory-pagination");
+  // the server-rendered page, shown again when the search is cleared
+  const initialUserList = userList.innerHTML;
   let isSessionUser = false;
-
-  function loadData() {
-    fetch(`${pathPrefix}/directory/users.json`)
-      .then((response) => {
-        if (!response.ok) {
-          throw new Error("Network response was not ok");
-        }
-        return response.json();
-      })
-      .then((data) => {
-        userData = data;
-        handleSearchInput();
-      })
-      .catch((error) => console.error("Failed to load user data:", error));
-  }
+  let searchTimeout = null;
+  let searchController = null;
 
   async function checkIfSessionUser() {
     try {
@@ -35,18 +25,21 @@ document.addEventListener("DOMContentLoaded", function () {
     }
   }
 
-  function filterUsers(query) {
-    return userData.filter((user) => {
-      const searchText =
-        `${user.primary_username} ${user.display_name} ${user.bio}`.toLowerCase();
-      return searchText.includes(query.toLowerCase());
-    });
+  function escapeHtml(text) {
+    const div = document.createElement("div");
+    div.textContent = text;
+    return div.innerHTML;
   }
 
   function highlightMatch(text, query) {
-    if (!query) return text;
-    const regex = new RegExp(`(${query})`, "gi");
-    return text.replace(regex, '<mark class="search-highlight">$1</mark>');
+    const escapedText = escapeHtml(text);
+    if (!query) return escapedText;
+    const pattern = escapeHtml(query).replace(/[.*+?^${}()|[\]\\]/g, "\\$&");
+    const regex = new RegExp(`(${pattern})`, "gi");
+    return escapedText.replace(
+      regex,
+      '<mark class="search-highlight">$1</mark>',
+    );
   }
 
   function reportUser(username, bio) {
@@ -56,87 +49,132 @@ document.addEventListener("DOMContentLoaded", function () {
     window.location.href = submissionUrl;
   }
 
-  function displayUsers(users, query) {
-    const userListContainer = document.querySelector(".user-list");
-    userListContainer.innerHTML = "";
-
-    if (users.length > 0) {
-      users.forEach((user) => {
-        const displayNameHighlighted = highlightMatch(
-          user.display_name || user.primary_username,
-          query,
-        );
-        const usernameHighlighted = highlightMatch(
-          user.primary_username,
-          query,
-        );
-        const bioHighlighted = user.bio ? highlightMatch(user.bio, query) : "";
-
-        let badgeContainer = "";
-        if (user.is_admin) {
-          badgeContainer += '<p class="badge">⚙️ Admin</p>';
-        }
-        if (user.is_verified) {
-          badgeContainer += '<p class="badge">⭐️ Verified</p>';
-        }
-
-        const userDiv = document.createElement("article");
-        userDiv.className = "user";
-        const isVerified = user.is_verified ? "Verified" : "";
-        const userType = user.is_admin
-          ? `${isVerified} admin user`
-          : `${isVerified} User`;
-        userDiv.setAttribute(
-          "aria-label",
-          `${userType}, Display name:${user.display_name || user.primary_username}, Username: ${user.primary_username}, Bio: ${user.bio || "No bio"}`,
-        );
-        userDiv.innerHTML = `
-                    <h3>${displayNameHighlighted}</h3>
-                    <p class="meta">@${usernameHighlighted}</p>
-                    <div class="badgeContainer">${badgeContainer}</div>
-                    ${bioHighlighted ? `<p class="bio">${bioHighlighted}</p>` : ""}
-                    <div class="user-actions">
-                        <a href="${pathPrefix}/to/${user.primary_username}">View Profile</a>
-                        ${isSessionUser ? `<a href="#" class="report-link" data-username="${user.primary_username}" data-display-name="${user.display_name || user.primary_username}" data-bio="${user.bio ?? "No bio"}">Report Account</a>` : ``}
-                    </div>
-                `;
-        userListContainer.appendChild(userDiv);
+  function createReportEventListeners(container) {
+    container.querySelectorAll(".report-link").forEach((link) => {
+      link.addEventListener("click", function (event) {
+        event.preventDefault();
+        const username = this.getAttribute("data-username");
+        const bio = this.getAttribute("data-bio");
+        reportUser(username, bio);
       });
+    });
+  }
 
-      createReportEventListeners(".user-list");
-    } else {
-      userListContainer.innerHTML =
+  function renderUser(user, query) {
+    let badgeContainer = "";
+    if (user.is_admin) {
+      badgeContainer += '<p class="badge">⚙️ Admin</p>';
+    }
+    if (user.is_verified) {
+      badgeContainer += '<p class="badge">⭐️ Verified</p>';
+    }
+
+    const userDiv = document.createElement("article");
+    userDiv.className = "user";
+    const isVerified = user.is_verified ? "Verified" : "";
+    const userType = user.is_admin
+      ? `${isVerified} admin user`
+      : `${isVerified} User`;
+    userDiv.setAttribute(
+      "aria-label",
+      `${userType}, Display name:${user.display_name}, Username: ${user.primary_username}, Bio: ${user.bio || "No bio"}`,
+    );
+    userDiv.innerHTML = `
+                <h3>${highlightMatch(user.display_name, query)}</h3>
+                <p class="meta">@${highlightMatch(user.primary_username, query)}</p>
+                <div class="badgeContainer">${badgeContainer}</div>
+                ${user.bio ? `<p class="bio">${highlightMatch(user.bio, query)}</p>` : ""}
+                <div class="user-actions">
+                    <a href="${pathPrefix}/to/${encodeURIComponent(user.primary_username)}">View Profile</a>
+                    ${isSessionUser ? `<a href="#" class="report-link" data-username="${escapeHtml(user.primary_username)}" data-display-name="${escapeHtml(user.display_name)}" data-bio="${escapeHtml(user.bio ?? "No bio")}">Report Account</a>` : ``}
+                </div>
+            `;
+    createReportEventListeners(userDiv);
+    return userDiv;
+  }
+
+  function displayUsers(data, query, append) {
+    if (!append) {
+      userList.innerHTML = "";
+    }
+    userList.querySelector(".load-more")?.remove();
+
+    if (!append && data.users.length === 0) {
+      userList.innerHTML =
         '<p class="empty-message"><span class="emoji-message">🫥</span><br>No users found.</p>';
+      return;
+    }
+
+    data.users.forEach((user) => {
+      userList.appendChild(renderUser(user, query));
+    });
+
+    if (data.next_url) {
+      const loadMore = document.createElement("button");
+      loadMore.type = "button";
+      loadMore.className = "btn load-more";
+      loadMore.textContent = "Load more";
+      loadMore.addEventListener("click", function () {
+        loadMore.disabled = true;
+        fetchUsers(data.next_url).then((next) => {
+          if (next) displayUsers(next, query, true);
+        });
+      });
+      userList.appendChild(loadMore);
     }
   }
 
+  async function fetchUsers(url) {
+    // only the latest search's results are shown
+    searchController?.abort();
+    searchController = new AbortController();
+    try {
+      const response = await fetch(url, { signal: searchController.signal });
+      if (!response.ok) {
+        throw new Error("Network response was not ok");
+      }
+      return await response.json();
+    } catch (error) {
+      if (error.name !== "AbortError") {
+        console.error("Failed to search users:", error);
+      }
+      return null;
+    }
+  }
+
+  function search(query) {
+    if (!query) {
+      searchController?.abort();
+      userList.innerHTML = initialUserList;
+      createReportEventListeners(userList);
+      if (pagination) pagination.hidden = false;
+      return;
+    }
+
+    if (pagination) pagination.hidden = true;
+    const params = new URLSearchParams({ q: query });
+    fetchUsers(`${pathPrefix}/directory/search.json?${params}`).then(
+      (data) => {
+        if (data) displayUsers(data, query, false);
+      },
+    );
+  }
+
   function handleSearchInput() {
     const query = searchInput.value.trim();
-    const filteredUsers = filterUsers(query);
-    displayUsers(filteredUsers, query);
     clearIcon.style.visibility = query.length ? "visible" : "hidden";
+    clearTimeout(searchTimeout);
+    searchTimeout = setTimeout(() => search(query), 250);
   }
 
   searchInput.addEventListener("input", handleSearchInput);
   clearIcon.addEventListener("click", function () {
     searchInput.value = "";
     clearIcon.style.visibility = "hidden";
-    handleSearchInput();
+    clearTimeout(searchTimeout);
+    search("");
   });
 
-  function createReportEventListeners(selector) {
-    const links = document.querySelectorAll(selector + " .report-link");
-    links.forEach((link) => {
-      link.addEventListener("click", function (event) {
-        event.preventDefault();
-        const username = this.getAttribute("data-username");
-        const bio = this.getAttribute("data-bio");
-        reportUser(username, bio);
-      });
-    });
-  }
-
-  checkIfSessionUser().then(() => {
-    loadData();
-  });
+  createReportEventListeners(userList);
+  checkIfSessionUser();
 });
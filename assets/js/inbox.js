@@ -31,3 +31,86 @@ document.addEventListener("DOMContentLoaded", function () {
     mainElement.classList.add("inbox-main");
   }
 });
+
+document.addEventListener("DOMContentLoaded", function () {
+  const loadMore = document.querySelector(".message-list .load-more");
+  if (!loadMore) {
+    return;
+  }
+
+  function renderMessage(message, showUsername) {
+    const article = document.createElement("article");
+    article.className = "message encrypted";
+    article.setAttribute("aria-label", `Message with ${message.display_name}`);
+
+    if (showUsername) {
+      const to = document.createElement("p");
+      to.textContent = `To: @${message.username}`;
+      article.appendChild(to);
+    }
+
+    const date = document.createElement("p");
+    date.textContent = message.created_at;
+    article.appendChild(date);
+
+    if (message.preview) {
+      const preview = document.createElement("p");
+      preview.className = "preview";
+      const label = document.createElement("span");
+      label.className = "label";
+      label.textContent = `${message.preview.label}:`;
+      preview.appendChild(label);
+      preview.append(
+        " ",
+        message.preview.encrypted ? "🔒 Encrypted" : message.preview.value,
+      );
+      article.appendChild(preview);
+    }
+
+    const linkParagraph = document.createElement("p");
+    const link = document.createElement("a");
+    link.className = "stretched-link";
+    link.href = message.url;
+    link.textContent = "Go to message";
+    linkParagraph.appendChild(link);
+    article.appendChild(linkParagraph);
+
+    return article;
+  }
+
+  loadMore.addEventListener("click", async function (event) {
+    // without JS the button is a plain link to the next page
+    event.preventDefault();
+    if (loadMore.getAttribute("aria-busy") === "true") {
+      return;
+    }
+    loadMore.setAttribute("aria-busy", "true");
+
+    try {
+      const response = await fetch(loadMore.dataset.jsonUrl);
+      if (!response.ok) {
+        throw new Error("Network response was not ok");
+      }
+      const data = await response.json();
+      const showUsername = loadMore.dataset.showUsername === "true";
+      for (const message of data.messages) {
+        loadMore.before(renderMessage(message, showUsername));
+      }
+
+      if (data.next_url) {
+        loadMore.dataset.jsonUrl = data.next_url;
+        const nextPage = new URL(loadMore.href, window.location.href);
+        nextPage.searchParams.set("cursor", data.next_cursor);
+        loadMore.href = nextPage.toString();
+      } else {
+        loadMore.remove();
+      }
+    } catch (error) {
+      console.error("Failed to load messages:", error);
+      // fall back to navigating to the next page
+      window.location.href = loadMore.href;
+    } finally {
+      loadMore.setAttribute("aria-busy", "false");
+    }
+  });
+});
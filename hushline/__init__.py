@@ -1,26 +1,29 @@
 import logging
 from typing import Any, Mapping, Optional, Tuple, Union
 
-from flask import Flask, render_template, request, session, url_for
+from flask import Flask, g, render_template, request, session, url_for
 from jinja2 import StrictUndefined
 from werkzeug.exceptions import HTTPException, InternalServerError
 from werkzeug.wrappers.response import Response
 
 from hushline import admin, premium, routes, settings, storage
+from hushline.auth import RequestGlobals, forget_user
+from hushline.cli_notifications import register_notifications_commands
 from hushline.cli_reg import register_reg_commands
 from hushline.cli_stripe import register_stripe_commands
-from hushline.config import AliasMode, load_config
+from hushline.cli_verification import register_verification_commands
+from hushline.config import AliasMode, SessionBackend, load_config
 from hushline.db import db, migrate
 from hushline.md import md_to_html
-from hushline.model import OrganizationSetting, User
-from hushline.secure_session import EncryptedSessionInterface
+from hushline.model import OrganizationSetting
+from hushline.secure_session import EncryptedSessionInterface, ServerSideSessionInterface
+from hushline.session_store import DatabaseSessionStore
 from hushline.storage import public_store
 from hushline.version import __version__
 
 
 def create_app(config: Optional[Mapping[str, Any]] = None) -> Flask:
     app = Flask(__name__)
-    app.session_interface = EncryptedSessionInterface()
 
     if app.config["DEBUG"] or app.config["TESTING"]:
         app.logger.setLevel(logging.DEBUG)
@@ -33,11 +36,14 @@ def create_app(config: Optional[Mapping[str, Any]] = None) -> Flask:
     # hushline specific configs
 
     app.config.from_mapping(config)
+    configure_session(app)
     configure_jinja(app)
     db.init_app(app)
     migrate.init_app(app, db)
     public_store.init_app(app)
 
+    app.app_ctx_globals_class = RequestGlobals
+    app.before_request(forget_user)
     routes.init_app(app)
     for module in [admin, settings, storage]:
         app.register_blueprint(module.create_blueprint())
@@ -100,12 +106,23 @@ def create_app(config: Optional[Mapping[str, Any]] = None) -> Flask:
     register_error_handlers(app)
 
     # Register custom CLI commands
+    register_notifications_commands(app)
     register_reg_commands(app)
     register_stripe_commands(app)
+    register_verification_commands(app)
 
     return app
 
 
+def configure_session(app: Flask) -> None:
+    if app.config.get("SESSION_BACKEND") == SessionBackend.DATABASE:
+        # unchanged sessions are extended in batches at the same rate cookies are refreshed
+        store = DatabaseSessionStore(app.config.get("SESSION_REFRESH_THRESHOLD_SECONDS", 60))
+        app.session_interface = ServerSideSessionInterface(store)
+    else:
+        app.session_interface = EncryptedSessionInterface()
+
+
 def configure_jinja(app: Flask) -> None:
     app.jinja_env.globals["hushline_version"] = __version__
     app.jinja_env.globals["AliasMode"] = AliasMode
@@ -151,7 +168,7 @@ def configure_jinja(app: Flask) -> None:
         )
 
         if "user_id" in session:
-            data["user"] = db.session.get(User, session["user_id"])
+            data["user"] = g.get("user")
 
         return data
 
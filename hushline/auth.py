@@ -1,12 +1,35 @@
 from functools import wraps
-from typing import Any, Callable
+from typing import Any, Callable, Optional
 
-from flask import abort, current_app, flash, redirect, session, url_for
+from flask import abort, current_app, flash, g, has_request_context, redirect, session, url_for
+from flask.ctx import _AppCtxGlobals
 
 from hushline.db import db
 from hushline.model import User
 
 
+class RequestGlobals(_AppCtxGlobals):
+    """
+    Flask's `g`, with the session's user (or None) loaded as `g.user` the first time it's used.
+    The auth decorators, the templates and the views all use it instead of querying for the user
+    again, and requests that never use it don't load the session.
+    """
+
+    user: Optional[User]
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "user" and has_request_context():
+            user_id = session.get("user_id")
+            self.user = None if user_id is None else db.session.get(User, user_id)
+            return self.user
+        return super().__getattr__(name)
+
+
+def forget_user() -> None:
+    """Don't reuse a user loaded by an earlier request in the same app context, e.g. in tests"""
+    g.pop("user", None)
+
+
 def authentication_required(func: Callable[..., Any]) -> Callable[..., Any]:
     @wraps(func)
     def decorated_function(*args: Any, **kwargs: Any) -> Any:
@@ -14,6 +37,11 @@ def authentication_required(func: Callable[..., Any]) -> Callable[..., Any]:
             flash("👉 Please complete authentication.")
             return redirect(url_for("login"))
 
+        if g.user is None:
+            session.clear()
+            flash("🫥 User not found. Please log in again.")
+            return redirect(url_for("login"))
+
         if not session.get("is_authenticated", False):
             return redirect(url_for("verify_2fa_login"))
 
@@ -26,8 +54,7 @@ def admin_authentication_required(func: Callable[..., Any]) -> Callable[..., Any
     @wraps(func)
     @authentication_required
     def decorated_function(*args: Any, **kwargs: Any) -> Any:
-        user = db.session.get(User, session["user_id"])
-        if not user or not user.is_admin:
+        if not g.user.is_admin:
             abort(403)
         return current_app.ensure_sync(func)(*args, **kwargs)
 
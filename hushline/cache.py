@@ -0,0 +1,89 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Generic, Hashable, Optional, Protocol, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """
+    A small thread-safe, bounded, in-process LRU cache with hit/miss counters.
+    Values are per worker process, so they must be safe to share between requests.
+
+    With a `ttl` (in seconds), entries also expire. Use one for values that can be changed by
+    another process, since invalidating them only reaches the current process's cache.
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None) -> None:
+        if maxsize < 1:
+            raise ValueError(f"maxsize must be positive: {maxsize}")
+        if ttl is not None and ttl <= 0:
+            raise ValueError(f"ttl must be positive: {ttl}")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[K, Tuple[V, Optional[float]]] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: K) -> Optional[V]:
+        with self._lock:
+            try:
+                value, expires_at = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: K, value: V) -> None:
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: K) -> Optional[V]:
+        with self._lock:
+            if (entry := self._data.pop(key, None)) is None:
+                return None
+            return entry[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._data
+
+
+class _Namespace(Protocol):
+    # e.g., an app's `extensions` or `g`
+    def get(self, name: str, default: Any = None, /) -> Any: ...
+
+    def setdefault(self, name: str, default: Any = None, /) -> Any: ...
+
+
+def lazy_cache(
+    namespace: _Namespace, name: str, maxsize: int, ttl: Optional[float] = None
+) -> LRUCache[Any, Any]:
+    """
+    Return the cache stored in `namespace` as `name`, creating it the first time it's used.
+    """
+    if (cache := namespace.get(name)) is None:
+        # if another thread got here first, use its cache
+        cache = namespace.setdefault(name, LRUCache(maxsize, ttl=ttl))
+    return cache
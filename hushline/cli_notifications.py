@@ -0,0 +1,18 @@
+import asyncio
+
+from flask import Flask
+from flask.cli import AppGroup
+
+from hushline import outbox
+
+
+def register_notifications_commands(app: Flask) -> None:
+    notifications_cli = AppGroup("notifications", help="Email notification commands")
+
+    @notifications_cli.command("start-worker")
+    def start_worker() -> None:
+        """Start the worker that sends queued email notifications"""
+        with app.app_context():
+            asyncio.run(outbox.worker(app))
+
+    app.cli.add_command(notifications_cli)
@@ -0,0 +1,18 @@
+import asyncio
+
+from flask import Flask
+from flask.cli import AppGroup
+
+from hushline import verification
+
+
+def register_verification_commands(app: Flask) -> None:
+    verification_cli = AppGroup("verification", help="Profile link verification commands")
+
+    @verification_cli.command("start-worker")
+    def start_worker() -> None:
+        """Start the worker that verifies the links in profiles"""
+        with app.app_context():
+            asyncio.run(verification.worker(app))
+
+    app.cli.add_command(verification_cli)
@@ -32,6 +32,19 @@ class AliasMode(Enum):
         raise ConfigParseError(f"Not a valid value for {cls.__name__}: {string!r}")
 
 
+@unique
+class SessionBackend(Enum):
+    COOKIE = "cookie"
+    DATABASE = "database"
+
+    @classmethod
+    def parse(cls, string: str) -> Self:
+        for var in cls:
+            if var.value == string:
+                return var
+        raise ConfigParseError(f"Not a valid value for {cls.__name__}: {string!r}")
+
+
 @unique
 class FieldsMode(Enum):
     ALWAYS = "always"
@@ -45,6 +58,19 @@ class FieldsMode(Enum):
         raise ConfigParseError(f"Not a valid value for {cls.__name__}: {string!r}")
 
 
+@unique
+class EncryptionExecutor(Enum):
+    PROCESS = "process"
+    THREAD = "thread"
+
+    @classmethod
+    def parse(cls, string: str) -> Self:
+        for var in cls:
+            if var.value == string:
+                return var
+        raise ConfigParseError(f"Not a valid value for {cls.__name__}: {string!r}")
+
+
 def load_config(env: Optional[Mapping[str, str]] = None) -> Mapping[str, Any]:
     if env is None:
         env = os.environ
@@ -75,6 +101,15 @@ def _load_flask(env: Mapping[str, str]) -> Mapping[str, Any]:
         "PERMANENT_SESSION_LIFETIME": timedelta(minutes=30),
     }
 
+    # unchanged sessions are only re-encrypted and sent again once their cookie is this old
+    threshold = if_not_none(env.get("SESSION_REFRESH_THRESHOLD_SECONDS"), int)
+    data["SESSION_REFRESH_THRESHOLD_SECONDS"] = 60 if threshold is None else threshold
+
+    if backend_str := env.get("SESSION_BACKEND"):
+        data["SESSION_BACKEND"] = SessionBackend.parse(backend_str)
+    else:
+        data["SESSION_BACKEND"] = SessionBackend.COOKIE
+
     # Handle the tips domain for profile verification
     if server_name := env.get("SERVER_NAME"):
         data["SERVER_NAME"] = server_name
@@ -123,6 +158,27 @@ def _load_smtp(env: Mapping[str, str]) -> Mapping[str, Any]:
         env.get("SMTP_FORWARDING_MESSAGE_HTML"), clean_html, allow_falsey=False
     )
 
+    # 0 closes connections after every email instead of keeping them for reuse
+    idle_timeout = if_not_none(env.get("SMTP_POOL_IDLE_TIMEOUT"), int, allow_falsey=False)
+    data["SMTP_POOL_IDLE_TIMEOUT"] = 60 if idle_timeout is None else idle_timeout
+
+    # retries of queued notifications back off exponentially from the initial delay
+    data["NOTIFICATIONS_MAX_ATTEMPTS"] = (
+        if_not_none(env.get("NOTIFICATIONS_MAX_ATTEMPTS"), int, allow_falsey=False) or 5
+    )
+    data["NOTIFICATIONS_RETRY_DELAY_SECONDS"] = (
+        if_not_none(env.get("NOTIFICATIONS_RETRY_DELAY_SECONDS"), int, allow_falsey=False) or 60
+    )
+
+    # digests are sent once the oldest notification in them is this old or they are this long
+    data["NOTIFICATIONS_DIGEST_INTERVAL_SECONDS"] = (
+        if_not_none(env.get("NOTIFICATIONS_DIGEST_INTERVAL_SECONDS"), int, allow_falsey=False)
+        or 3600
+    )
+    data["NOTIFICATIONS_DIGEST_MAX_MESSAGES"] = (
+        if_not_none(env.get("NOTIFICATIONS_DIGEST_MAX_MESSAGES"), int, allow_falsey=False) or 50
+    )
+
     return data
 
 
@@ -142,6 +198,7 @@ def _load_hushline_misc(env: Mapping[str, str]) -> Mapping[str, Any]:
     bool_configs = [
         ("DIRECTORY_VERIFIED_TAB_ENABLED", True),
         ("FILE_UPLOADS_ENABLED", False),
+        ("INBOX_PREVIEWS_ENABLED", False),
         ("REGISTRATION_SETTINGS_ENABLED", True),
         ("USER_VERIFICATION_ENABLED", False),
     ]
@@ -161,6 +218,31 @@ def _load_hushline_misc(env: Mapping[str, str]) -> Mapping[str, Any]:
     else:
         data["FIELDS_MODE"] = FieldsMode.ALWAYS
 
+    data["INBOX_PAGE_SIZE"] = if_not_none(env.get("INBOX_PAGE_SIZE"), int, allow_falsey=False) or 50
+    data["DIRECTORY_PAGE_SIZE"] = (
+        if_not_none(env.get("DIRECTORY_PAGE_SIZE"), int, allow_falsey=False) or 100
+    )
+
+    # 0 disables the pool and encrypts submissions inline in the request
+    data["PGP_ENCRYPTION_WORKERS"] = (
+        if_not_none(env.get("PGP_ENCRYPTION_WORKERS"), int, allow_falsey=False) or 0
+    )
+    if executor_str := env.get("PGP_ENCRYPTION_EXECUTOR"):
+        data["PGP_ENCRYPTION_EXECUTOR"] = EncryptionExecutor.parse(executor_str)
+    else:
+        data["PGP_ENCRYPTION_EXECUTOR"] = EncryptionExecutor.PROCESS
+
+    # outbound requests, e.g. verifying profile links and looking up Proton Mail keys
+    data["OUTBOUND_HTTP_TIMEOUT_SECONDS"] = (
+        if_not_none(env.get("OUTBOUND_HTTP_TIMEOUT_SECONDS"), int, allow_falsey=False) or 5
+    )
+    data["OUTBOUND_HTTP_MAX_CONNECTIONS"] = (
+        if_not_none(env.get("OUTBOUND_HTTP_MAX_CONNECTIONS"), int, allow_falsey=False) or 100
+    )
+    data["OUTBOUND_HTTP_MAX_CONNECTIONS_PER_HOST"] = (
+        if_not_none(env.get("OUTBOUND_HTTP_MAX_CONNECTIONS_PER_HOST"), int, allow_falsey=False) or 4
+    )
+
     return data
 
 
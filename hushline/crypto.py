@@ -1,13 +1,21 @@
+import hashlib
 import os
 import secrets
 from base64 import urlsafe_b64decode, urlsafe_b64encode
+from concurrent.futures import BrokenExecutor, Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache, partial
 from pathlib import Path
+from threading import Lock
+from typing import Callable, Sequence
 
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
 from flask import current_app
 from pysequoia import Cert, encrypt
 
+from hushline.cache import LRUCache
+from hushline.config import EncryptionExecutor
+
 with open(Path(__file__).parent / "files" / "diceware.txt") as f:
     DICEWARE_WORDS = [x.strip() for x in f]
 
@@ -27,10 +35,50 @@ def generate_salt() -> str:
     return urlsafe_b64encode(os.urandom(32)).decode()
 
 
+# Upper bound on the number of (scope, salt) derived keys held in memory per worker.
+DERIVED_KEY_CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=4)
+def _default_key(encryption_key: str) -> Fernet:
+    return Fernet(encryption_key)
+
+
+@lru_cache(maxsize=DERIVED_KEY_CACHE_SIZE)
+def _derived_key(encryption_key: str, scope: bytes, salt: str) -> Fernet:
+    # Convert the encryption key and salt to bytes
+    encryption_key_bytes = urlsafe_b64decode(encryption_key)
+    salt_bytes = urlsafe_b64decode(salt)
+
+    # Use Scrypt to derive a unique encryption key based on the scope
+    kdf = Scrypt(salt=salt_bytes, length=SCRYPT_LENGTH, **_SCRYPT_PARAMS)
+
+    # Concatenate the encryption key with the scope
+    items = (encryption_key_bytes, scope)
+    result = len(items).to_bytes(8, "big")
+    result += b"".join(len(item).to_bytes(8, "big") + item for item in items)
+
+    # Derive the new key
+    new_encryption_key_bytes = kdf.derive(result)
+    return Fernet(urlsafe_b64encode(new_encryption_key_bytes).decode())
+
+
+def clear_encryption_key_cache() -> None:
+    """
+    Drop all cached Fernet keys. Call this after rotating ENCRYPTION_KEY or changing the Scrypt
+    parameters so that no stale keys are used.
+    """
+    _default_key.cache_clear()
+    _derived_key.cache_clear()
+
+
 def get_encryption_key(scope: bytes | str | None = None, salt: str | None = None) -> Fernet:
     """
     Return the default Fernet encryption key. If a scope and salt are provided, a unique encryption
     key will be derived based on the scope and salt.
+
+    Keys are cached per worker (derived keys in a bounded LRU keyed by scope and salt) so the
+    Scrypt derivation only runs the first time a scope is used.
     """
     if not (encryption_key := os.environ.get("ENCRYPTION_KEY", None)):
         raise ValueError("Encryption key not found via env var ENCRYPTION_KEY")
@@ -39,27 +87,10 @@ def get_encryption_key(scope: bytes | str | None = None, salt: str | None = None
     if scope is not None and salt is not None:
         # Convert the scope to bytes if it is a string
         if isinstance(scope, str):
-            scope_bytes = scope.encode()
-        elif isinstance(scope, bytes):
-            scope_bytes = scope
-
-        # Convert the encryption key and salt to bytes
-        encryption_key_bytes = urlsafe_b64decode(encryption_key)
-        salt_bytes = urlsafe_b64decode(salt)
+            scope = scope.encode()
+        return _derived_key(encryption_key, scope, salt)
 
-        # Use Scrypt to derive a unique encryption key based on the scope
-        kdf = Scrypt(salt=salt_bytes, length=SCRYPT_LENGTH, **_SCRYPT_PARAMS)
-
-        # Concatenate the encryption key with the scope
-        items = (encryption_key_bytes, scope_bytes)
-        result = len(items).to_bytes(8, "big")
-        result += b"".join(len(item).to_bytes(8, "big") + item for item in items)
-
-        # Derive the new key
-        new_encryption_key_bytes = kdf.derive(result)
-        encryption_key = urlsafe_b64encode(new_encryption_key_bytes).decode()
-
-    return Fernet(encryption_key)
+    return _default_key(encryption_key)
 
 
 def encrypt_field(
@@ -98,11 +129,39 @@ def decrypt_field(
     return fernet.decrypt(data.encode()).decode()
 
 
+# Parsed PGP certificates keyed by a digest of the armored key text
+PGP_CERT_CACHE_SIZE = 256
+_cert_cache: LRUCache[bytes, Cert] = LRUCache(PGP_CERT_CACHE_SIZE)
+
+
+def _cert_digest(key: str) -> bytes:
+    return hashlib.sha256(key.encode()).digest()
+
+
+def load_cert(key: str) -> Cert:
+    """
+    Parse a PGP certificate, reusing a previously parsed certificate for the same key text.
+    Raises if the key can't be parsed. Failures are not cached.
+    """
+    digest = _cert_digest(key)
+    if (cert := _cert_cache.get(digest)) is None:
+        cert = Cert.from_bytes(key.encode())
+        _cert_cache.set(digest, cert)
+    return cert
+
+
+def forget_cert(key: str) -> None:
+    """
+    Remove a key's parsed certificate from the cache (e.g., when a user replaces their key).
+    """
+    _cert_cache.pop(_cert_digest(key))
+
+
 def is_valid_pgp_key(key: str) -> bool:
     current_app.logger.debug(f"Attempting to validate key: {key}")
     try:
         # Attempt to load the PGP key to verify its validity
-        Cert.from_bytes(key.encode())
+        load_cert(key)
         return True
     except Exception as e:
         current_app.logger.error(f"Error validating PGP key: {e}")
@@ -110,20 +169,78 @@ def is_valid_pgp_key(key: str) -> bool:
 
 
 def encrypt_message(message: str, user_pgp_key: str) -> str | None:
+    return encrypt_messages([message], user_pgp_key)[0]
+
+
+def _encrypt(message: str, user_pgp_key: str) -> str:
+    # This also runs in executor worker processes, each of which keeps its own certificate cache.
+    # Assuming there is no signer (i.e., unsigned encryption).
+    return encrypt([load_cert(user_pgp_key)], message.encode("utf-8")).decode()
+
+
+_executor_lock = Lock()
+
+
+def get_encryption_executor() -> Executor | None:
+    """
+    Return this app's pool for PGP encryption, creating it on first use so that it is never
+    created before the server forks its workers. Returns None if the pool is disabled.
+    """
+    if not (workers := current_app.config.get("PGP_ENCRYPTION_WORKERS")):
+        return None
+
+    with _executor_lock:
+        if (executor := current_app.extensions.get("pgp_encryption_executor")) is None:
+            if current_app.config["PGP_ENCRYPTION_EXECUTOR"] == EncryptionExecutor.THREAD:
+                executor = ThreadPoolExecutor(workers, thread_name_prefix="pgp-encryption")
+            else:
+                executor = ProcessPoolExecutor(workers)
+            current_app.extensions["pgp_encryption_executor"] = executor
+        return executor
+
+
+def shutdown_encryption_executor() -> None:
+    with _executor_lock:
+        if executor := current_app.extensions.pop("pgp_encryption_executor", None):
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def encrypt_messages(messages: Sequence[str], user_pgp_key: str) -> list[str | None]:
+    """
+    Encrypt several messages to the same recipient, loading their certificate only once.
+    If there is more than one message and PGP_ENCRYPTION_WORKERS is set, the messages are
+    encrypted in parallel on the encryption pool. Each message that fails to encrypt is returned
+    as None.
+    """
     current_app.logger.info("Encrypting message for user with provided PGP key")
     try:
         # Load the user's PGP certificate (public key) from the key data
-        recipient_cert = Cert.from_bytes(user_pgp_key.encode())
-
-        # Encode the message string to bytes
-        message_bytes = message.encode("utf-8")
-
-        # Assuming there is no signer (i.e., unsigned encryption).
-        # Adjust the call to encrypt by passing the encoded message
-        return encrypt([recipient_cert], message_bytes)  # Use message_bytes
+        load_cert(user_pgp_key)
     except Exception as e:
         current_app.logger.error(f"Error during encryption: {e}")
-        return None
+        return [None] * len(messages)
+
+    calls: list[Callable[[], str]] = [partial(_encrypt, m, user_pgp_key) for m in messages]
+    if len(messages) > 1 and (executor := get_encryption_executor()):
+        try:
+            calls = [executor.submit(_encrypt, m, user_pgp_key).result for m in messages]
+        except (BrokenExecutor, RuntimeError) as e:
+            current_app.logger.warning(f"Encryption pool unavailable, encrypting inline: {e}")
+            shutdown_encryption_executor()
+
+    results: list[str | None] = []
+    for message, call in zip(messages, calls):
+        try:
+            try:
+                results.append(call())
+            except BrokenExecutor as e:
+                current_app.logger.warning(f"Encryption pool failed, encrypting inline: {e}")
+                shutdown_encryption_executor()
+                results.append(_encrypt(message, user_pgp_key))
+        except Exception as e:
+            current_app.logger.error(f"Error during encryption: {e}")
+            results.append(None)
+    return results
 
 
 def gen_reply_slug() -> str:
@@ -0,0 +1,171 @@
+import hashlib
+import json
+from dataclasses import asdict, dataclass
+from typing import Any, Optional, Sequence, Tuple
+
+from flask import current_app, has_app_context
+from sqlalchemy import Select, event, inspect
+from sqlalchemy.orm import Session, UOWTransaction
+
+from hushline.cache import LRUCache, lazy_cache
+from hushline.db import db
+from hushline.model import User, Username
+
+# The directory is the same for every visitor, so it's built once, JSON included, and shared. It's
+# dropped when a change to a listed profile is committed, and the TTL bounds how long other worker
+# processes can show an old one.
+DIRECTORY_CACHE_TTL = 60
+_SNAPSHOT = "snapshot"
+# set on a session that has changed the directory but isn't committed yet
+_SESSION_CHANGED = "directory_changed"
+
+# the columns that change what the directory shows
+_USERNAME_ATTRIBUTES = ("_username", "_display_name", "bio", "is_verified", "show_in_directory")
+_USER_ATTRIBUTES = ("is_admin",)
+
+# username, display name, bio, is admin, is verified
+_EntryRow = Tuple[str, Optional[str], Optional[str], bool, bool]
+
+
+@dataclass(frozen=True)
+class DirectoryEntry:
+    primary_username: str
+    display_name: str
+    bio: Optional[str]
+    is_admin: bool
+    is_verified: bool
+
+
+@dataclass(frozen=True)
+class DirectorySnapshot:
+    entries: Sequence[DirectoryEntry]
+    json: bytes
+    etag: str
+
+
+def _directory_cache() -> LRUCache[str, DirectorySnapshot]:
+    return lazy_cache(current_app.extensions, "directory_cache", 1, ttl=DIRECTORY_CACHE_TTL)
+
+
+def _changes_directory(obj: Any) -> bool:
+    attributes: Tuple[str, ...]
+    if isinstance(obj, Username):
+        attributes = _USERNAME_ATTRIBUTES
+    elif isinstance(obj, User):
+        attributes = _USER_ATTRIBUTES
+    else:
+        return False
+    state = inspect(obj)
+    return any(state.attrs[x].history.has_changes() for x in attributes)
+
+
+@event.listens_for(Session, "before_flush")
+def _check_flush(session: Session, flush_context: UOWTransaction, instances: Any) -> None:
+    if session.info.get(_SESSION_CHANGED):
+        return
+    if any(isinstance(x, (User, Username)) for x in [*session.new, *session.deleted]) or any(
+        _changes_directory(x) for x in session.dirty
+    ):
+        session.info[_SESSION_CHANGED] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _drop_snapshot_after_commit(session: Session) -> None:
+    if session.info.pop(_SESSION_CHANGED, False) and has_app_context():
+        _directory_cache().pop(_SNAPSHOT)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changes_after_rollback(session: Session) -> None:
+    session.info.pop(_SESSION_CHANGED, None)
+
+
+def invalidate_cache() -> None:
+    """
+    Drop the cached directory. Call this after changing usernames with bulk statements, which
+    aren't seen by the session's flush.
+    """
+    db.session.info[_SESSION_CHANGED] = True
+    _directory_cache().pop(_SNAPSHOT)
+
+
+def _entries_query() -> Select[_EntryRow]:
+    return (
+        db.select(
+            Username._username,
+            Username._display_name,
+            Username.bio,
+            User.is_admin,
+            Username.is_verified,
+        )
+        .join(User)
+        .filter(Username.show_in_directory)
+        .order_by(
+            User.is_admin.desc(),
+            db.func.coalesce(Username._display_name, Username._username),
+            Username.id,
+        )
+    )
+
+
+def _entries(
+    query: Select[_EntryRow],
+) -> list[DirectoryEntry]:
+    return [
+        DirectoryEntry(
+            primary_username=username,
+            display_name=display_name or username,
+            bio=bio,
+            is_admin=is_admin,
+            is_verified=is_verified,
+        )
+        for username, display_name, bio, is_admin, is_verified in db.session.execute(query)
+    ]
+
+
+def build_snapshot() -> DirectorySnapshot:
+    entries = _entries(_entries_query())
+    data = json.dumps([asdict(x) for x in entries], separators=(",", ":")).encode()
+    # derived from the content so that every worker process agrees on it
+    return DirectorySnapshot(entries, data, hashlib.sha256(data).hexdigest())
+
+
+def get_snapshot() -> DirectorySnapshot:
+    """
+    The users listed in the directory, admins first. Cached, see `DIRECTORY_CACHE_TTL`.
+    """
+    # don't cache this session's uncommitted changes
+    if db.session.info.get(_SESSION_CHANGED):
+        return build_snapshot()
+
+    cache = _directory_cache()
+    if (snapshot := cache.get(_SNAPSHOT)) is None:
+        snapshot = build_snapshot()
+        cache.set(_SNAPSHOT, snapshot)
+    return snapshot
+
+
+def search(
+    query: str, verified_only: bool, offset: int, limit: int
+) -> Tuple[Sequence[DirectoryEntry], bool]:
+    """
+    Return up to `limit` listed users matching `query`, in directory order, and whether there are
+    more. Matches are case-insensitive substrings of the username, display name or bio.
+    """
+    if not query:
+        entries: Sequence[DirectoryEntry] = get_snapshot().entries
+        if verified_only:
+            entries = [x for x in entries if x.is_verified]
+        return entries[offset : offset + limit], len(entries) > offset + limit
+
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    statement = (
+        _entries_query()
+        .filter(Username.directory_search_text().ilike(f"%{escaped}%", escape="\\"))
+        .offset(offset)
+        .limit(limit + 1)
+    )
+    if verified_only:
+        statement = statement.filter(Username.is_verified)
+    entries = _entries(statement)
+    return entries[:limit], len(entries) > limit
@@ -1,9 +1,13 @@
+import hashlib
 import smtplib
+import time
 from contextlib import contextmanager
 from dataclasses import dataclass
+from email.message import Message
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-from typing import Generator
+from threading import Lock
+from typing import Generator, Tuple
 
 from flask import current_app
 
@@ -18,13 +22,30 @@ class SMTPConfig:
     password: str
     sender: str
 
+    encryption = SMTPEncryption.default()
+
     def validate(self) -> bool:
         return all([self.username, self.server, self.port, self.password, self.sender])
 
+    @property
+    def pool_key(self) -> Tuple[str, int, str, str, str]:
+        """
+        Key of the connections that can be shared by this config. The password is part of it so
+        that a session is never handed to a config that couldn't have opened it itself.
+        """
+        password_digest = hashlib.sha256(self.password.encode()).hexdigest()
+        return (self.server, self.port, self.username, self.encryption.value, password_digest)
+
     @contextmanager
     def smtp_login(self, timeout: int = 1) -> Generator[smtplib.SMTP, None, None]:
         raise NotImplementedError
 
+    def connect(self, timeout: int = 1) -> smtplib.SMTP:
+        """
+        Open and log in to a connection that the caller is responsible for closing
+        """
+        raise NotImplementedError
+
 
 def create_smtp_config(  # noqa PLR0913
     username: str, server: str, port: int, password: str, sender: str, *, encryption: SMTPEncryption
@@ -39,14 +60,27 @@ def create_smtp_config(  # noqa PLR0913
 
 
 class SSL_SMTPConfig(SMTPConfig):
+    encryption = SMTPEncryption.SSL
+
     @contextmanager
     def smtp_login(self, timeout: int = 1) -> Generator[smtplib.SMTP, None, None]:
         with smtplib.SMTP_SSL(self.server, self.port, timeout=timeout) as server:
             server.login(self.username, self.password)
             yield server
 
+    def connect(self, timeout: int = 1) -> smtplib.SMTP:
+        server = smtplib.SMTP_SSL(self.server, self.port, timeout=timeout)
+        try:
+            server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        return server
+
 
 class StartTLS_SMTPConfig(SMTPConfig):
+    encryption = SMTPEncryption.StartTLS
+
     @contextmanager
     def smtp_login(self, timeout: int = 1) -> Generator[smtplib.SMTP, None, None]:
         with smtplib.SMTP(self.server, self.port, timeout=timeout) as server:
@@ -54,6 +88,126 @@ class StartTLS_SMTPConfig(SMTPConfig):
             server.login(self.username, self.password)
             yield server
 
+    def connect(self, timeout: int = 1) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.server, self.port, timeout=timeout)
+        try:
+            server.starttls()
+            server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        return server
+
+
+def _close(server: smtplib.SMTP) -> None:
+    try:
+        server.quit()
+    except (smtplib.SMTPException, OSError):
+        server.close()
+
+
+class SMTPConnectionPool:
+    """
+    Logged-in SMTP connections kept open between emails, keyed by `SMTPConfig.pool_key`.
+    Idle connections are checked with a NOOP before they're reused and are closed once they've
+    been idle for longer than `idle_timeout` seconds. Expired connections are closed for every key
+    whenever the pool is used, since many keys (e.g. a user's own SMTP server) are never used
+    again.
+    """
+
+    def __init__(self, idle_timeout: float, max_idle: int = 4) -> None:
+        self.idle_timeout = idle_timeout
+        self.max_idle = max_idle
+        self._idle: dict[Tuple[str, int, str, str, str], list[Tuple[smtplib.SMTP, float]]] = {}
+        self._lock = Lock()
+
+    def _pop_expired(self) -> list[smtplib.SMTP]:
+        """Remove the connections that have been idle for too long. Must hold the lock."""
+        now = time.monotonic()
+        expired = []
+        for key, idle in list(self._idle.items()):
+            # connections are appended as they're checked in, so the oldest come first
+            while idle and now - idle[0][1] >= self.idle_timeout:
+                expired.append(idle.pop(0)[0])
+            if not idle:
+                del self._idle[key]
+        return expired
+
+    def _close_expired(self) -> None:
+        with self._lock:
+            expired = self._pop_expired()
+        for server in expired:
+            _close(server)
+
+    def _checkout(self, smtp_config: SMTPConfig) -> smtplib.SMTP | None:
+        self._close_expired()
+        while True:
+            with self._lock:
+                idle = self._idle.get(smtp_config.pool_key)
+                if not idle:
+                    return None
+                server, last_used = idle.pop()
+                if not idle:
+                    del self._idle[smtp_config.pool_key]
+
+            if time.monotonic() - last_used < self.idle_timeout:
+                try:
+                    if server.noop()[0] == 250:  # noqa: PLR2004
+                        return server
+                except (smtplib.SMTPException, OSError):
+                    pass
+            _close(server)
+
+    def _checkin(self, smtp_config: SMTPConfig, server: smtplib.SMTP) -> None:
+        self._close_expired()
+        with self._lock:
+            idle = self._idle.get(smtp_config.pool_key, [])
+            if len(idle) < self.max_idle and self.idle_timeout > 0:
+                idle.append((server, time.monotonic()))
+                self._idle[smtp_config.pool_key] = idle
+                return
+        _close(server)
+
+    @contextmanager
+    def connection(self, smtp_config: SMTPConfig) -> Generator[smtplib.SMTP, None, None]:
+        server = self._checkout(smtp_config) or smtp_config.connect()
+        try:
+            yield server
+        except BaseException:
+            # the session may be broken or mid-transaction, so don't hand it to anyone else
+            _close(server)
+            raise
+        self._checkin(smtp_config, server)
+
+    def send_message(self, smtp_config: SMTPConfig, message: Message) -> None:
+        """
+        Send `message`, reconnecting once if a pooled connection turns out to have been dropped
+        """
+        try:
+            with self.connection(smtp_config) as server:
+                server.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            with self.connection(smtp_config) as server:
+                server.send_message(message)
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for server, _ in connections:
+                _close(server)
+
+
+_smtp_pool_lock = Lock()
+
+
+def get_smtp_pool() -> SMTPConnectionPool:
+    with _smtp_pool_lock:
+        if (pool := current_app.extensions.get("smtp_connection_pool")) is None:
+            pool = SMTPConnectionPool(current_app.config["SMTP_POOL_IDLE_TIMEOUT"])
+            current_app.extensions["smtp_connection_pool"] = pool
+        return pool
+
 
 def send_email(to_email: str, subject: str, body: str, smtp_config: SMTPConfig) -> bool:
     current_app.logger.debug(
@@ -77,8 +231,7 @@ def send_email(to_email: str, subject: str, body: str, smtp_config: SMTPConfig)
         return False
 
     try:
-        with smtp_config.smtp_login() as server:
-            server.send_message(message)
+        get_smtp_pool().send_message(smtp_config, message)
         return True
     except smtplib.SMTPException as e:
         current_app.logger.error(f"Error sending email: {str(e)}")
@@ -0,0 +1,105 @@
+import asyncio
+from threading import Lock, Thread
+from typing import Any, Awaitable, Callable, Coroutine, Mapping, NamedTuple, Optional, TypeVar
+
+import aiohttp
+from flask import Flask, current_app
+
+# how long resolved addresses are reused by the connection pool
+DNS_CACHE_TTL = 300
+
+T = TypeVar("T")
+
+
+class TextResponse(NamedTuple):
+    status: int
+    text: str
+
+
+def new_session(app: Flask) -> aiohttp.ClientSession:
+    """
+    Create a session for outbound requests with the configured pool limits and timeouts. The
+    session is bound to the running event loop, so async workers create one for their lifetime
+    and share it between all their requests.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=app.config["OUTBOUND_HTTP_MAX_CONNECTIONS"],
+        limit_per_host=app.config["OUTBOUND_HTTP_MAX_CONNECTIONS_PER_HOST"],
+        use_dns_cache=True,
+        ttl_dns_cache=DNS_CACHE_TTL,
+    )
+    timeout = aiohttp.ClientTimeout(total=app.config["OUTBOUND_HTTP_TIMEOUT_SECONDS"])
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+
+class HttpClient:
+    """
+    Outbound HTTP for synchronous code such as views. Requests run on an event loop in a
+    background thread with one session, so every request handled by the worker process shares
+    its connection pool and DNS cache.
+    """
+
+    def __init__(self, app: Flask) -> None:
+        self._loop = asyncio.new_event_loop()
+        self._thread = Thread(target=self._loop.run_forever, name="http-client", daemon=True)
+        self._thread.start()
+        self._session = self.run(self._new_session(app))
+
+    async def _new_session(self, app: Flask) -> aiohttp.ClientSession:
+        return new_session(app)
+
+    def run(self, coro: Coroutine[Any, Any, T]) -> T:
+        """Run `coro` on the client's loop and wait for its result"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        handle: Callable[[aiohttp.ClientResponse], Awaitable[T]],
+        **kwargs: Any,
+    ) -> T:
+        """
+        Send a request and return what `handle` makes of the response. Raises
+        `aiohttp.ClientError` or `asyncio.TimeoutError` if the request fails.
+        """
+
+        async def send() -> T:
+            async with self._session.request(method, url, **kwargs) as response:
+                return await handle(response)
+
+        return self.run(send())
+
+    def get_text(self, url: str, params: Optional[Mapping[str, str]] = None) -> TextResponse:
+        async def read(response: aiohttp.ClientResponse) -> TextResponse:
+            return TextResponse(response.status, await response.text())
+
+        return self.request("GET", url, read, params=params)
+
+    def close(self) -> None:
+        if not self._session.closed:
+            self.run(self._session.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+_client_lock = Lock()
+
+
+def get_http_client() -> HttpClient:
+    """
+    Return this app's client, creating it on first use so that it is never created before the
+    server forks its workers.
+    """
+    with _client_lock:
+        if (client := current_app.extensions.get("http_client")) is None:
+            client = HttpClient(current_app._get_current_object())  # type: ignore[attr-defined]
+            current_app.extensions["http_client"] = client
+        return client
+
+
+def shutdown_http_client() -> None:
+    with _client_lock:
+        if client := current_app.extensions.pop("http_client", None):
+            client.close()
@@ -1,32 +1,70 @@
+import hashlib
+import threading
+
 import markdown
-from bleach import clean
+from bleach.sanitizer import Cleaner
 from markupsafe import Markup
 
+from hushline.cache import LRUCache
+
+ALLOWED_TAGS = [
+    "p",
+    "span",
+    "b",
+    "strong",
+    "i",
+    "em",
+    "a",
+    "h1",
+    "h2",
+    "h3",
+    "h4",
+    "h5",
+    "h6",
+    "ul",
+    "ol",
+    "li",
+]
+ALLOWED_ATTRIBUTES = {"a": ["href"]}
+
+# The same few texts (the directory intro, status texts, guidance prompts) are rendered on most
+# requests, so their sanitized HTML is cached, keyed by a hash of the text. Longer texts aren't
+# cached, which bounds the cache's memory.
+HTML_CACHE_SIZE = 512
+HTML_CACHE_MAX_LENGTH = 10_000
+
+# the HTML doesn't depend on the app, so one cache is shared by all of them
+html_cache: LRUCache[bytes, Markup] = LRUCache(HTML_CACHE_SIZE)
+
+# Markdown and Cleaner instances aren't thread safe, so each thread gets its own
+_local = threading.local()
+
+
+def _renderer() -> markdown.Markdown:
+    if (renderer := getattr(_local, "renderer", None)) is None:
+        renderer = _local.renderer = markdown.Markdown()
+    return renderer
+
+
+def _cleaner() -> Cleaner:
+    if (cleaner := getattr(_local, "cleaner", None)) is None:
+        cleaner = _local.cleaner = Cleaner(tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES)
+    return cleaner
+
+
+def _render(md: str) -> Markup:
+    html = _renderer().reset().convert(md)
+    return Markup(_cleaner().clean(html))
+
 
 def md_to_html(md: str | Markup) -> Markup:
     if isinstance(md, Markup):
         return md
-    return Markup(
-        clean(
-            markdown.markdown(md),
-            tags=[
-                "p",
-                "span",
-                "b",
-                "strong",
-                "i",
-                "em",
-                "a",
-                "h1",
-                "h2",
-                "h3",
-                "h4",
-                "h5",
-                "h6",
-                "ul",
-                "ol",
-                "li",
-            ],
-            attributes={"a": ["href"]},
-        )
-    )
+    if len(md) > HTML_CACHE_MAX_LENGTH:
+        return _render(md)
+
+    key = hashlib.sha256(md.encode()).digest()
+    if (html := html_cache.get(key)) is None:
+        html = _render(md)
+        html_cache.set(key, html)
+    return html
@@ -4,6 +4,7 @@ from hushline.model.authentication_log import AuthenticationLog
 from hushline.model.enums import (
     FieldType,
     MessageStatus,
+    NotificationStatus,
     SMTPEncryption,
     StripeEventStatusEnum,
     StripeInvoiceStatusEnum,
@@ -15,8 +16,12 @@ from hushline.model.invite_code import InviteCode
 from hushline.model.message import Message
 from hushline.model.message_status_text import MessageStatusText
 from hushline.model.organization_setting import OrganizationSetting
+from hushline.model.outbox_notification import OutboxNotification
+from hushline.model.server_session import ServerSession
 from hushline.model.stripe_event import StripeEvent
 from hushline.model.stripe_invoice import StripeInvoice
 from hushline.model.tier import Tier
+from hushline.model.url_verification import UrlVerification
 from hushline.model.user import User
 from hushline.model.username import Username
+from hushline.model.verified_link import VerifiedLink
@@ -135,3 +135,9 @@ class FieldType(enum.Enum):
                 return "Multiple Selection"
             case x:
                 raise Exception(f"Programming error. FieldType {x!r} not handled")
+
+
+@enum.unique
+class NotificationStatus(enum.Enum):
+    PENDING = "pending"
+    FAILED = "failed"
@@ -1,9 +1,12 @@
 import secrets
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Sequence
 
+from flask import g, has_app_context
+from sqlalchemy import insert
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from hushline.crypto import DICEWARE_WORDS, decrypt_field, encrypt_field, encrypt_message
+from hushline.cache import LRUCache, lazy_cache
+from hushline.crypto import DICEWARE_WORDS, decrypt_field, encrypt_field, encrypt_messages
 from hushline.db import db
 
 if TYPE_CHECKING:
@@ -33,6 +36,63 @@ def add_padding(value: str, block_size: int = 512) -> str:
     return value + padding
 
 
+PGP_MESSAGE_HEADER = "-----BEGIN PGP MESSAGE-----"
+
+
+def prepare_values(
+    values: Sequence[tuple[str | list[str], bool]], pgp_key: str | None
+) -> list[str]:
+    """
+    Given (value, encrypted) pairs for a single recipient, return the values as they should be
+    stored before database encryption: lists are joined, and values that need it are padded and
+    PGP-encrypted in one batch so the recipient's certificate is only loaded once.
+    """
+    # Is value is a list, join it into a single string separated by newlines
+    prepared = ["\n".join(value) if isinstance(value, list) else value for value, _ in values]
+
+    # Values that were already encrypted client-side are stored as is
+    to_encrypt = [
+        i
+        for i, (value, (_, encrypted)) in enumerate(zip(prepared, values))
+        if encrypted and not value.startswith(PGP_MESSAGE_HEADER)
+    ]
+    if not to_encrypt:
+        return prepared
+
+    if not pgp_key:
+        raise ValueError("User does not have a PGP key")
+
+    # Pad the values to hide the length of the plaintext
+    encrypted_values = encrypt_messages([add_padding(prepared[i]) for i in to_encrypt], pgp_key)
+    for i, encrypted_value in zip(to_encrypt, encrypted_values):
+        if not encrypted_value:
+            raise ValueError("Failed to encrypt value")
+        prepared[i] = encrypted_value
+
+    return prepared
+
+
+# Enough for a page of the inbox. Bounded so that long-lived app contexts (e.g. the workers') don't
+# keep every plaintext they've decrypted in memory.
+DECRYPTED_VALUES_CACHE_SIZE = 256
+
+
+def _decrypt_value(data: str) -> str | None:
+    """
+    Decrypt a stored value, memoized for the rest of the request (or app context) because
+    templates read the same values several times.
+    """
+    if not has_app_context():
+        return decrypt_field(data)
+
+    cache: LRUCache[str, str] = lazy_cache(g, "decrypted_field_values", DECRYPTED_VALUES_CACHE_SIZE)
+    if (value := cache.get(data)) is None:
+        value = decrypt_field(data)
+        if value is not None:
+            cache.set(data, value)
+    return value
+
+
 class FieldValue(Model):
     __tablename__ = "field_values"
 
@@ -42,7 +102,7 @@ class FieldValue(Model):
     )
     field_definition: Mapped["FieldDefinition"] = relationship(uselist=False)
     message_id: Mapped[int] = mapped_column(
-        db.ForeignKey("messages.id", ondelete="CASCADE"), nullable=True
+        db.ForeignKey("messages.id", ondelete="CASCADE"), nullable=True, index=True
     )
     message: Mapped["Message"] = relationship("Message", back_populates="field_values")
     _value: Mapped[str] = mapped_column(db.Text, nullable=False)
@@ -67,39 +127,43 @@ class FieldValue(Model):
         This value is either a string with the actual value, PGP-encrypted data. If it's
         PGP-encrypted, the plaintext is padded with spaces at the end.
         """
-        return decrypt_field(self._value)
+        return _decrypt_value(self._value)
 
     @value.setter
     def value(self, value: str | list[str]) -> None:
-        # Is value is a list, join it into a single string separated by newlines
-        if isinstance(value, list):
-            value = "\n".join(value)
-
-        if self.encrypted and not value.startswith("-----BEGIN PGP MESSAGE-----"):
-            # Encrypt with PGP
-
-            # Pad the value to hide the length of the plaintext
-            padded_value = add_padding(value)
-
-            # Encrypt the padded value
-            pgp_key = self.message.username.user.pgp_key
-            if not pgp_key:
-                raise ValueError("User does not have a PGP key")
-            encrypted_value = encrypt_message(padded_value, pgp_key)
-            if encrypted_value:
-                val_to_save = encrypted_value
-            else:
-                raise ValueError("Failed to encrypt value")
-        else:
-            # Do not encrypt with PGP, and instead only encrypt with db key
-            val_to_save = value
-
-        # Encrypt the field
-        val = encrypt_field(val_to_save)
-        if val is not None:
-            self._value = val
-        else:
-            self._value = ""
+        pgp_key = self.message.username.user.pgp_key if self.encrypted else None
+        (val_to_save,) = prepare_values([(value, self.encrypted)], pgp_key)
+        self._value = encrypt_field(val_to_save) or ""
+
+    @classmethod
+    def insert_many(
+        cls,
+        message: "Message",
+        values: Sequence[tuple["FieldDefinition", str | list[str]]],
+        pgp_key: str | None,
+    ) -> list[str]:
+        """
+        Encrypt all of a message's field values in one pass and insert them with a single
+        statement. The message must already be flushed. Returns the stored values (PGP-encrypted
+        where applicable) in the same order as `values`.
+        """
+        prepared = prepare_values(
+            [(value, field_definition.encrypted) for field_definition, value in values], pgp_key
+        )
+        if prepared:
+            db.session.execute(
+                insert(cls),
+                [
+                    {
+                        "field_definition_id": field_definition.id,
+                        "message_id": message.id,
+                        "_value": encrypt_field(val_to_save) or "",
+                        "encrypted": field_definition.encrypted,
+                    }
+                    for (field_definition, _), val_to_save in zip(values, prepared)
+                ],
+            )
+        return prepared
 
     def __repr__(self) -> str:
         return f"<{self.__class__.__name__} {self.field_definition.label}>"
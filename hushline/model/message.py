@@ -3,18 +3,21 @@ from typing import TYPE_CHECKING
 
 from markupsafe import Markup
 from sqlalchemy import Enum as SQLAlchemyEnum
-from sqlalchemy import and_, text
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import Index, text
+from sqlalchemy.orm import Mapped, joinedload, mapped_column, relationship, selectinload
+from sqlalchemy.orm.interfaces import LoaderOption
+from sqlalchemy.orm.util import AliasedClass
 
 from hushline.crypto import gen_reply_slug
 from hushline.db import db
 from hushline.model.enums import MessageStatus
+from hushline.model.field_value import FieldValue
 from hushline.model.message_status_text import MessageStatusText
 
 if TYPE_CHECKING:
     from flask_sqlalchemy.model import Model
 
-    from hushline.model import FieldValue, Username
+    from hushline.model import Username
 else:
     Model = db.Model
 
@@ -36,7 +39,22 @@ class Message(Model):
         db.DateTime(timezone=True), server_default=text("NOW()"), nullable=False
     )
     field_values: Mapped[list["FieldValue"]] = relationship(
-        "FieldValue", back_populates="message", cascade="all, delete-orphan"
+        "FieldValue",
+        back_populates="message",
+        cascade="all, delete-orphan",
+        order_by="FieldValue.id",
+    )
+
+    # the inbox pages through a user's messages newest first, optionally filtered by status
+    __table_args__ = (
+        Index("idx_messages_username_id_created_at_id", "username_id", "created_at", "id"),
+        Index(
+            "idx_messages_username_id_status_created_at_id",
+            "username_id",
+            "status",
+            "created_at",
+            "id",
+        ),
     )
 
     def __init__(self, username_id: int) -> None:
@@ -45,20 +63,20 @@ class Message(Model):
             reply_slug=gen_reply_slug(),  # type: ignore[call-arg]
         )
 
-    # using a plain property because the mapper/join was too complicated.
-    # a better coder than me should properly configure this in the future.
+    @staticmethod
+    def load_field_values(
+        entity: "type[Message] | AliasedClass[Message] | None" = None, joined: bool = False
+    ) -> LoaderOption:
+        """
+        Loader option for a message's field values and their definitions, so that rendering them
+        doesn't lazy load each one. `joined` loads them in the same query as the message, which
+        suits a single message. Otherwise they're loaded for all of the selected messages with
+        one more query. Pass `entity` when selecting an alias of Message.
+        """
+        load = joinedload if joined else selectinload
+        return load((entity or Message).field_values).joinedload(FieldValue.field_definition)
+
     @property
     def status_text(self) -> str | Markup:
-        # Import here to avoid circular imports
-        from hushline.model import User, Username
-
-        if status_text := db.session.scalars(
-            db.select(MessageStatusText)
-            .join(User, User.id == MessageStatusText.user_id)
-            .join(Username, and_(Username.user_id == User.id, Username.id == self.username_id))
-            .join(Message, and_(Message.username_id == Username.id, Message.id == self.id))
-            .filter(MessageStatusText.status == Message.status)
-        ).one_or_none():
-            return status_text.markdown
-        else:
-            return self.status.default_text
+        texts = MessageStatusText.markdown_for_user(self.username.user_id)
+        return texts.get(self.status) or self.status.default_text
@@ -1,11 +1,12 @@
-from typing import TYPE_CHECKING, Optional, Self, Tuple
+from typing import TYPE_CHECKING, Mapping, Optional, Self, Tuple
 
-from flask import abort, current_app
+from flask import abort, current_app, has_app_context
 from sqlalchemy import Enum as SQLAlchemyEnum
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import UniqueConstraint, event
 from sqlalchemy.dialects.postgresql import insert
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.orm import Mapped, Session, mapped_column
 
+from hushline.cache import LRUCache, lazy_cache
 from hushline.db import db
 from hushline.model.enums import MessageStatus
 
@@ -14,6 +15,35 @@ if TYPE_CHECKING:
 else:
     Model = db.Model
 
+# Users' status texts, keyed by user ID. Entries are dropped when a change to a user's texts is
+# committed, and the TTL bounds how long other worker processes can show an old one.
+STATUS_TEXT_CACHE_SIZE = 1024
+STATUS_TEXT_CACHE_TTL = 60
+# set on a session to the IDs of the users whose texts it has changed but not committed yet
+_SESSION_CHANGED = "message_status_texts_changed"
+
+
+def _status_text_cache() -> LRUCache[int, Mapping[MessageStatus, str]]:
+    return lazy_cache(
+        current_app.extensions,
+        "message_status_text_cache",
+        STATUS_TEXT_CACHE_SIZE,
+        ttl=STATUS_TEXT_CACHE_TTL,
+    )
+
+
+@event.listens_for(Session, "after_commit")
+def _drop_cache_after_commit(session: Session) -> None:
+    if (user_ids := session.info.pop(_SESSION_CHANGED, None)) and has_app_context():
+        cache = _status_text_cache()
+        for user_id in user_ids:
+            cache.pop(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changes_after_rollback(session: Session) -> None:
+    session.info.pop(_SESSION_CHANGED, None)
+
 
 class MessageStatusText(Model):
     """
@@ -38,8 +68,25 @@ class MessageStatusText(Model):
         }
         return [(x, statuses.get(x)) for x in MessageStatus]
 
+    @classmethod
+    def markdown_for_user(cls, user_id: int) -> Mapping[MessageStatus, str]:
+        """
+        The user's custom status texts, for the statuses they've set one for. Cached because
+        submitters poll their reply page.
+        """
+        # don't cache this session's uncommitted changes
+        if user_id in db.session.info.get(_SESSION_CHANGED, ()):
+            return {status: x.markdown for status, x in cls.statuses_for_user(user_id) if x}
+
+        cache = _status_text_cache()
+        if (texts := cache.get(user_id)) is None:
+            texts = {status: x.markdown for status, x in cls.statuses_for_user(user_id) if x}
+            cache.set(user_id, texts)
+        return texts
+
     @classmethod
     def upsert(cls, user_id: int, status: MessageStatus, markdown: str) -> None:
+        db.session.info.setdefault(_SESSION_CHANGED, set()).add(user_id)
         markdown = markdown.strip()
         if markdown:
             db.session.execute(
@@ -1,16 +1,50 @@
-from typing import TYPE_CHECKING, Any
+from copy import deepcopy
+from typing import TYPE_CHECKING, Any, Mapping
 
-from sqlalchemy import JSON
+from flask import current_app, has_app_context
+from sqlalchemy import JSON, event
 from sqlalchemy.dialects.postgresql import JSONB, insert
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.orm import Mapped, Session, mapped_column
 
+from hushline.cache import LRUCache, lazy_cache
 from hushline.db import db
+from hushline.safe_template import CompiledTemplate, compile_template
 
 if TYPE_CHECKING:
     from flask_sqlalchemy.model import Model
 else:
     Model = db.Model
 
+# All of the organization settings are cached together, per app. Changes drop the cache when
+# they're committed, and the TTL bounds how long other worker processes can use an old value.
+SETTINGS_CACHE_TTL = 60
+_ALL_SETTINGS = "all"
+# set on a session that has changed settings that aren't committed yet
+_SESSION_CHANGED = "organization_settings_changed"
+# Templates are compiled once per distinct text, so they never need to be invalidated.
+TEMPLATE_CACHE_SIZE = 16
+
+
+def _settings_cache() -> LRUCache[str, Mapping[str, Any]]:
+    return lazy_cache(
+        current_app.extensions, "organization_settings_cache", 1, ttl=SETTINGS_CACHE_TTL
+    )
+
+
+def _template_cache() -> LRUCache[str, CompiledTemplate]:
+    return lazy_cache(current_app.extensions, "organization_templates_cache", TEMPLATE_CACHE_SIZE)
+
+
+@event.listens_for(Session, "after_commit")
+def _drop_cache_after_commit(session: Session) -> None:
+    if session.info.pop(_SESSION_CHANGED, False) and has_app_context():
+        _settings_cache().pop(_ALL_SETTINGS)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changes_after_rollback(session: Session) -> None:
+    session.info.pop(_SESSION_CHANGED, None)
+
 
 class OrganizationSetting(Model):
     __tablename__ = "organization_settings"
@@ -49,8 +83,34 @@ class OrganizationSetting(Model):
     key: Mapped[str] = mapped_column(primary_key=True)
     value: Mapped[JSON] = mapped_column(type_=JSONB)
 
+    @classmethod
+    def invalidate_cache(cls) -> None:
+        """
+        Drop the cached settings. Call this after changing the table other than with `upsert`.
+        """
+        db.session.info[_SESSION_CHANGED] = True
+        _settings_cache().pop(_ALL_SETTINGS)
+
+    @classmethod
+    def _all(cls) -> Mapping[str, Any]:
+        # don't cache this session's uncommitted changes
+        if db.session.info.get(_SESSION_CHANGED):
+            return {x.key: x.value for x in db.session.scalars(db.select(OrganizationSetting))}
+
+        cache = _settings_cache()
+        if (settings := cache.get(_ALL_SETTINGS)) is None:
+            settings = {x.key: x.value for x in db.session.scalars(db.select(OrganizationSetting))}
+            cache.set(_ALL_SETTINGS, settings)
+        return settings
+
+    @classmethod
+    def _value(cls, settings: Mapping[str, Any], key: str) -> Any:
+        # copied so that callers can't modify the cached values
+        return deepcopy(settings[key] if key in settings else cls._DEFAULT_VALUES.get(key))
+
     @classmethod
     def upsert(cls, key: str, value: Any) -> None:
+        cls.invalidate_cache()
         db.session.execute(
             insert(OrganizationSetting)
             .values(key=key, value=value)
@@ -62,19 +122,21 @@ class OrganizationSetting(Model):
 
     @classmethod
     def fetch(cls, *keys: str) -> dict[str, Any]:
-        rows = db.session.scalars(
-            db.select(OrganizationSetting).filter(OrganizationSetting.key.in_(keys))
-        ).all()
-
-        results = {key: cls._DEFAULT_VALUES.get(key) for key in keys}
-        for row in rows:
-            results[row.key] = row.value
-
-        return results
+        settings = cls._all()
+        return {key: cls._value(settings, key) for key in keys}
 
     @classmethod
     def fetch_one(cls, key: str) -> Any:
-        result = db.session.scalars(db.select(OrganizationSetting).filter_by(key=key)).one_or_none()
-        if not result:
-            return cls._DEFAULT_VALUES.get(key)
-        return result.value
+        return cls._value(cls._all(), key)
+
+    @classmethod
+    def fetch_template(cls, key: str) -> CompiledTemplate:
+        """
+        Fetch a setting that's a `safe_template` template, compiled.
+        """
+        template_string = cls._all().get(key, cls._DEFAULT_VALUES.get(key))
+        cache = _template_cache()
+        if (template := cache.get(template_string)) is None:
+            template = compile_template(template_string)
+            cache.set(template_string, template)
+        return template
@@ -0,0 +1,57 @@
+from datetime import datetime
+from typing import TYPE_CHECKING, Optional
+
+from sqlalchemy import Enum as SQLAlchemyEnum
+from sqlalchemy import Index, text
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from hushline.crypto import decrypt_field, encrypt_field
+from hushline.db import db
+from hushline.model.enums import NotificationStatus
+
+if TYPE_CHECKING:
+    from flask_sqlalchemy.model import Model
+
+    from hushline.model.user import User
+else:
+    Model = db.Model
+
+
+class OutboxNotification(Model):
+    """
+    An email notification waiting to be sent by the notifications worker. Rows are deleted once
+    they are delivered, and their body is dropped once delivery has been given up on.
+    """
+
+    __tablename__ = "notification_outbox"
+    __table_args__ = (
+        Index("idx_notification_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, nullable=False, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(db.ForeignKey("users.id"), index=True)
+    user: Mapped["User"] = relationship()
+    _body: Mapped[Optional[str]] = mapped_column("body", db.Text)
+    status: Mapped[NotificationStatus] = mapped_column(
+        SQLAlchemyEnum(NotificationStatus), default=NotificationStatus.PENDING
+    )
+    attempts: Mapped[int] = mapped_column(default=0)
+    created_at: Mapped[datetime] = mapped_column(
+        db.DateTime(timezone=True), server_default=text("NOW()"), nullable=False
+    )
+    next_attempt_at: Mapped[datetime] = mapped_column(
+        db.DateTime(timezone=True), server_default=text("NOW()"), nullable=False
+    )
+    error_message: Mapped[Optional[str]] = mapped_column(db.Text)
+
+    def __init__(self, user_id: int, body: str) -> None:
+        super().__init__(user_id=user_id)  # type: ignore[call-arg]
+        self.body = body
+
+    @property
+    def body(self) -> str | None:
+        return decrypt_field(self._body)
+
+    @body.setter
+    def body(self, value: str | None) -> None:
+        self._body = encrypt_field(value)
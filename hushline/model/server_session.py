@@ -0,0 +1,24 @@
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+from sqlalchemy.orm import Mapped, mapped_column
+
+from hushline.db import db
+
+if TYPE_CHECKING:
+    from flask_sqlalchemy.model import Model
+else:
+    Model = db.Model
+
+
+class ServerSession(Model):
+    """
+    An encrypted session kept by the database session store. The session cookie only holds its
+    random ID. Expired rows are swept by the store.
+    """
+
+    __tablename__ = "server_sessions"
+
+    id: Mapped[str] = mapped_column(db.String(64), primary_key=True)
+    data: Mapped[bytes] = mapped_column(db.LargeBinary)
+    expires_at: Mapped[datetime] = mapped_column(db.DateTime(timezone=True), index=True)
@@ -0,0 +1,44 @@
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+from sqlalchemy import text
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from hushline.db import db
+
+if TYPE_CHECKING:
+    from flask_sqlalchemy.model import Model
+
+    from hushline.model.username import Username
+else:
+    Model = db.Model
+
+
+class UrlVerification(Model):
+    """
+    A profile link waiting for the verification worker to check that it links back to the
+    profile. Rows are deleted once they're checked, so a field is being verified while it has one.
+    """
+
+    __tablename__ = "url_verifications"
+
+    id: Mapped[int] = mapped_column(primary_key=True, nullable=False, autoincrement=True)
+    username_id: Mapped[int] = mapped_column(
+        db.ForeignKey("usernames.id", ondelete="CASCADE"), index=True
+    )
+    username: Mapped["Username"] = relationship()
+    # which of the username's extra fields the link is in, 1 to 4
+    field_index: Mapped[int]
+    url: Mapped[str] = mapped_column(db.Text)
+    profile_url: Mapped[str] = mapped_column(db.Text)
+    created_at: Mapped[datetime] = mapped_column(
+        db.DateTime(timezone=True), server_default=text("NOW()"), nullable=False
+    )
+
+    def __init__(self, username_id: int, field_index: int, url: str, profile_url: str) -> None:
+        super().__init__(
+            username_id=username_id,  # type: ignore[call-arg]
+            field_index=field_index,  # type: ignore[call-arg]
+            url=url,  # type: ignore[call-arg]
+            profile_url=profile_url,  # type: ignore[call-arg]
+        )
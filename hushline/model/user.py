@@ -7,7 +7,7 @@ from sqlalchemy import text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from hushline.config import AliasMode, FieldsMode
-from hushline.crypto import decrypt_field, encrypt_field
+from hushline.crypto import decrypt_field, encrypt_field, forget_cert
 from hushline.db import db
 from hushline.model.enums import SMTPEncryption, StripeSubscriptionStatusEnum
 from hushline.model.tier import Tier
@@ -47,6 +47,7 @@ class User(Model):
     enable_email_notifications: Mapped[bool] = mapped_column(server_default=text("false"))
     email_include_message_content: Mapped[bool] = mapped_column(server_default=text("false"))
     email_encrypt_entire_body: Mapped[bool] = mapped_column(server_default=text("true"))
+    email_digest_enabled: Mapped[bool] = mapped_column(server_default=text("false"))
 
     _email: Mapped[Optional[str]] = mapped_column("email", db.String(255))
     _smtp_server: Mapped[Optional[str]] = mapped_column("smtp_server", db.String(255))
@@ -92,59 +93,88 @@ class User(Model):
         """Check the plaintext password against the stored hash."""
         return scrypt.verify(plaintext_password, self._password_hash)
 
+    def _decrypt(self, field: str) -> str | None:
+        """
+        Decrypt an encrypted column, memoizing the plaintext on this instance. The cache is keyed on
+        the ciphertext so that it is implicitly invalidated if the column is changed or reloaded.
+        Instances live in the request-scoped DB session, so this is a per-request cache.
+        """
+        ciphertext = getattr(self, f"_{field}")
+        if ciphertext is None:
+            return None
+
+        cache = self._decrypted_values
+        if (cached := cache.get(field)) and cached[0] == ciphertext:
+            return cached[1]
+
+        plaintext = decrypt_field(ciphertext)
+        cache[field] = (ciphertext, plaintext)
+        return plaintext
+
+    def _encrypt(self, field: str, value: str | None) -> None:
+        ciphertext = encrypt_field(value)
+        setattr(self, f"_{field}", ciphertext)
+        if ciphertext is None:
+            self._decrypted_values.pop(field, None)
+        else:
+            self._decrypted_values[field] = (ciphertext, value)
+
+    @property
+    def _decrypted_values(self) -> dict[str, tuple[str, str | None]]:
+        # not set in __init__ because SQLAlchemy does not call it when loading rows
+        if (cache := self.__dict__.get("_decrypted_value_cache")) is None:
+            cache = self.__dict__["_decrypted_value_cache"] = {}
+        return cache
+
     @property
     def totp_secret(self) -> str | None:
-        return decrypt_field(self._totp_secret)
+        return self._decrypt("totp_secret")
 
     @totp_secret.setter
-    def totp_secret(self, value: str) -> None:
-        if value is None:
-            self._totp_secret = None
-        else:
-            self._totp_secret = encrypt_field(value)
+    def totp_secret(self, value: str | None) -> None:
+        self._encrypt("totp_secret", value)
 
     @property
     def email(self) -> str | None:
-        return decrypt_field(self._email)
+        return self._decrypt("email")
 
     @email.setter
-    def email(self, value: str) -> None:
-        self._email = encrypt_field(value)
+    def email(self, value: str | None) -> None:
+        self._encrypt("email", value)
 
     @property
     def smtp_server(self) -> str | None:
-        return decrypt_field(self._smtp_server)
+        return self._decrypt("smtp_server")
 
     @smtp_server.setter
-    def smtp_server(self, value: str) -> None:
-        self._smtp_server = encrypt_field(value)
+    def smtp_server(self, value: str | None) -> None:
+        self._encrypt("smtp_server", value)
 
     @property
     def smtp_username(self) -> str | None:
-        return decrypt_field(self._smtp_username)
+        return self._decrypt("smtp_username")
 
     @smtp_username.setter
-    def smtp_username(self, value: str) -> None:
-        self._smtp_username = encrypt_field(value)
+    def smtp_username(self, value: str | None) -> None:
+        self._encrypt("smtp_username", value)
 
     @property
     def smtp_password(self) -> str | None:
-        return decrypt_field(self._smtp_password)
+        return self._decrypt("smtp_password")
 
     @smtp_password.setter
-    def smtp_password(self, value: str) -> None:
-        self._smtp_password = encrypt_field(value)
+    def smtp_password(self, value: str | None) -> None:
+        self._encrypt("smtp_password", value)
 
     @property
     def pgp_key(self) -> str | None:
-        return decrypt_field(self._pgp_key)
+        return self._decrypt("pgp_key")
 
     @pgp_key.setter
-    def pgp_key(self, value: str) -> None:
-        if value is None:
-            self._pgp_key = None
-        else:
-            self._pgp_key = encrypt_field(value)
+    def pgp_key(self, value: str | None) -> None:
+        if (old_value := self.pgp_key) and old_value != value:
+            forget_cert(old_value)
+        self._encrypt("pgp_key", value)
 
     @property
     def is_free_tier(self) -> bool:
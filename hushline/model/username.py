@@ -1,7 +1,20 @@
 from dataclasses import dataclass
 from typing import TYPE_CHECKING, Any, Generator, Optional, Sequence
 
+from sqlalchemy import (
+    DDL,
+    ColumnElement,
+    Connection,
+    Dialect,
+    Index,
+    Table,
+    event,
+    text,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.schema import SchemaItem
+from sqlalchemy.sql.compiler import DDLCompiler
+from sqlalchemy.sql.ddl import BaseDDLElement
 
 from hushline.db import db
 from hushline.model import FieldDefinition, FieldType
@@ -36,7 +49,7 @@ class Username(Model):
     DISPLAY_NAME_MAX_LENGTH = 100
 
     id: Mapped[int] = mapped_column(primary_key=True, nullable=False, autoincrement=True)
-    user_id: Mapped[int] = mapped_column(db.ForeignKey("users.id"))
+    user_id: Mapped[int] = mapped_column(db.ForeignKey("users.id"), index=True)
     user: Mapped["User"] = relationship()
     _username: Mapped[str] = mapped_column("username", unique=True)
     _display_name: Mapped[Optional[str]] = mapped_column("display_name", db.String(80))
@@ -107,6 +120,19 @@ class Username(Model):
     def valid_fields(self) -> Sequence[ExtraField]:
         return [x for x in self.extra_fields if x.label and x.value]
 
+    @classmethod
+    def directory_search_text(cls) -> ColumnElement[str]:
+        """
+        The text that directory searches match, see `idx_usernames_directory_search`.
+        """
+        return (
+            cls._username
+            + " "
+            + db.func.coalesce(cls._display_name, "")
+            + " "
+            + db.func.coalesce(cls.bio, "")
+        )
+
     def __repr__(self) -> str:
         return f"<{self.__class__.__name__} id={self.id} username={self.username}>"
 
@@ -138,3 +164,39 @@ class Username(Model):
                 )
             )
             db.session.commit()
+
+
+def pg_trgm_available(  # noqa: PLR0913
+    ddl: BaseDDLElement,
+    target: SchemaItem,
+    bind: Optional[Connection],
+    tables: Optional[list[Table]] = None,
+    state: Optional[Any] = None,
+    *,
+    dialect: Dialect,
+    compiler: Optional[DDLCompiler] = None,
+    checkfirst: bool = False,
+) -> bool:
+    """
+    Whether the database can have trigram indices. The extension ships with PostgreSQL's contrib
+    modules, which some installs leave out. Searches work without the index, only slower.
+    """
+    return bind is not None and bool(
+        bind.scalar(text("SELECT true FROM pg_available_extensions WHERE name = 'pg_trgm'"))
+    )
+
+
+# Directory searches are substring matches, which a trigram index can answer. It's partial because
+# only listed usernames are searched.
+event.listen(
+    db.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(callable_=pg_trgm_available),
+)
+Index(
+    "idx_usernames_directory_search",
+    Username.directory_search_text().label("directory_search_text"),
+    postgresql_using="gin",
+    postgresql_ops={"directory_search_text": "gin_trgm_ops"},
+    postgresql_where=Username.show_in_directory,
+).ddl_if(callable_=pg_trgm_available)
@@ -0,0 +1,38 @@
+from datetime import datetime
+from typing import TYPE_CHECKING, Optional
+
+from sqlalchemy import UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from hushline.db import db
+
+if TYPE_CHECKING:
+    from flask_sqlalchemy.model import Model
+else:
+    Model = db.Model
+
+
+class VerifiedLink(Model):
+    """
+    A verified profile link that the verification worker periodically checks again. Links are
+    checked in order of `checked_at` so the work is spread out over time. The row is deleted when
+    the link stops verifying or the field is changed.
+    """
+
+    __tablename__ = "verified_links"
+    __table_args__ = (UniqueConstraint("username_id", "field_index"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, nullable=False, autoincrement=True)
+    username_id: Mapped[int] = mapped_column(db.ForeignKey("usernames.id", ondelete="CASCADE"))
+    # which of the username's extra fields the link is in, 1 to 4
+    field_index: Mapped[int]
+    url: Mapped[str] = mapped_column(db.Text)
+    # requests to the same host are spaced out
+    host: Mapped[str] = mapped_column(db.Text)
+    profile_url: Mapped[str] = mapped_column(db.Text)
+    checked_at: Mapped[datetime] = mapped_column(db.DateTime(timezone=True), index=True)
+    # validators from the last response, sent back to make the next check conditional
+    etag: Mapped[Optional[str]] = mapped_column(db.Text)
+    last_modified: Mapped[Optional[str]] = mapped_column(db.Text)
+    # consecutive checks that couldn't fetch the page
+    failures: Mapped[int] = mapped_column(default=0)
@@ -0,0 +1,203 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Sequence
+
+import sqlalchemy as sa
+from flask import Flask, current_app
+
+from hushline.db import db
+from hushline.email import create_smtp_config, send_email
+from hushline.model import NotificationStatus, OutboxNotification, SMTPEncryption, User
+from hushline.model.field_value import PGP_MESSAGE_HEADER
+
+# cap the exponential backoff so a long outage doesn't push retries out indefinitely
+MAX_RETRY_DELAY = timedelta(hours=6)
+
+GENERIC_NOTIFICATION_BODY = "You have a new Hush Line message! Please log in to read it."
+
+
+def enqueue_notification(user: User, body: str) -> OutboxNotification:
+    """
+    Queue an email notification for `user`. The notification is added to the current session
+    so it's committed (or rolled back) together with whatever triggered it.
+    """
+    notification = OutboxNotification(user_id=user.id, body=body)
+    db.session.add(notification)
+    return notification
+
+
+def send_notification(
+    user: User, body: str, subject: str = "New Hush Line Message Received"
+) -> bool:
+    if user.smtp_server:
+        smtp_config = create_smtp_config(
+            user.smtp_username,  # type: ignore[arg-type]
+            user.smtp_server,
+            user.smtp_port,  # type: ignore[arg-type]
+            user.smtp_password,  # type: ignore[arg-type]
+            user.smtp_sender,  # type: ignore[arg-type]
+            encryption=user.smtp_encryption,
+        )
+    else:
+        smtp_config = create_smtp_config(
+            current_app.config["SMTP_USERNAME"],
+            current_app.config["SMTP_SERVER"],
+            current_app.config["SMTP_PORT"],
+            current_app.config["SMTP_PASSWORD"],
+            current_app.config["NOTIFICATIONS_ADDRESS"],
+            encryption=SMTPEncryption[current_app.config["SMTP_ENCRYPTION"]],
+        )
+
+    return send_email(
+        user.email,  # type: ignore[arg-type]
+        subject,
+        body,
+        smtp_config,
+    )
+
+
+def retry_delay(attempts: int) -> timedelta:
+    seconds = current_app.config["NOTIFICATIONS_RETRY_DELAY_SECONDS"] * 2 ** (attempts - 1)
+    return timedelta(seconds=min(seconds, MAX_RETRY_DELAY.total_seconds()))
+
+
+def current_body(user: User, notification: OutboxNotification) -> str:
+    """
+    The body to send for a queued notification. It was built according to the user's content
+    settings when it was queued, so if they've changed since then and the body no longer matches
+    them (e.g., plaintext after turning on "encrypt entire body"), the generic body is sent instead.
+    """
+    body = notification.body or ""
+    if body == GENERIC_NOTIFICATION_BODY:
+        return body
+    encrypted = body.startswith(PGP_MESSAGE_HEADER)
+    if user.email_include_message_content and encrypted == user.email_encrypt_entire_body:
+        return body
+    return GENERIC_NOTIFICATION_BODY
+
+
+def digest_body(user: User, notifications: Sequence[OutboxNotification]) -> str:
+    """
+    Combine several notifications into one email body. Each body is checked against the user's
+    current content settings, so with "encrypt entire body" the digest is only made of PGP
+    messages and never adds plaintext around them.
+    """
+    bodies = [current_body(user, x) for x in notifications]
+    if all(x == GENERIC_NOTIFICATION_BODY for x in bodies):
+        return f"You have {len(notifications)} new Hush Line messages! Please log in to read them."
+    return "\n\n".join(bodies)
+
+
+def _pending_digest(user: User) -> Sequence[OutboxNotification] | None:
+    """
+    Lock and return all of the user's queued notifications if their digest is due. Otherwise
+    postpone them until it is and return None.
+    """
+    notifications = db.session.scalars(
+        db.select(OutboxNotification)
+        .filter_by(user_id=user.id, status=NotificationStatus.PENDING)
+        .order_by(OutboxNotification.created_at.asc(), OutboxNotification.id.asc())
+        .with_for_update(skip_locked=True)
+    ).all()
+
+    send_at = notifications[0].created_at + timedelta(
+        seconds=current_app.config["NOTIFICATIONS_DIGEST_INTERVAL_SECONDS"]
+    )
+    if len(notifications) >= current_app.config[
+        "NOTIFICATIONS_DIGEST_MAX_MESSAGES"
+    ] or send_at <= datetime.now(timezone.utc):
+        return notifications
+
+    for notification in notifications:
+        notification.next_attempt_at = max(notification.next_attempt_at, send_at)
+    return None
+
+
+def process_next() -> bool:
+    """
+    Try to deliver the next due notification, or the digest it belongs to. Returns False if
+    there was nothing to do.
+
+    The rows stay locked while they're being sent so that multiple workers can drain the outbox
+    concurrently without sending the same notification twice.
+    """
+    notification = db.session.scalars(
+        db.select(OutboxNotification)
+        .filter(
+            OutboxNotification.status == NotificationStatus.PENDING,
+            OutboxNotification.next_attempt_at <= db.func.now(),
+        )
+        .order_by(OutboxNotification.next_attempt_at.asc(), OutboxNotification.id.asc())
+        .with_for_update(skip_locked=True)
+        .limit(1)
+    ).one_or_none()
+
+    if notification is None:
+        db.session.rollback()
+        return False
+
+    # the user may have turned notifications off since the notification was queued
+    user = notification.user
+    if not user.email or not user.enable_email_notifications:
+        db.session.delete(notification)
+        db.session.commit()
+        return True
+
+    notifications: Sequence[OutboxNotification] = [notification]
+    subject = "New Hush Line Message Received"
+    body = current_body(user, notification)
+    if user.email_digest_enabled:
+        if (digest := _pending_digest(user)) is None:
+            db.session.commit()
+            return True
+        notifications = digest
+        if len(notifications) > 1:
+            subject = "New Hush Line Messages Received"
+            body = digest_body(user, notifications)
+
+    try:
+        delivered = send_notification(user, body, subject)
+        error = None if delivered else "Failed to send email"
+    except Exception as e:
+        current_app.logger.error(f"Error sending email: {str(e)}", exc_info=True)
+        delivered = False
+        error = str(e)
+
+    for notification in notifications:
+        if delivered:
+            db.session.delete(notification)
+            continue
+
+        notification.attempts += 1
+        notification.error_message = error
+        if notification.attempts >= current_app.config["NOTIFICATIONS_MAX_ATTEMPTS"]:
+            current_app.logger.error(
+                f"Giving up on notification {notification.id} after "
+                f"{notification.attempts} attempts"
+            )
+            notification.status = NotificationStatus.FAILED
+            notification.body = None
+        else:
+            notification.next_attempt_at = datetime.now(timezone.utc) + retry_delay(
+                notification.attempts
+            )
+    db.session.commit()
+    return True
+
+
+async def worker(app: Flask) -> None:
+    # Wait for migrations to finish
+    with app.app_context():
+        engine = sa.create_engine(app.config["SQLALCHEMY_DATABASE_URI"])
+        while not sa.inspect(engine).has_table(OutboxNotification.__tablename__):
+            current_app.logger.error(f"Table {OutboxNotification.__tablename__} not found")
+            await asyncio.sleep(2)
+        engine.dispose()
+
+    # Start the worker
+    current_app.logger.info("Starting notifications worker")
+    with app.app_context():
+        while True:
+            while process_next():
+                pass
+            await asyncio.sleep(2)
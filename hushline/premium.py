@@ -11,6 +11,7 @@ from flask import (
     abort,
     current_app,
     flash,
+    g,
     jsonify,
     redirect,
     render_template,
@@ -390,7 +391,7 @@ def create_blueprint(app: Flask) -> Blueprint:
     @bp.route("/")
     @authentication_required
     def index() -> Response | str:
-        user = db.session.get(User, session.get("user_id"))
+        user = g.user
         if not user:
             session.clear()
             return redirect(url_for("login"))
@@ -415,7 +416,7 @@ def create_blueprint(app: Flask) -> Blueprint:
     @bp.route("/select-tier")
     @authentication_required
     def select_tier() -> Response | str:
-        user = db.session.get(User, session.get("user_id"))
+        user = g.user
         if not user:
             session.clear()
             return redirect(url_for("login"))
@@ -427,7 +428,7 @@ def create_blueprint(app: Flask) -> Blueprint:
     @bp.route("/select-tier/free", methods=["POST"])
     @authentication_required
     def select_free() -> Response | str:
-        user = db.session.get(User, session.get("user_id"))
+        user = g.user
         if not user:
             session.clear()
             return redirect(url_for("login"))
@@ -447,7 +448,7 @@ def create_blueprint(app: Flask) -> Blueprint:
     @bp.route("/upgrade", methods=["POST"])
     @authentication_required
     def upgrade() -> Response | str:
-        user = db.session.get(User, session.get("user_id"))
+        user = g.user
         if not user:
             session.clear()
             return redirect(url_for("login"))
@@ -501,7 +502,7 @@ def create_blueprint(app: Flask) -> Blueprint:
     @bp.route("/disable-autorenew", methods=["POST"])
     @authentication_required
     def disable_autorenew() -> Response | str:
-        user = db.session.get(User, session.get("user_id"))
+        user = g.user
         if not user:
             session.clear()
             return redirect(url_for("login"))
@@ -531,7 +532,7 @@ def create_blueprint(app: Flask) -> Blueprint:
     @bp.route("/enable-autorenew", methods=["POST"])
     @authentication_required
     def enable_autorenew() -> Response | str:
-        user = db.session.get(User, session.get("user_id"))
+        user = g.user
         if not user:
             session.clear()
             return redirect(url_for("login"))
@@ -562,7 +563,7 @@ def create_blueprint(app: Flask) -> Blueprint:
     @bp.route("/cancel", methods=["POST"])
     @authentication_required
     def cancel() -> Response | str:
-        user = db.session.get(User, session.get("user_id"))
+        user = g.user
         if not user:
             session.clear()
             return redirect(url_for("login"))
@@ -594,7 +595,7 @@ def create_blueprint(app: Flask) -> Blueprint:
     @bp.route("/status.json")
     @authentication_required
     def status() -> Response | str:
-        user = db.session.get(User, session.get("user_id"))
+        user = g.user
         if not user:
             session.clear()
             return redirect(url_for("login"))
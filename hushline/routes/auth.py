@@ -5,6 +5,7 @@ import pyotp
 from flask import (
     Flask,
     flash,
+    g,
     redirect,
     render_template,
     request,
@@ -28,11 +29,7 @@ from hushline.routes.forms import LoginForm, RegistrationForm, TwoFactorForm
 def register_auth_routes(app: Flask) -> None:
     @app.route("/register", methods=["GET", "POST"])
     def register() -> Response | str:
-        if (
-            session.get("is_authenticated", False)
-            and (user_id := session.get("user_id", False))
-            and db.session.get(User, user_id)
-        ):
+        if session.get("is_authenticated", False) and g.user:
             flash("👉 You are already logged in.")
             return redirect(url_for("inbox"))
 
@@ -187,7 +184,7 @@ def register_auth_routes(app: Flask) -> None:
     @app.route("/verify-2fa-login", methods=["GET", "POST"])
     def verify_2fa_login() -> Response | str | tuple[Response | str, int]:
         # Redirect to login if the login process has not started yet
-        user = db.session.get(User, session.get("user_id"))
+        user = g.user
         if not user:
             session.clear()
             return redirect(url_for("login"))
@@ -1,18 +1,15 @@
 import re
 import socket
-from typing import Sequence
 
 from flask import (
-    current_app,
     flash,
     session,
 )
 from wtforms import Field, Form
 from wtforms.validators import ValidationError
 
-from hushline.db import db
-from hushline.email import create_smtp_config, send_email
-from hushline.model import SMTPEncryption, User, Username
+from hushline.model import User
+from hushline.outbox import enqueue_notification
 
 
 def valid_username(form: Form, field: Field) -> None:
@@ -22,24 +19,16 @@ def valid_username(form: Form, field: Field) -> None:
         )
 
 
-def get_directory_usernames() -> Sequence[Username]:
-    return db.session.scalars(
-        db.select(Username)
-        .join(User)
-        .filter(Username.show_in_directory.is_(True))
-        .order_by(
-            User.is_admin.desc(),
-            db.func.coalesce(Username._display_name, Username._username),
-        )
-    ).all()
-
-
 def validate_captcha(captcha_answer: str) -> bool:
+    # each problem can only be tried once
+    expected_answer = session.pop("math_answer", None)
+    session.pop("math_problem", None)
+
     if not captcha_answer.isdigit():
         flash("Incorrect CAPTCHA. Please enter a valid number.", "error")
         return False
 
-    if captcha_answer != session.get("math_answer"):
+    if captcha_answer != expected_answer:
         flash("Incorrect CAPTCHA. Please try again.", "error")
         return False
 
@@ -59,29 +48,11 @@ def get_ip_address() -> str:
 
 
 def do_send_email(user: User, body: str) -> None:
+    """
+    Queue a notification for the notifications worker instead of talking to the SMTP server from
+    inside the request. The caller commits it along with the rest of the request's changes.
+    """
     if not user.email or not user.enable_email_notifications:
         return
 
-    try:
-        if user.smtp_server:
-            smtp_config = create_smtp_config(
-                user.smtp_username,  # type: ignore[arg-type]
-                user.smtp_server,  # type: ignore[arg-type]
-                user.smtp_port,  # type: ignore[arg-type]
-                user.smtp_password,  # type: ignore[arg-type]
-                user.smtp_sender,  # type: ignore[arg-type]
-                encryption=user.smtp_encryption,
-            )
-        else:
-            smtp_config = create_smtp_config(
-                current_app.config["SMTP_USERNAME"],
-                current_app.config["SMTP_SERVER"],
-                current_app.config["SMTP_PORT"],
-                current_app.config["SMTP_PASSWORD"],
-                current_app.config["NOTIFICATIONS_ADDRESS"],
-                encryption=SMTPEncryption[current_app.config["SMTP_ENCRYPTION"]],
-            )
-
-        send_email(user.email, "New Hush Line Message Received", body, smtp_config)
-    except Exception as e:
-        current_app.logger.error(f"Error sending email: {str(e)}", exc_info=True)
+    enqueue_notification(user, body)
@@ -1,22 +1,41 @@
+from dataclasses import asdict
+from typing import Any
+
 from flask import (
     Flask,
+    abort,
+    current_app,
     render_template,
+    request,
     session,
+    url_for,
 )
 from werkzeug.wrappers.response import Response
 
+from hushline.directory import get_snapshot, search
 from hushline.model import OrganizationSetting
-from hushline.routes.common import get_directory_usernames
+
+SEARCH_QUERY_MAX_LENGTH = 100
 
 
 def register_directory_routes(app: Flask) -> None:
     @app.route("/directory")
     def directory() -> Response | str:
         logged_in = "user_id" in session
+        entries = get_snapshot().entries
+
+        page = request.args.get("page", 1, type=int)
+        page_size = current_app.config["DIRECTORY_PAGE_SIZE"]
+        start = (page - 1) * page_size
+        if page < 1 or (page > 1 and start >= len(entries)):
+            abort(404)
+
         return render_template(
             "directory.html",
             intro_text=OrganizationSetting.fetch_one(OrganizationSetting.DIRECTORY_INTRO_TEXT),
-            usernames=get_directory_usernames(),
+            entries=entries[start : start + page_size],
+            page=page,
+            has_next_page=start + page_size < len(entries),
             logged_in=logged_in,
         )
 
@@ -26,14 +45,34 @@ def register_directory_routes(app: Flask) -> None:
         return {"logged_in": logged_in}
 
     @app.route("/directory/users.json")
-    def directory_users() -> list[dict[str, str | bool | None]]:
-        return [
-            {
-                "primary_username": username.username,
-                "display_name": username.display_name or username.username,
-                "bio": username.bio,
-                "is_admin": username.user.is_admin,
-                "is_verified": username.is_verified,
-            }
-            for username in get_directory_usernames()
-        ]
+    def directory_users() -> Response:
+        snapshot = get_snapshot()
+        response = Response(snapshot.json, mimetype="application/json")
+        response.set_etag(snapshot.etag)
+        # let browsers keep it, but check that it's still current
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+
+    @app.route("/directory/search.json")
+    def directory_search() -> dict[str, Any]:
+        query = request.args.get("q", "").strip()
+        verified_only = request.args.get("verified") == "true"
+        page = request.args.get("page", 1, type=int)
+        if len(query) > SEARCH_QUERY_MAX_LENGTH or page < 1:
+            abort(400)
+
+        page_size = current_app.config["DIRECTORY_PAGE_SIZE"]
+        entries, has_next_page = search(query, verified_only, (page - 1) * page_size, page_size)
+        return {
+            "users": [asdict(x) for x in entries],
+            "next_url": (
+                url_for(
+                    "directory_search",
+                    q=query,
+                    verified="true" if verified_only else None,
+                    page=page + 1,
+                )
+                if has_next_page
+                else None
+            ),
+        }
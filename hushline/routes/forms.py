@@ -1,3 +1,6 @@
+from typing import Tuple, Type
+
+from flask import current_app
 from flask_wtf import FlaskForm
 from wtforms import (
     HiddenField,
@@ -11,6 +14,7 @@ from wtforms import (
 from wtforms.validators import DataRequired, Length, Optional
 from wtforms.widgets import CheckboxInput, ListWidget
 
+from hushline.cache import LRUCache, lazy_cache
 from hushline.forms import ComplexPassword
 from hushline.model import FieldDefinition, FieldType, Username
 from hushline.routes.common import valid_username
@@ -58,19 +62,63 @@ class LoginForm(FlaskForm):
     password = PasswordField("Password", validators=[DataRequired()])
 
 
+# Message form classes, keyed by the fingerprint of their fields. Changing a field changes the
+# fingerprint, so entries never need to be invalidated, and usernames with the same fields (e.g.,
+# the defaults) share a class.
+FORM_CLASS_CACHE_SIZE = 1024
+
+FormFingerprint = Tuple[Tuple[str, FieldType, bool, bool, bool, Tuple[str, ...]], ...]
+
+
+def _form_class_cache() -> LRUCache[FormFingerprint, Type[FlaskForm]]:
+    return lazy_cache(current_app.extensions, "message_form_class_cache", FORM_CLASS_CACHE_SIZE)
+
+
 class DynamicMessageForm:
     def __init__(self, fields: list[FieldDefinition]):
         self.fields = fields
+        self._fields_by_name = {f"field_{i}": x for i, x in enumerate(fields)}
+
+        cache = _form_class_cache()
+        key = self.fingerprint(fields)
+        if (form_class := cache.get(key)) is None:
+            form_class = self._build_form_class(fields)
+            cache.set(key, form_class)
+        self.F = form_class
+
+    @classmethod
+    def for_username(cls, username: Username) -> "DynamicMessageForm":
+        """
+        The form for the username's enabled message fields
+        """
+        return cls([x for x in username.message_fields if x.enabled])
+
+    @staticmethod
+    def fingerprint(fields: list[FieldDefinition]) -> FormFingerprint:
+        """
+        Everything about the fields that the form class is built from
+        """
+        return tuple(
+            (
+                x.label,
+                x.field_type,
+                bool(x.required),
+                bool(x.enabled),
+                bool(x.encrypted),
+                tuple(x.choices or ()),
+            )
+            for x in fields
+        )
 
-        # Create a custom form class for this instance of CustomMessageForm
+    @staticmethod
+    def _build_form_class(fields: list[FieldDefinition]) -> Type[FlaskForm]:
+        # Create a custom form class for these fields
         class F(FlaskForm):
             # Add email body hidden field
             encrypted_email_body = HiddenField(
                 "Encrypted Email Body", validators=[Optional(), Length(max=10240 * len(fields))]
             )
 
-        self.F = F
-
         # Custom validator to skip choice validation while keeping other validations
         def skip_invalid_choice(
             form: FlaskForm, field: RadioField | SelectField | MultiCheckboxField
@@ -111,19 +159,19 @@ class DynamicMessageForm:
             name = f"field_{i}"
             if field.field_type == FieldType.TEXT:
                 setattr(
-                    self.F,
+                    F,
                     name,
                     StringField(
                         field.label, validators=validators, render_kw={"autocomplete": "off"}
                     ),
                 )
             elif field.field_type == FieldType.MULTILINE_TEXT:
-                setattr(self.F, name, TextAreaField(field.label, validators=validators))
+                setattr(F, name, TextAreaField(field.label, validators=validators))
             elif field.field_type == FieldType.CHOICE_SINGLE:
                 # Decide if we want radio buttons or dropdown depending on the number of choices
                 field_type = RadioField if len(field.choices) <= 3 else SelectField  # noqa: PLR2004
                 setattr(
-                    self.F,
+                    F,
                     name,
                     field_type(
                         field.label, choices=field.choices, validators=validators, coerce=str
@@ -131,7 +179,7 @@ class DynamicMessageForm:
                 )
             elif field.field_type == FieldType.CHOICE_MULTIPLE:
                 setattr(
-                    self.F,
+                    F,
                     name,
                     MultiCheckboxField(
                         field.label, choices=field.choices, validators=validators, coerce=str
@@ -140,26 +188,19 @@ class DynamicMessageForm:
             else:
                 raise ValueError(f"Unknown field type: {field.field_type}")
 
+        return F
+
     def field_data(self) -> list[dict[str, str | FieldDefinition]]:
         """
         Return a list of dicts for this form for the template to loop through while rendering
         """
-        return [
-            {
-                "name": f"field_{i}",
-                "field": self.fields[i],
-            }
-            for i in range(len(self.fields))
-        ]
+        return [{"name": name, "field": field} for name, field in self._fields_by_name.items()]
 
     def field_from_name(self, name: str) -> FieldDefinition | None:
         """
         Return the FieldDefinition object for the given field name
         """
-        for i, field in enumerate(self.fields):
-            if f"field_{i}" == name:
-                return field
-        return None
+        return self._fields_by_name.get(name)
 
     def form(self) -> FlaskForm:
         """
@@ -1,10 +1,17 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional, Sequence, Tuple
+
 from flask import (
     Flask,
     abort,
+    current_app,
+    g,
     render_template,
     request,
-    session,
+    url_for,
 )
+from sqlalchemy import Select
+from sqlalchemy.orm import aliased, contains_eager
 from werkzeug.wrappers.response import Response
 
 from hushline.auth import authentication_required
@@ -16,19 +23,116 @@ from hushline.model import (
     Username,
 )
 
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def encode_cursor(message: Message) -> str:
+    micros = (message.created_at - EPOCH) // timedelta(microseconds=1)
+    return f"{micros}-{message.id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Parse a cursor from `encode_cursor`. Raises ValueError if it's malformed.
+    """
+    micros, id_ = cursor.split("-")
+    try:
+        return EPOCH + timedelta(microseconds=int(micros)), int(id_)
+    except OverflowError as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def inbox_page_query(
+    user: User,
+    status: Optional[MessageStatus],
+    cursor: Optional[Tuple[datetime, int]],
+    page_size: int,
+    with_field_values: bool = False,
+) -> Select[Tuple[Message]]:
+    """
+    Select one page of the user's messages, newest first, plus the first message of the next page.
+    Pages are keyed on (created_at, id) so that deep pages are as cheap as the first one.
+
+    Each of the user's usernames contributes at most one page through a lateral subquery, so that
+    every username's part is an ordered scan of the messages' (username_id, ..., created_at, id)
+    indices instead of a sort of all of the user's messages.
+    """
+    per_username = (
+        db.select(Message)
+        .filter(Message.username_id == Username.id)
+        .order_by(Message.created_at.desc(), Message.id.desc())
+        .limit(page_size + 1)
+    )
+    if status:
+        per_username = per_username.filter(Message.status == status)
+    if cursor:
+        per_username = per_username.filter(db.tuple_(Message.created_at, Message.id) < cursor)
+
+    page = per_username.lateral()
+    page_message = aliased(Message, page)
+    query = (
+        db.select(page_message)
+        .select_from(Username)
+        .join(page, db.true())
+        .options(contains_eager(page_message.username))
+        .filter(Username.user_id == user.id)
+        .order_by(page.c.created_at.desc(), page.c.id.desc())
+        .limit(page_size + 1)
+    )
+    if with_field_values:
+        query = query.options(Message.load_field_values(page_message))
+    return query
+
+
+def get_inbox_page(
+    user: User,
+    status: Optional[MessageStatus],
+    cursor: Optional[Tuple[datetime, int]],
+    page_size: int,
+    with_field_values: bool = False,
+) -> Tuple[Sequence[Message], Optional[str]]:
+    """
+    Return one page of the user's messages and the cursor of the next page.
+    """
+    messages = db.session.scalars(
+        inbox_page_query(user, status, cursor, page_size, with_field_values)
+    ).all()
+    if len(messages) > page_size:
+        messages = messages[:page_size]
+        return messages, encode_cursor(messages[-1])
+    return messages, None
+
+
+def inbox_counts_query(user: User) -> Select[Tuple[Optional[MessageStatus], int, int]]:
+    alias_count = (
+        db.select(db.func.count(Username.id)).filter(Username.user_id == user.id).scalar_subquery()
+    )
+    return (
+        db.select(Message.status, db.func.count(Message.id), alias_count)
+        .select_from(Username)
+        .outerjoin(Message)
+        .filter(Username.user_id == user.id)
+        .group_by(Message.status)
+    )
+
+
+def get_inbox_counts(user: User) -> Tuple[list[Tuple[MessageStatus, int]], int]:
+    """
+    Return the number of the user's messages in each status, and how many usernames they have.
+    """
+    results = db.session.execute(inbox_counts_query(user)).all()
+
+    status_counts_map = {status: count for status, count, _ in results if status is not None}
+    message_statuses = [(x, status_counts_map.get(x, 0)) for x in MessageStatus]
+    return message_statuses, results[0][2] if results else 0
+
 
 def register_inbox_routes(app: Flask) -> None:
-    @app.route("/inbox")
-    @authentication_required
-    def inbox() -> Response | str:
-        user = db.session.get(User, session.get("user_id"))
+    def parse_inbox_args() -> Tuple[User, Optional[MessageStatus], Optional[Tuple[datetime, int]]]:
+        user = g.user
         if not user:  # silence, mypy
             abort(404)
 
-        user_alias_count = db.session.scalar(
-            db.select(db.func.count(Username.id).filter(Username.user_id == user.id))
-        )
-
         status_filter = None
         if status_str := request.args.get("status"):
             try:
@@ -36,31 +140,79 @@ def register_inbox_routes(app: Flask) -> None:
             except ValueError:
                 abort(400)
 
-        query = (
-            db.select(Message)
-            .join(Username)
-            .filter(Username.user_id == user.id)
-            .order_by(Message.created_at.desc())
+        cursor = None
+        if cursor_str := request.args.get("cursor"):
+            try:
+                cursor = decode_cursor(cursor_str)
+            except ValueError:
+                abort(400)
+
+        return user, status_filter, cursor
+
+    def message_preview(message: Message) -> Optional[dict[str, Any]]:
+        """
+        The first field of a message, or None if it has none. Encrypted values are left out.
+        """
+        if not message.field_values:
+            return None
+        field_value = message.field_values[0]
+        return {
+            "label": field_value.field_definition.label,
+            "encrypted": field_value.encrypted,
+            "value": None if field_value.encrypted else field_value.value,
+        }
+
+    @app.route("/inbox")
+    @authentication_required
+    def inbox() -> Response | str:
+        user, status_filter, cursor = parse_inbox_args()
+        previews_enabled = current_app.config["INBOX_PREVIEWS_ENABLED"]
+        messages, next_cursor = get_inbox_page(
+            user, status_filter, cursor, current_app.config["INBOX_PAGE_SIZE"], previews_enabled
         )
-        if status_filter:
-            query = query.filter(Message.status == status_filter)
-        messages = list(db.session.scalars(query))
-
-        status_count_results = db.session.execute(
-            db.select(Message.status, db.func.count())
-            .join(Username)
-            .filter(Username.user_id == user.id)
-            .group_by(Message.status)
-        ).all()
-        status_counts_map = {x[0]: x[1] for x in status_count_results}
-        message_statuses = [(x, status_counts_map.get(x, 0)) for x in MessageStatus]
+        message_statuses, alias_count = get_inbox_counts(user)
 
         return render_template(
             "inbox.html",
             user=user,
             messages=messages,
+            previews={x.id: message_preview(x) for x in messages} if previews_enabled else None,
+            next_cursor=next_cursor,
             status_filter=status_filter,
             total_messages=sum(x[1] for x in message_statuses),
             message_statuses=message_statuses,
-            user_has_aliases=user_alias_count > 1,
+            user_has_aliases=alias_count > 1,
         )
+
+    @app.route("/inbox.json")
+    @authentication_required
+    def inbox_json() -> dict[str, Any]:
+        user, status_filter, cursor = parse_inbox_args()
+        previews_enabled = current_app.config["INBOX_PREVIEWS_ENABLED"]
+        messages, next_cursor = get_inbox_page(
+            user, status_filter, cursor, current_app.config["INBOX_PAGE_SIZE"], previews_enabled
+        )
+
+        return {
+            "messages": [
+                {
+                    "id": message.id,
+                    "url": url_for("message", id=message.id),
+                    "username": message.username.username,
+                    "display_name": message.username.display_name or message.username.username,
+                    "created_at": message.created_at.date().isoformat(),
+                    **({"preview": message_preview(message)} if previews_enabled else {}),
+                }
+                for message in messages
+            ],
+            "next_cursor": next_cursor,
+            "next_url": (
+                url_for(
+                    "inbox_json",
+                    status=status_filter.value if status_filter else None,
+                    cursor=next_cursor,
+                )
+                if next_cursor
+                else None
+            ),
+        }
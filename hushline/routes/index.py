@@ -1,6 +1,7 @@
 from flask import (
     Flask,
     flash,
+    g,
     redirect,
     session,
     url_for,
@@ -20,7 +21,7 @@ def register_index_routes(app: Flask) -> None:
     def index() -> Response:
         # If logged in, redirect to inbox
         if "user_id" in session:
-            user = db.session.get(User, session.get("user_id"))
+            user = g.user
             if user:
                 return redirect(url_for("inbox"))
 
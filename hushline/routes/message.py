@@ -5,11 +5,13 @@ from flask import (
     abort,
     current_app,
     flash,
+    g,
     redirect,
     render_template,
     session,
     url_for,
 )
+from sqlalchemy.orm import contains_eager, joinedload
 from werkzeug.wrappers.response import Response
 
 from hushline.auth import authentication_required
@@ -18,7 +20,6 @@ from hushline.forms import DeleteMessageForm, UpdateMessageStatusForm
 from hushline.model import (
     FieldValue,
     Message,
-    User,
     Username,
 )
 
@@ -27,11 +28,16 @@ def register_message_routes(app: Flask) -> None:
     @app.route("/message/<int:id>")
     @authentication_required
     def message(id: int) -> str:
-        msg = db.session.scalars(
-            db.select(Message)
-            .join(Username)
-            .filter(Username.user_id == session["user_id"], Message.id == id)
-        ).one_or_none()
+        msg = (
+            db.session.scalars(
+                db.select(Message)
+                .join(Username)
+                .options(contains_eager(Message.username), Message.load_field_values(joined=True))
+                .filter(Username.user_id == session["user_id"], Message.id == id)
+            )
+            .unique()
+            .one_or_none()
+        )
 
         if not msg:
             abort(404)
@@ -48,7 +54,9 @@ def register_message_routes(app: Flask) -> None:
 
     @app.route("/reply/<slug>")
     def message_reply(slug: str) -> str:
-        msg = db.session.scalars(db.select(Message).filter_by(reply_slug=slug)).one_or_none()
+        msg = db.session.scalars(
+            db.select(Message).options(joinedload(Message.username)).filter_by(reply_slug=slug)
+        ).one_or_none()
         if msg is None:
             abort(404)
 
@@ -57,7 +65,7 @@ def register_message_routes(app: Flask) -> None:
     @app.route("/message/<int:id>/delete", methods=["POST"])
     @authentication_required
     def delete_message(id: int) -> Response:
-        user = db.session.scalars(db.select(User).filter_by(id=session["user_id"])).one()
+        user = g.user
 
         message = db.session.scalars(
             db.select(Message).where(
@@ -82,7 +90,7 @@ def register_message_routes(app: Flask) -> None:
     @app.route("/message/<int:id>/status", methods=["POST"])
     @authentication_required
     def set_message_status(id: int) -> Response:
-        user = db.session.scalars(db.select(User).filter_by(id=session["user_id"])).one()
+        user = g.user
 
         form = UpdateMessageStatusForm()
         if not form.validate():
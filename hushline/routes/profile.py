@@ -21,9 +21,9 @@ from hushline.model import (
     OrganizationSetting,
     Username,
 )
+from hushline.outbox import GENERIC_NOTIFICATION_BODY
 from hushline.routes.common import do_send_email, validate_captcha
 from hushline.routes.forms import DynamicMessageForm
-from hushline.safe_template import safe_render_template
 
 
 def register_profile_routes(app: Flask) -> None:
@@ -33,19 +33,23 @@ def register_profile_routes(app: Flask) -> None:
         if not uname:
             abort(404)
 
-        uname.create_default_field_defs()
-
-        dynamic_form = DynamicMessageForm([x for x in uname.message_fields if x.enabled])
+        dynamic_form = DynamicMessageForm.for_username(uname)
         form = dynamic_form.form()
 
-        # Generate a simple math problem using secrets module (e.g., "What is 6 + 7?")
-        num1 = secrets.randbelow(10) + 1
-        num2 = secrets.randbelow(10) + 1
-        math_problem = f"{num1} + {num2} ="
-        session["math_answer"] = str(num1 + num2)
-
-        profile_header = safe_render_template(
-            OrganizationSetting.fetch_one(OrganizationSetting.BRAND_PROFILE_HEADER_TEMPLATE),
+        # Generate a simple math problem using secrets module (e.g., "What is 6 + 7?"). It's kept
+        # until it's been answered so that viewing profiles doesn't write the session each time.
+        if "math_answer" in session and "math_problem" in session:
+            math_problem = session["math_problem"]
+        else:
+            num1 = secrets.randbelow(10) + 1
+            num2 = secrets.randbelow(10) + 1
+            math_problem = f"{num1} + {num2} ="
+            session["math_answer"] = str(num1 + num2)
+            session["math_problem"] = math_problem
+
+        profile_header = OrganizationSetting.fetch_template(
+            OrganizationSetting.BRAND_PROFILE_HEADER_TEMPLATE
+        ).render(
             {
                 "display_name_or_username": uname.display_name or uname.username,
                 "display_name": uname.display_name,
@@ -77,7 +81,7 @@ def register_profile_routes(app: Flask) -> None:
             flash("🫥 User not found.")
             return abort(404)
 
-        dynamic_form = DynamicMessageForm([x for x in uname.message_fields if x.enabled])
+        dynamic_form = DynamicMessageForm.for_username(uname)
         form = dynamic_form.form()
 
         current_app.logger.debug(f"Form submitted: {form.data}")
@@ -99,27 +103,15 @@ def register_profile_routes(app: Flask) -> None:
             db.session.add(message)
             db.session.flush()
 
-            extracted_fields = []
-            # Add the field values
+            # Add the field values, encrypting and inserting them in a single batch
+            values: list[tuple[FieldDefinition, str | list[str]]] = []
             for data in dynamic_form.field_data():
                 field_name: str = data["name"]  # type: ignore
                 field_definition: FieldDefinition = data["field"]  # type: ignore
-                value = getattr(form, field_name).data
-                field_value = FieldValue(
-                    field_definition,
-                    message,
-                    value,
-                    field_definition.encrypted,
-                )
-                db.session.add(field_value)
-                db.session.flush()
-                extracted_fields.append((field_definition.label, field_value.value))
-
-            db.session.commit()
+                values.append((field_definition, getattr(form, field_name).data))
+            stored_values = FieldValue.insert_many(message, values, uname.user.pgp_key)
+            extracted_fields = [(x.label, value) for (x, _), value in zip(values, stored_values)]
 
-            plaintext_new_message_body = (
-                "You have a new Hush Line message! Please log in to read it."
-            )
             if uname.user.enable_email_notifications:
                 if uname.user.email_include_message_content:
                     # Only encrypt the entire body if we got the encrypted body from the form
@@ -129,7 +121,7 @@ def register_profile_routes(app: Flask) -> None:
                             current_app.logger.debug("Sending email with encrypted body")
                         else:
                             # If the body is not encrypted, we should not send it
-                            email_body = plaintext_new_message_body
+                            email_body = GENERIC_NOTIFICATION_BODY
                             current_app.logger.debug(
                                 "Email body is not encrypted, sending email with generic body"
                             )
@@ -141,11 +133,14 @@ def register_profile_routes(app: Flask) -> None:
                             email_body += f"\n\n{name}\n\n{value}\n\n=============="
                         current_app.logger.debug("Sending email with unencrypted body")
                 else:
-                    email_body = plaintext_new_message_body
+                    email_body = GENERIC_NOTIFICATION_BODY
                     current_app.logger.debug("Sending email with generic body")
 
                 do_send_email(uname.user, email_body.strip())
 
+            # the notification is queued in the same transaction as the message it's about
+            db.session.commit()
+
             flash("👍 Message submitted successfully.")
             session["reply_slug"] = message.reply_slug
             current_app.logger.debug("Message sent and now redirecting")
@@ -1,23 +1,21 @@
 from flask import (
     Flask,
     flash,
+    g,
     redirect,
     render_template,
-    session,
     url_for,
 )
 from werkzeug.wrappers.response import Response
 
 from hushline.auth import authentication_required
-from hushline.db import db
-from hushline.model import User
 
 
 def register_vision_routes(app: Flask) -> None:
     @app.route("/vision")
     @authentication_required
     def vision() -> str | Response:
-        user = db.session.get(User, session.get("user_id"))
+        user = g.user
         if not user:
             flash("⛔️ Please log in to access this feature.")
             return redirect(url_for("login"))
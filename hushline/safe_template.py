@@ -1,5 +1,5 @@
 import re
-from typing import Mapping, Optional
+from typing import Mapping, Optional, Sequence, Tuple
 
 VARIABLE_SYNTAX = re.compile("^[a-zA-Z_][a-zA-Z0-9_]*$")
 VAR_START = "{{"
@@ -12,39 +12,72 @@ class TemplateError(Exception):
         self._details = details
 
 
-def safe_render_template(template_string: str, variables: Mapping[str, Optional[str]]) -> str:
-    for name, value in variables.items():
-        if not VARIABLE_SYNTAX.search(name):
-            raise TemplateError(f"Variable with invalid syntax: {name}")
-        if not isinstance(value, str) and value is not None:
-            # not a template error. this is us making a mistake. don't show to user.
-            raise ValueError(f"Variable {name} was not a string: {value}")
+class CompiledTemplate:
+    """
+    A template parsed once by `compile_template` that can be rendered many times.
 
-    out = ""
+    Syntax errors are kept and raised when rendering reaches them, so that errors are reported in
+    the same order as the template is read.
+    """
 
-    while template_string:
-        var_start_idx = template_string.find(VAR_START)
+    def __init__(
+        self, parts: Sequence[Tuple[str, str]], tail: str, syntax_error: Optional[str]
+    ) -> None:
+        # the text before each variable and the variable's name
+        self._parts = parts
+        self._tail = tail
+        self._syntax_error = syntax_error
 
-        # no variables, so just append the remaining string
-        if var_start_idx < 0:
-            if template_string.find(VAR_END) >= 0:
-                raise TemplateError("Invalid syntax. Extra variable substitution braces.")
+    def render(self, variables: Mapping[str, Optional[str]]) -> str:
+        for name, value in variables.items():
+            if not VARIABLE_SYNTAX.search(name):
+                raise TemplateError(f"Variable with invalid syntax: {name}")
+            if not isinstance(value, str) and value is not None:
+                # not a template error. this is us making a mistake. don't show to user.
+                raise ValueError(f"Variable {name} was not a string: {value}")
+
+        out = []
+        for text, var_name in self._parts:
+            if var_name not in variables:
+                raise TemplateError(f"Variable not defined: {var_name}")
+            out.append(text)
+            out.append(variables[var_name] or "")  # to account for None
+
+        if self._syntax_error:
+            raise TemplateError(self._syntax_error)
+
+        out.append(self._tail)
+        return "".join(out)
 
-            out += template_string
-            break
 
-        if var_start_idx != 0:
-            out += template_string[0:var_start_idx]
+def compile_template(template_string: str) -> CompiledTemplate:
+    parts: list[Tuple[str, str]] = []
+    pos = 0
 
-        var_end_idx = template_string.find(VAR_END)
+    while pos < len(template_string):
+        var_start_idx = template_string.find(VAR_START, pos)
+
+        # no variables, so the remaining string is the tail
+        if var_start_idx < 0:
+            if template_string.find(VAR_END, pos) >= 0:
+                return CompiledTemplate(
+                    parts, "", "Invalid syntax. Extra variable substitution braces."
+                )
+            return CompiledTemplate(parts, template_string[pos:], None)
+
+        var_end_idx = template_string.find(VAR_END, pos)
         if var_end_idx < 0:
-            raise TemplateError("Invalid syntax. Variable substitution braces not closed.")
+            return CompiledTemplate(
+                parts, "", "Invalid syntax. Variable substitution braces not closed."
+            )
 
+        # braces that are closed before they're opened leave an empty name
         var_name = template_string[var_start_idx + 2 : var_end_idx].strip()
-        if var_name not in variables:
-            raise TemplateError(f"Variable not defined: {var_name}")
+        parts.append((template_string[pos:var_start_idx], var_name))
+        pos = var_end_idx + 2
 
-        out += variables[var_name] or ""  # to account for None
-        template_string = template_string[var_end_idx + 2 :]
+    return CompiledTemplate(parts, "", None)
 
-    return out
+
+def safe_render_template(template_string: str, variables: Mapping[str, Optional[str]]) -> str:
+    return compile_template(template_string).render(variables)
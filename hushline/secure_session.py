@@ -1,43 +1,102 @@
+import base64
 import json
+import re
+import secrets
+import time
+from datetime import datetime, timedelta, timezone
+from functools import wraps
 from json import JSONDecodeError
+from typing import Any, Callable, NamedTuple
 
-from cryptography.fernet import Fernet, InvalidToken
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
 from flask import Flask, Request, Response
 from flask.sessions import SecureCookieSession, SessionInterface, SessionMixin
 
+from hushline.session_store import SessionStore
+
+
+class EncryptedSession(SecureCookieSession):
+    def __init__(self, initial: Any = None) -> None:
+        super().__init__(initial)
+        # the decrypted cookie and when it was encrypted, if it can be sent again as it is
+        self.loaded: bytes | None = None
+        self.issued_at = 0
+
+
+class _Fernets(NamedTuple):
+    config: str
+    current: Fernet
+    all: MultiFernet
+
+
+def _get_fernets(app: Flask) -> _Fernets | None:
+    if not (key := app.config.get("SESSION_FERNET_KEY")):
+        return None
+
+    # built once per app, but rebuilt if the key is changed
+    fernets: _Fernets | None = app.extensions.get("session_fernets")
+    if fernets is None or fernets.config != key:
+        keys = [Fernet(x.strip()) for x in key.split(",")]
+        fernets = _Fernets(key, keys[0], MultiFernet(keys))
+        app.extensions["session_fernets"] = fernets
+    return fernets
+
 
 class EncryptedSessionInterface(SessionInterface):
     """
     Config:
-    - SESSION_FERNET_KEY: string representing a Fernet key
+    - SESSION_FERNET_KEY: string representing a Fernet key, or comma separated keys to rotate
+      keys. Sessions are encrypted with the first one and can be decrypted with any of them.
+    - SESSION_REFRESH_THRESHOLD_SECONDS: how old the cookie of an unchanged session can get before
+      it's encrypted and sent again, extending the session. 0 refreshes it on every request.
     """
 
-    session_class = SecureCookieSession
+    session_class = EncryptedSession
 
-    def _get_fernet(self, app: Flask) -> Fernet | None:
-        if key := app.config.get("SESSION_FERNET_KEY"):
-            return Fernet(key)
-        return None
-
-    def open_session(self, app: Flask, request: Request) -> SecureCookieSession | None:
-        if not (fernet := self._get_fernet(app)):
+    def open_session(self, app: Flask, request: Request) -> EncryptedSession | None:
+        if not (fernets := _get_fernets(app)):
             return None
 
         if not (val := request.cookies.get(self.get_cookie_name(app))):
             return self.session_class()
 
         max_age = int(app.permanent_session_lifetime.total_seconds())
+        current_key = True
         try:
-            data = fernet.decrypt(val, ttl=max_age)
+            data = fernets.current.decrypt(val, ttl=max_age)
         except InvalidToken:
-            return self.session_class()
+            # sessions encrypted with an old key are re-encrypted with the current one
+            current_key = False
+            try:
+                data = fernets.all.decrypt(val, ttl=max_age)
+            except InvalidToken:
+                return self.session_class()
 
         try:
             decoded = json.loads(data)
         except JSONDecodeError:
             return self.session_class()
 
-        return self.session_class(decoded)
+        session = self.session_class(decoded)
+        if current_key:
+            session.loaded = data
+            # the token is verified, so its timestamp can be read without checking it again
+            session.issued_at = int.from_bytes(base64.urlsafe_b64decode(val)[1:9], "big")
+        return session
+
+    def _is_unchanged(self, app: Flask, session: SessionMixin, data: bytes) -> bool:
+        """
+        Whether the session's cookie can be left as it is: the session's content is the same as
+        the cookie's and the cookie isn't due to be refreshed.
+        """
+        if not isinstance(session, EncryptedSession) or session.loaded is None:
+            return False
+        age = time.time() - session.issued_at
+        # mutable values can be changed without marking the session as modified, so the content
+        # is compared instead
+        return age < app.config.get("SESSION_REFRESH_THRESHOLD_SECONDS", 0) and (
+            data == session.loaded
+        )
 
     def save_session(self, app: Flask, session: SessionMixin, response: Response) -> None:
         name = self.get_cookie_name(app)
@@ -72,11 +131,15 @@ class EncryptedSessionInterface(SessionInterface):
         if not self.should_set_cookie(app, session):
             return
 
+        data = json.dumps(dict(session)).encode("utf-8")
+        if self._is_unchanged(app, session, data):
+            return
+
         expires = self.get_expiration_time(app, session)
-        if not (fernet := self._get_fernet(app)):
+        if not (fernets := _get_fernets(app)):
             raise RuntimeError("Fernet key not set")
 
-        val = fernet.encrypt(json.dumps(dict(session)).encode("utf-8")).decode("utf-8")
+        val = fernets.current.encrypt(data).decode("utf-8")
         response.set_cookie(
             name,
             val,
@@ -89,3 +152,189 @@ class EncryptedSessionInterface(SessionInterface):
             samesite=samesite,
         )
         response.vary.add("Cookie")
+
+
+# session IDs are `secrets.token_urlsafe(SESSION_ID_BYTES)`
+SESSION_ID_BYTES = 32
+SESSION_ID_SYNTAX = re.compile(r"^[A-Za-z0-9_-]{43}$")
+# how long a replaced session ID keeps working, for requests that were already sent with it
+ROTATION_GRACE = timedelta(seconds=10)
+
+
+class LazySession(SecureCookieSession):
+    """
+    A session that's only read from its store the first time it's used, so requests that don't
+    use the session don't pay for loading and decrypting it.
+    """
+
+    def __init__(
+        self,
+        initial: Any = None,
+        sid: str | None = None,
+        loader: Callable[[], bytes | None] | None = None,
+    ) -> None:
+        super().__init__(initial)
+        self.sid = sid
+        self._loader = loader
+        # the session as it was stored, to tell whether it has changed
+        self.loaded_data: bytes | None = None
+        # whether the stored session was discarded, e.g. by logging out
+        self.cleared = False
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loader is None
+
+    def _load(self) -> None:
+        if self._loader is None:
+            return
+        loader, self._loader = self._loader, None
+        self.accessed = True
+        if (data := loader()) is None:
+            return
+        try:
+            decoded = json.loads(data)
+        except JSONDecodeError:
+            return
+        # loading doesn't modify the session, so this skips the update callback
+        dict.update(self, decoded)
+        self.loaded_data = data
+
+    def clear(self) -> None:
+        # there's no need to load a session that's being discarded
+        self._loader = None
+        self.cleared = True
+        super().clear()
+
+
+def _loads_first(name: str) -> Callable[..., Any]:
+    method = getattr(SecureCookieSession, name)
+
+    @wraps(method)
+    def wrapper(self: LazySession, *args: Any, **kwargs: Any) -> Any:
+        self._load()
+        return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+# every way of reading or changing the session loads it first
+for _name in [
+    "__contains__",
+    "__delitem__",
+    "__eq__",
+    "__getitem__",
+    "__ior__",
+    "__iter__",
+    "__len__",
+    "__or__",
+    "__repr__",
+    "__reversed__",
+    "__setitem__",
+    "copy",
+    "get",
+    "items",
+    "keys",
+    "pop",
+    "popitem",
+    "setdefault",
+    "update",
+    "values",
+]:
+    setattr(LazySession, _name, _loads_first(_name))
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """
+    Keeps sessions in a `SessionStore`, encrypted as by `EncryptedSessionInterface`, and only a
+    random session ID in the cookie. Requests that don't use the session don't load or decrypt
+    it, and unchanged sessions are only extended, see `SessionStore.touch`.
+
+    A session gets a new ID whenever its content changes, so that an ID can't be planted before a
+    login and used after it. Requests already sent with the old ID can use it for `ROTATION_GRACE`,
+    unless the session was cleared, e.g. by logging out.
+
+    Config:
+    - SESSION_FERNET_KEY: as for `EncryptedSessionInterface`
+    """
+
+    session_class = LazySession
+
+    def __init__(self, store: SessionStore) -> None:
+        self.store = store
+
+    def open_session(self, app: Flask, request: Request) -> LazySession | None:
+        if not (fernets := _get_fernets(app)):
+            return None
+
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if not sid or not SESSION_ID_SYNTAX.search(sid):
+            return self.session_class()
+
+        def load() -> bytes | None:
+            if (data := self.store.load(sid)) is None:
+                return None
+            try:
+                return fernets.all.decrypt(data)
+            except InvalidToken:
+                return None
+
+        return self.session_class(sid=sid, loader=load)
+
+    def _cookie_options(self, app: Flask) -> dict[str, Any]:
+        return {
+            "domain": self.get_cookie_domain(app),
+            "path": self.get_cookie_path(app),
+            "secure": self.get_cookie_secure(app),
+            "partitioned": self.get_cookie_partitioned(app),
+            "samesite": self.get_cookie_samesite(app),
+            "httponly": self.get_cookie_httponly(app),
+        }
+
+    def save_session(self, app: Flask, session: SessionMixin, response: Response) -> None:
+        if not isinstance(session, LazySession):
+            raise TypeError(f"Not a server-side session: {session!r}")
+
+        now = datetime.now(timezone.utc)
+        expires_at = now + app.permanent_session_lifetime
+
+        if not session.is_loaded:
+            # not used by this request, so it only needs extending
+            if session.sid:
+                self.store.touch(session.sid, expires_at)
+            return
+
+        name = self.get_cookie_name(app)
+        options = self._cookie_options(app)
+
+        # Add a "Vary: Cookie" header if the session was accessed at all.
+        if session.accessed:
+            response.vary.add("Cookie")
+
+        # If the session is emptied, delete it and remove the cookie.
+        if not session:
+            if session.sid:
+                self.store.delete(session.sid)
+            if session.sid or session.modified:
+                response.delete_cookie(name, **options)
+                response.vary.add("Cookie")
+            return
+
+        data = json.dumps(dict(session.items())).encode("utf-8")
+        if session.sid and data == session.loaded_data:
+            self.store.touch(session.sid, expires_at)
+            if not self.should_set_cookie(app, session):
+                return
+            sid = session.sid
+        else:
+            if not (fernets := _get_fernets(app)):
+                raise RuntimeError("Fernet key not set")
+            sid = secrets.token_urlsafe(SESSION_ID_BYTES)
+            self.store.save(sid, fernets.current.encrypt(data), expires_at)
+            if session.sid and session.cleared:
+                self.store.delete(session.sid)
+            elif session.sid:
+                self.store.expire(session.sid, now + ROTATION_GRACE)
+
+        response.set_cookie(name, sid, expires=self.get_expiration_time(app, session), **options)
+        response.vary.add("Cookie")
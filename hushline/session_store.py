@@ -0,0 +1,202 @@
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Mapping, Optional, Tuple
+
+from sqlalchemy.dialects.postgresql import insert
+
+from hushline.db import db
+from hushline.model import ServerSession
+
+# how often each worker process deletes expired sessions
+SWEEP_INTERVAL = 3600
+
+
+class SessionStore(ABC):
+    """
+    Where `ServerSideSessionInterface` keeps sessions: encrypted blobs keyed by a random ID, each
+    with an expiry.
+
+    Sessions are extended on every request that uses them, so `touch` collects the new expiries
+    and writes them in one batch every `touch_interval` seconds. A stored expiry can lag behind by
+    up to that long. Expired sessions are swept along with a batch, at most every
+    `SWEEP_INTERVAL` seconds.
+    """
+
+    def __init__(self, touch_interval: float = 60) -> None:
+        self.touch_interval = touch_interval
+        self._pending: dict[str, datetime] = {}
+        self._touched_at = time.monotonic()
+        self._swept_at = time.monotonic()
+        self._lock = Lock()
+
+    @abstractmethod
+    def _get(self, sid: str) -> Optional[Tuple[bytes, datetime]]:
+        """Return the session's data and stored expiry, expired or not"""
+
+    @abstractmethod
+    def _put(self, sid: str, data: bytes, expires_at: datetime) -> None:
+        """Create or replace the session"""
+
+    @abstractmethod
+    def _expire(self, sid: str, expires_at: datetime) -> None:
+        """Make the session expire at `expires_at` if it would expire later"""
+
+    @abstractmethod
+    def _delete(self, sid: str) -> None:
+        """Delete the session"""
+
+    @abstractmethod
+    def _extend(self, expiries: Mapping[str, datetime]) -> None:
+        """Make each session expire at its new expiry if it would expire sooner"""
+
+    @abstractmethod
+    def _sweep(self, now: datetime) -> int:
+        """Delete the sessions that have expired and return how many there were"""
+
+    def load(self, sid: str) -> Optional[bytes]:
+        if (entry := self._get(sid)) is None:
+            return None
+        data, expires_at = entry
+        with self._lock:
+            if (pending := self._pending.get(sid)) is not None:
+                expires_at = max(expires_at, pending)
+        if expires_at <= datetime.now(timezone.utc):
+            return None
+        return data
+
+    def save(self, sid: str, data: bytes, expires_at: datetime) -> None:
+        with self._lock:
+            self._pending.pop(sid, None)
+        self._put(sid, data, expires_at)
+
+    def expire(self, sid: str, expires_at: datetime) -> None:
+        with self._lock:
+            self._pending.pop(sid, None)
+        self._expire(sid, expires_at)
+
+    def delete(self, sid: str) -> None:
+        with self._lock:
+            self._pending.pop(sid, None)
+        self._delete(sid)
+
+    def touch(self, sid: str, expires_at: datetime) -> None:
+        with self._lock:
+            self._pending[sid] = expires_at
+            now = time.monotonic()
+            if now - self._touched_at < self.touch_interval:
+                return
+            pending, self._pending = self._pending, {}
+            self._touched_at = now
+            sweep = now - self._swept_at >= SWEEP_INTERVAL
+            if sweep:
+                self._swept_at = now
+
+        self._extend(pending)
+        if sweep:
+            self.sweep()
+
+    def flush(self) -> None:
+        """Write the collected expiries now"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._touched_at = time.monotonic()
+        if pending:
+            self._extend(pending)
+
+    def sweep(self) -> int:
+        return self._sweep(datetime.now(timezone.utc))
+
+
+class MemorySessionStore(SessionStore):
+    """
+    Keeps sessions in the worker process's memory. For tests and development only, since each
+    worker process would have its own sessions.
+    """
+
+    def __init__(self, touch_interval: float = 60) -> None:
+        super().__init__(touch_interval)
+        self.sessions: dict[str, Tuple[bytes, datetime]] = {}
+
+    def _get(self, sid: str) -> Optional[Tuple[bytes, datetime]]:
+        return self.sessions.get(sid)
+
+    def _put(self, sid: str, data: bytes, expires_at: datetime) -> None:
+        self.sessions[sid] = (data, expires_at)
+
+    def _expire(self, sid: str, expires_at: datetime) -> None:
+        if (entry := self.sessions.get(sid)) is not None:
+            self.sessions[sid] = (entry[0], min(entry[1], expires_at))
+
+    def _delete(self, sid: str) -> None:
+        self.sessions.pop(sid, None)
+
+    def _extend(self, expiries: Mapping[str, datetime]) -> None:
+        for sid, expires_at in expiries.items():
+            if (entry := self.sessions.get(sid)) is not None:
+                self.sessions[sid] = (entry[0], max(entry[1], expires_at))
+
+    def _sweep(self, now: datetime) -> int:
+        expired = [sid for sid, (_, expires_at) in self.sessions.items() if expires_at <= now]
+        for sid in expired:
+            del self.sessions[sid]
+        return len(expired)
+
+
+class DatabaseSessionStore(SessionStore):
+    """
+    Keeps sessions in the `server_sessions` table. Statements run on their own connection so that
+    saving the session never commits the request's database session.
+    """
+
+    def _get(self, sid: str) -> Optional[Tuple[bytes, datetime]]:
+        with db.engine.connect() as conn:
+            row = conn.execute(
+                db.select(ServerSession.data, ServerSession.expires_at).filter(
+                    ServerSession.id == sid
+                )
+            ).one_or_none()
+        return None if row is None else (row.data, row.expires_at)
+
+    def _put(self, sid: str, data: bytes, expires_at: datetime) -> None:
+        statement = insert(ServerSession).values(id=sid, data=data, expires_at=expires_at)
+        with db.engine.begin() as conn:
+            conn.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[ServerSession.id],
+                    set_={"data": statement.excluded.data, "expires_at": expires_at},
+                )
+            )
+
+    def _expire(self, sid: str, expires_at: datetime) -> None:
+        with db.engine.begin() as conn:
+            conn.execute(
+                db.update(ServerSession)
+                .filter(ServerSession.id == sid)
+                .values(expires_at=db.func.least(ServerSession.expires_at, expires_at))
+            )
+
+    def _delete(self, sid: str) -> None:
+        with db.engine.begin() as conn:
+            conn.execute(db.delete(ServerSession).filter(ServerSession.id == sid))
+
+    def _extend(self, expiries: Mapping[str, datetime]) -> None:
+        # one statement for the whole batch
+        values = db.values(
+            db.column("id", db.String),
+            db.column("expires_at", db.DateTime(timezone=True)),
+            name="expiries",
+        ).data(list(expiries.items()))
+        with db.engine.begin() as conn:
+            conn.execute(
+                db.update(ServerSession)
+                .filter(ServerSession.id == values.c.id)
+                .values(expires_at=db.func.greatest(ServerSession.expires_at, values.c.expires_at))
+            )
+
+    def _sweep(self, now: datetime) -> int:
+        with db.engine.begin() as conn:
+            return conn.execute(
+                db.delete(ServerSession).filter(ServerSession.expires_at <= now)
+            ).rowcount
@@ -1,8 +1,8 @@
 from flask import (
     Blueprint,
     current_app,
+    g,
     render_template,
-    session,
 )
 
 from hushline.auth import admin_authentication_required
@@ -14,7 +14,7 @@ def register_admin_routes(bp: Blueprint) -> None:
     @bp.route("/admin")
     @admin_authentication_required
     def admin() -> str:
-        user = db.session.scalars(db.select(User).filter_by(id=session["user_id"])).one()
+        user = g.user
 
         all_users = list(
             db.session.scalars(db.select(User).join(Username).order_by(Username._username)).all()
@@ -4,6 +4,7 @@ from flask import (
     Blueprint,
     abort,
     flash,
+    g,
     redirect,
     render_template,
     request,
@@ -12,10 +13,10 @@ from flask import (
 )
 from werkzeug.wrappers.response import Response
 
+from hushline import verification
 from hushline.auth import authentication_required
 from hushline.db import db
 from hushline.model import (
-    User,
     Username,
 )
 from hushline.settings.common import (
@@ -35,7 +36,7 @@ def register_aliases_routes(bp: Blueprint) -> None:
     @bp.route("/aliases", methods=["GET", "POST"])
     @authentication_required
     def aliases() -> Response | Tuple[str, int]:
-        user = db.session.scalars(db.select(User).filter_by(id=session["user_id"])).one()
+        user = g.user
         new_alias_form = NewAliasForm()
 
         status_code = 200
@@ -61,7 +62,7 @@ def register_aliases_routes(bp: Blueprint) -> None:
 
     @bp.route("/alias/<int:username_id>", methods=["GET", "POST"])
     @authentication_required
-    async def alias(username_id: int) -> Response | Tuple[str, int]:
+    def alias(username_id: int) -> Response | Tuple[str, int]:
         alias = db.session.scalars(
             db.select(Username).filter_by(
                 id=username_id, user_id=session["user_id"], is_primary=False
@@ -76,7 +77,7 @@ def register_aliases_routes(bp: Blueprint) -> None:
 
         status_code = 200
         if request.method == "POST":
-            res = await handle_profile_post(
+            res = handle_profile_post(
                 display_name_form, directory_visibility_form, profile_form, alias
             )
             if res:
@@ -93,6 +94,7 @@ def register_aliases_routes(bp: Blueprint) -> None:
             profile_form=profile_form,
             field_forms=field_forms,
             new_field_form=new_field_form,
+            verifying_fields=verification.pending_fields(alias),
         ), status_code
 
     @bp.route("/alias/<int:username_id>/fields", methods=["GET", "POST"])
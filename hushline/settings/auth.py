@@ -2,17 +2,13 @@ from typing import Tuple
 
 from flask import (
     Blueprint,
+    g,
     render_template,
     request,
-    session,
 )
 from werkzeug.wrappers.response import Response
 
 from hushline.auth import authentication_required
-from hushline.db import db
-from hushline.model import (
-    User,
-)
 from hushline.settings.common import (
     form_error,
     handle_change_password_form,
@@ -28,7 +24,7 @@ def register_auth_routes(bp: Blueprint) -> None:
     @bp.route("/auth", methods=["GET", "POST"])
     @authentication_required
     def auth() -> Response | Tuple[str, int]:
-        user = db.session.scalars(db.select(User).filter_by(id=session["user_id"])).one()
+        user = g.user
         change_username_form = ChangeUsernameForm()
         change_password_form = ChangePasswordForm()
 
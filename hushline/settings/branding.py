@@ -5,9 +5,9 @@ from flask import (
     abort,
     current_app,
     flash,
+    g,
     render_template,
     request,
-    session,
 )
 from flask_wtf import FlaskForm
 from werkzeug.wrappers.response import Response
@@ -19,7 +19,6 @@ from hushline.db import db
 from hushline.forms import DisplayNoneButton
 from hushline.model import (
     OrganizationSetting,
-    User,
 )
 from hushline.settings.common import (
     form_error,
@@ -46,7 +45,7 @@ def register_branding_routes(bp: Blueprint) -> None:
     @bp.route("/branding", methods=["GET", "POST"])
     @admin_authentication_required
     def branding() -> Response | Tuple[str, int]:
-        user = db.session.scalars(db.select(User).filter_by(id=session["user_id"])).one()
+        user = g.user
 
         update_directory_text_form = UpdateDirectoryTextForm(
             markdown=OrganizationSetting.fetch_one(OrganizationSetting.DIRECTORY_INTRO_TEXT)
@@ -76,6 +75,7 @@ def register_branding_routes(bp: Blueprint) -> None:
                     db.session.commit()
                     flash("👍 Directory intro text updated")
                 else:
+                    OrganizationSetting.invalidate_cache()
                     row_count = db.session.execute(
                         db.delete(OrganizationSetting).where(
                             OrganizationSetting.key == OrganizationSetting.DIRECTORY_INTRO_TEXT
@@ -107,6 +107,7 @@ def register_branding_routes(bp: Blueprint) -> None:
                 delete_brand_logo_form.submit.name in request.form
                 and delete_brand_logo_form.validate()
             ):
+                OrganizationSetting.invalidate_cache()
                 row_count = db.session.execute(
                     db.delete(OrganizationSetting).where(
                         OrganizationSetting.key == OrganizationSetting.BRAND_LOGO
@@ -143,6 +144,7 @@ def register_branding_routes(bp: Blueprint) -> None:
                 db.session.commit()
                 flash("👍 Brand app name updated successfully.")
             elif set_homepage_username_form.delete_submit.name in request.form:
+                OrganizationSetting.invalidate_cache()
                 row_count = db.session.execute(
                     db.delete(OrganizationSetting).filter_by(
                         key=OrganizationSetting.HOMEPAGE_USER_NAME
@@ -174,6 +176,7 @@ def register_branding_routes(bp: Blueprint) -> None:
                     db.session.commit()
                     flash("👍 Profile header template updated successfully")
                 else:
+                    OrganizationSetting.invalidate_cache()
                     row_count = db.session.execute(
                         db.delete(OrganizationSetting).filter_by(
                             key=OrganizationSetting.BRAND_PROFILE_HEADER_TEMPLATE
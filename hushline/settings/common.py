@@ -1,9 +1,6 @@
-import asyncio
 from hmac import compare_digest as bytes_are_equal
 from typing import Optional
 
-import aiohttp
-from bs4 import BeautifulSoup
 from flask import (
     current_app,
     flash,
@@ -17,6 +14,7 @@ from sqlalchemy.exc import IntegrityError
 from werkzeug.wrappers.response import Response
 from wtforms import Field
 
+from hushline import verification
 from hushline.crypto import is_valid_pgp_key
 from hushline.db import db
 from hushline.model import (
@@ -69,38 +67,7 @@ def set_input_disabled(input_field: Field, disabled: bool = True) -> None:
         unset_field_attribute(input_field, "disabled")
 
 
-# Define the async function for URL verification
-async def verify_url(
-    session: aiohttp.ClientSession, username: Username, i: int, url_to_verify: str, profile_url: str
-) -> None:
-    current_app.logger.debug(
-        f"Verifying URL: {url_to_verify!r}. Expecting to find profile URL: {profile_url!r}"
-    )
-
-    # ensure that regardless of what caller sets this field to, we force it to be false
-    setattr(username, f"extra_field_verified{i}", False)
-    try:
-        async with session.get(url_to_verify, timeout=aiohttp.ClientTimeout(total=5)) as response:
-            response.raise_for_status()
-            html_content = await response.text()
-    except aiohttp.ClientError as e:
-        current_app.logger.error(f"Error fetching URL {url_to_verify!r} for field {i}: {e}")
-        return
-
-    current_app.logger.debug(f"Successfully fetched URL {url_to_verify!r}")
-    soup = BeautifulSoup(html_content, "html.parser")
-    for link in soup.find_all("a"):
-        href = link.get("href")
-        rel = link.get("rel", [])
-        if href == profile_url and "me" in rel:
-            setattr(username, f"extra_field_verified{i}", True)
-            current_app.logger.debug(f"Verified URL {url_to_verify!r}")
-            break
-
-    current_app.logger.debug(f"Failed to verify URL {url_to_verify!r}")
-
-
-async def handle_update_bio(username: Username, form: ProfileForm) -> Response:
+def handle_update_bio(username: Username, form: ProfileForm) -> Response:
     username.bio = form.bio.data.strip()
 
     # Define base_url from the environment or config
@@ -111,36 +78,26 @@ async def handle_update_bio(username: Username, form: ProfileForm) -> Response:
         _scheme=current_app.config["PREFERRED_URL_SCHEME"],
     )
 
-    async with aiohttp.ClientSession() as client_session:
-        tasks = []
-        for i in range(1, 5):
-            # always unverify all fields first
-            setattr(username, f"extra_field_verified{i}", False)
-
-            label_field = getattr(form, f"extra_field_label{i}")
-            label = (getattr(label_field, "data") or "").strip() or None
-            setattr(username, f"extra_field_label{i}", label)
-
-            value_field = getattr(form, f"extra_field_value{i}")
-            value = (getattr(value_field, "data") or "").strip() or None
-            setattr(username, f"extra_field_value{i}", value)
-
-            # Verify the URL only if it starts with "https://"
-            if value and (
-                value.startswith("https://")
-                or (current_app.config["TESTING"] and value.startswith("http://"))
-            ):
-                task = verify_url(client_session, username, i, value, profile_url)
-                tasks.append(task)
-
-        if tasks:
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            for result in results:
-                if isinstance(result, Exception):
-                    if current_app.config["TESTING"]:
-                        raise result
-                    else:
-                        current_app.logger.warning(f"Exception raised verifying URL: {result}")
+    # links are verified by the verification worker, see `hushline.verification`
+    verification.discard_pending(username)
+    for i in range(1, 5):
+        # always unverify all fields first
+        setattr(username, f"extra_field_verified{i}", False)
+
+        label_field = getattr(form, f"extra_field_label{i}")
+        label = (getattr(label_field, "data") or "").strip() or None
+        setattr(username, f"extra_field_label{i}", label)
+
+        value_field = getattr(form, f"extra_field_value{i}")
+        value = (getattr(value_field, "data") or "").strip() or None
+        setattr(username, f"extra_field_value{i}", value)
+
+        # Verify the URL only if it starts with "https://"
+        if value and (
+            value.startswith("https://")
+            or (current_app.config["TESTING"] and value.startswith("http://"))
+        ):
+            verification.enqueue_verification(username, i, value, profile_url)
 
     db.session.commit()
     flash("👍 Bio and fields updated successfully.")
@@ -175,6 +132,16 @@ def handle_change_username_form(username: Username, form: ChangeUsernameForm) ->
         flash("💔 This username is already taken.")
     else:
         username.username = new_username
+        # verified links have to link to the new profile URL
+        verification.profile_url_changed(
+            username,
+            url_for(
+                "profile",
+                username=username._username,
+                _external=True,
+                _scheme=current_app.config["PREFERRED_URL_SCHEME"],
+            ),
+        )
         db.session.commit()
 
         session["username"] = new_username
@@ -279,7 +246,7 @@ def create_profile_forms(
     return display_name_form, directory_visibility_form, profile_form
 
 
-async def handle_profile_post(
+def handle_profile_post(
     display_name_form: DisplayNameForm,
     directory_visibility_form: DirectoryVisibilityForm,
     profile_form: ProfileForm,
@@ -296,7 +263,7 @@ async def handle_profile_post(
     ):
         return handle_update_directory_visibility(username, directory_visibility_form)
     elif profile_form.submit.name in request.form and profile_form.validate():
-        return await handle_update_bio(username, profile_form)
+        return handle_update_bio(username, profile_form)
 
     form_error()
     return None
@@ -364,6 +331,8 @@ def handle_field_post(username: Username) -> Response | None:
 
             db.session.delete(field_definition)
             db.session.commit()
+            # profiles always have fields, the defaults come back if the last one was deleted
+            username.create_default_field_defs()
             flash("Field deleted.")
             return redirect_to_self()
 
@@ -2,12 +2,14 @@ from flask import (
     Blueprint,
     abort,
     flash,
+    g,
     redirect,
     session,
     url_for,
 )
 from werkzeug.wrappers.response import Response
 
+from hushline import directory
 from hushline.auth import authentication_required
 from hushline.db import db
 from hushline.model import (
@@ -16,6 +18,7 @@ from hushline.model import (
     FieldValue,
     Message,
     MessageStatusText,
+    OutboxNotification,
     User,
     Username,
 )
@@ -31,7 +34,7 @@ def register_delete_account_routes(bp: Blueprint) -> None:
             return redirect(url_for("login"))
 
         with db.session.begin_nested():
-            user = db.session.get(User, user_id)
+            user = g.user
             if user:
                 if user.is_admin:
                     admin_count = db.session.query(User).filter_by(is_admin=True).count()
@@ -67,8 +70,10 @@ def register_delete_account_routes(bp: Blueprint) -> None:
                 )
                 db.session.execute(db.delete(MessageStatusText).filter_by(user_id=user.id))
                 db.session.execute(db.delete(AuthenticationLog).filter_by(user_id=user.id))
+                db.session.execute(db.delete(OutboxNotification).filter_by(user_id=user.id))
 
                 # Delete username and finally the user
+                directory.invalidate_cache()
                 db.session.execute(db.delete(Username).filter_by(user_id=user.id))
                 db.session.delete(user)
                 db.session.commit()
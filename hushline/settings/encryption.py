@@ -2,15 +2,13 @@ from typing import Tuple
 
 from flask import (
     Blueprint,
+    g,
     render_template,
     request,
-    session,
 )
 from werkzeug.wrappers.response import Response
 
 from hushline.auth import authentication_required
-from hushline.db import db
-from hushline.model import User
 from hushline.settings.common import (
     form_error,
     handle_pgp_key_form,
@@ -25,7 +23,7 @@ def register_encryption_routes(bp: Blueprint) -> None:
     @bp.route("/encryption", methods=["GET", "POST"])
     @authentication_required
     def encryption() -> Response | Tuple[str, int]:
-        user = db.session.scalars(db.select(User).filter_by(id=session["user_id"])).one()
+        user = g.user
 
         pgp_proton_form = PGPProtonForm()
         pgp_key_form = PGPKeyForm(pgp_key=user.pgp_key)
@@ -5,10 +5,10 @@ from flask import (
     Blueprint,
     current_app,
     flash,
+    g,
     redirect,
     render_template,
     request,
-    session,
     url_for,
 )
 from werkzeug.wrappers.response import Response
@@ -17,7 +17,6 @@ from hushline.auth import admin_authentication_required
 from hushline.db import db
 from hushline.model import (
     OrganizationSetting,
-    User,
 )
 from hushline.settings.common import (
     form_error,
@@ -34,7 +33,7 @@ def register_guidance_routes(bp: Blueprint) -> None:
     @bp.route("/guidance", methods=["GET", "POST"])
     @admin_authentication_required
     def guidance() -> Tuple[str, int] | Response:
-        user = db.session.scalars(db.select(User).filter_by(id=session["user_id"])).one()
+        user = g.user
 
         show_user_guidance = OrganizationSetting.fetch_one(OrganizationSetting.GUIDANCE_ENABLED)
 
@@ -4,9 +4,9 @@ from flask import (
     Blueprint,
     current_app,
     flash,
+    g,
     render_template,
     request,
-    session,
 )
 from flask_wtf import FlaskForm
 from werkzeug.wrappers.response import Response
@@ -38,6 +38,11 @@ class ToggleEncryptEntireBodyForm(FlaskForm):
     submit = SubmitField("Submit", name="toggle_encrypt_entire_body", widget=DisplayNoneButton())
 
 
+class ToggleDigestForm(FlaskForm):
+    digest = BooleanField("Send Notifications as a Digest", validators=[OptionalField()])
+    submit = SubmitField("Submit", name="toggle_digest", widget=DisplayNoneButton())
+
+
 def handle_email_forwarding_form(user: User, form: EmailForwardingForm) -> Optional[Response]:
     if form.email_address.data and not user.pgp_key:
         flash("⛔️ Email forwarding requires a configured PGP key")
@@ -97,11 +102,12 @@ def register_notifications_routes(bp: Blueprint) -> None:
     @bp.route("/notifications", methods=["GET", "POST"])
     @authentication_required
     def notifications() -> Response | Tuple[str, int]:
-        user = db.session.scalars(db.select(User).filter_by(id=session["user_id"])).one()
+        user = g.user
 
         toggle_notifications_form = ToggleNotificationsForm()
         toggle_include_content_form = ToggleIncludeContentForm()
         toggle_encrypt_entire_body_form = ToggleEncryptEntireBodyForm()
+        toggle_digest_form = ToggleDigestForm()
 
         email_forwarding_form = EmailForwardingForm(
             data=dict(
@@ -151,6 +157,14 @@ def register_notifications_routes(bp: Blueprint) -> None:
                 else:
                     flash("Only encrypted fields of email messages will be encrypted")
                 return redirect_to_self()
+            elif toggle_digest_form.submit.name in request.form and toggle_digest_form.validate():
+                user.email_digest_enabled = toggle_digest_form.digest.data
+                db.session.commit()
+                if toggle_digest_form.digest.data:
+                    flash("New message notifications will be sent as a digest")
+                else:
+                    flash("A notification will be sent for every new message")
+                return redirect_to_self()
             elif (
                 email_forwarding_form.submit.name in request.form
                 and email_forwarding_form.validate()
@@ -176,6 +190,7 @@ def register_notifications_routes(bp: Blueprint) -> None:
         toggle_notifications_form.enable_email_notifications.data = user.enable_email_notifications
         toggle_include_content_form.include_content.data = user.email_include_message_content
         toggle_encrypt_entire_body_form.encrypt_entire_body.data = user.email_encrypt_entire_body
+        toggle_digest_form.digest.data = user.email_digest_enabled
 
         return render_template(
             "settings/notifications.html",
@@ -185,5 +200,8 @@ def register_notifications_routes(bp: Blueprint) -> None:
             toggle_notifications_form=toggle_notifications_form,
             toggle_include_content_form=toggle_include_content_form,
             toggle_encrypt_entire_body_form=toggle_encrypt_entire_body_form,
+            toggle_digest_form=toggle_digest_form,
+            digest_interval=current_app.config["NOTIFICATIONS_DIGEST_INTERVAL_SECONDS"],
+            digest_max_messages=current_app.config["NOTIFICATIONS_DIGEST_MAX_MESSAGES"],
             email_forwarding_form=email_forwarding_form,
         ), status_code
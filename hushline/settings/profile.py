@@ -3,19 +3,18 @@ from typing import Tuple
 from flask import (
     Blueprint,
     abort,
+    g,
     redirect,
     render_template,
     request,
-    session,
     url_for,
 )
 from werkzeug.wrappers.response import Response
 
+from hushline import verification
 from hushline.auth import authentication_required
-from hushline.db import db
 from hushline.model import (
     Tier,
-    User,
 )
 from hushline.settings.common import (
     build_field_forms,
@@ -28,8 +27,8 @@ from hushline.settings.common import (
 def register_profile_routes(bp: Blueprint) -> None:
     @bp.route("/profile", methods=["GET", "POST"])
     @authentication_required
-    async def profile() -> Response | Tuple[str, int]:
-        user = db.session.scalars(db.select(User).filter_by(id=session["user_id"])).one()
+    def profile() -> Response | Tuple[str, int]:
+        user = g.user
         username = user.primary_username
 
         if username is None:
@@ -40,7 +39,7 @@ def register_profile_routes(bp: Blueprint) -> None:
 
         status_code = 200
         if request.method == "POST":
-            res = await handle_profile_post(
+            res = handle_profile_post(
                 display_name_form, directory_visibility_form, profile_form, username
             )
             if res:
@@ -67,12 +66,13 @@ def register_profile_routes(bp: Blueprint) -> None:
             field_forms=field_forms,
             new_field_form=new_field_form,
             business_tier_display_price=business_tier_display_price,
+            verifying_fields=verification.pending_fields(username),
         ), status_code
 
     @bp.route("/profile/fields", methods=["GET", "POST"])
     @authentication_required
     def profile_fields() -> Response | Tuple[str, int]:
-        user = db.session.scalars(db.select(User).filter_by(id=session["user_id"])).one()
+        user = g.user
 
         if not user.fields_enabled:
             return abort(401)
@@ -1,26 +1,30 @@
-import requests
+import asyncio
+
+import aiohttp
 from flask import (
     Blueprint,
     current_app,
     flash,
+    g,
     redirect,
-    session,
     url_for,
 )
 from werkzeug.wrappers.response import Response
 
 from hushline.auth import authentication_required
 from hushline.db import db
-from hushline.model import User
+from hushline.http_client import get_http_client
 from hushline.settings.common import is_valid_pgp_key
 from hushline.settings.forms import PGPProtonForm
 
+PROTON_PKS_URL = "https://mail-api.proton.me/pks/lookup"
+
 
 def register_proton_routes(bp: Blueprint) -> None:
     @bp.route("/update_pgp_key_proton", methods=["POST"])
     @authentication_required
     def update_pgp_key_proton() -> Response | str:
-        user = db.session.scalars(db.select(User).filter_by(id=session["user_id"])).one()
+        user = g.user
         form = PGPProtonForm()
 
         if not form.validate_on_submit():
@@ -31,17 +35,13 @@ def register_proton_routes(bp: Blueprint) -> None:
 
         # Try to fetch the PGP key from ProtonMail
         try:
-            resp = requests.get(
-                # TODO email needs to be URL escaped
-                f"https://mail-api.proton.me/pks/lookup?op=get&search={email}",
-                timeout=5,
-            )
-        except requests.exceptions.RequestException as e:
+            resp = get_http_client().get_text(PROTON_PKS_URL, params={"op": "get", "search": email})
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             current_app.logger.error(f"Error fetching PGP key from Proton Mail: {e}")
             flash("⛔️ Error fetching PGP key from Proton Mail.")
             return redirect(url_for(".notifications"))
 
-        if resp.status_code == 200:  # noqa: PLR2004
+        if resp.status == 200:  # noqa: PLR2004
             pgp_key = resp.text
             if is_valid_pgp_key(pgp_key):
                 user.pgp_key = pgp_key
@@ -6,6 +6,7 @@ import qrcode
 from flask import (
     Blueprint,
     flash,
+    g,
     redirect,
     render_template,
     request,
@@ -16,7 +17,6 @@ from werkzeug.wrappers.response import Response
 
 from hushline.auth import authentication_required
 from hushline.db import db
-from hushline.model import User
 from hushline.routes import (
     TwoFactorForm,
 )
@@ -30,7 +30,7 @@ def register_2fa_routes(bp: Blueprint) -> None:
         if not user_id:
             return redirect(url_for("login"))
 
-        user = db.session.get(User, user_id)
+        user = g.user
         if user and user.totp_secret:
             return redirect(url_for(".disable_2fa"))
 
@@ -39,7 +39,7 @@ def register_2fa_routes(bp: Blueprint) -> None:
     @bp.route("/enable-2fa", methods=["GET", "POST"])
     @authentication_required
     def enable_2fa() -> Response | str:
-        user = db.session.get(User, session.get("user_id"))
+        user = g.user
         form = TwoFactorForm()
 
         if form.validate_on_submit():
@@ -88,7 +88,7 @@ def register_2fa_routes(bp: Blueprint) -> None:
         if not user_id:
             return redirect(url_for("login"))
 
-        user = db.session.get(User, user_id)
+        user = g.user
         if user:
             user.totp_secret = None
         db.session.commit()
@@ -103,7 +103,7 @@ def register_2fa_routes(bp: Blueprint) -> None:
     @bp.route("/verify-2fa-setup", methods=["POST"])
     @authentication_required
     def verify_2fa_setup() -> Response | str:
-        user = db.session.get(User, session["user_id"])
+        user = g.user
         if not user:
             return redirect(url_for("login"))
 
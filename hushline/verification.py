@@ -0,0 +1,399 @@
+import asyncio
+import codecs
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from html.parser import HTMLParser
+from http import HTTPStatus
+from typing import Literal, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+import aiohttp
+import sqlalchemy as sa
+from flask import Flask, current_app
+from sqlalchemy.dialects.postgresql import insert
+
+from hushline.cache import LRUCache, lazy_cache
+from hushline.db import db
+from hushline.http_client import new_session
+from hushline.model import UrlVerification, Username, VerifiedLink
+
+# pages are only read this far looking for the link back to the profile
+MAX_PAGE_BYTES = 1024 * 1024
+CHUNK_SIZE = 16 * 1024
+BATCH_SIZE = 16
+
+# Links that verified are cached by the worker, keyed by (URL, profile URL), so that saving a
+# profile again doesn't fetch them again. Failures aren't cached so that fixing the page, or the
+# site coming back, and saving again verifies the link right away.
+RESULT_CACHE_SIZE = 1024
+RESULT_CACHE_TTL = 600
+
+# Verified links are checked again once they're older than RECHECK_INTERVAL. Each worker checks
+# at most RECHECK_BATCH_SIZE links every RECHECK_PERIOD seconds, and at most RECHECK_PER_HOST
+# links on the same host per batch, one after the other with HOST_DELAY seconds in between.
+RECHECK_INTERVAL = timedelta(days=7)
+RECHECK_PERIOD = 60
+RECHECK_BATCH_SIZE = 32
+RECHECK_PER_HOST = 2
+HOST_DELAY = 1.0
+# A link is unverified after this many checks in a row fail to fetch its page. After each failure
+# it's tried again sooner than usual, after RECHECK_RETRY_DELAY doubled for each failure so far.
+MAX_RECHECK_FAILURES = 3
+RECHECK_RETRY_DELAY = timedelta(hours=1)
+
+
+def _result_cache() -> LRUCache[Tuple[str, str], Literal[True]]:
+    return lazy_cache(
+        current_app.extensions, "url_verification_cache", RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL
+    )
+
+
+class RelMeParser(HTMLParser):
+    """
+    Parses a page as it's read, looking for `<a rel="me">` linking to `profile_url`.
+    """
+
+    def __init__(self, profile_url: str) -> None:
+        super().__init__()
+        self.profile_url = profile_url
+        self.found = False
+
+    def handle_starttag(self, tag: str, attrs: list[Tuple[str, str | None]]) -> None:
+        if tag != "a" or self.found:
+            return
+        attributes = dict(attrs)
+        if (
+            attributes.get("href") == self.profile_url
+            and "me" in (attributes.get("rel") or "").split()
+        ):
+            self.found = True
+
+
+def _decoder(charset: str | None) -> codecs.IncrementalDecoder:
+    # the charset comes from the page, and codecs also has ones like base64 that aren't text
+    try:
+        info = codecs.lookup(charset or "utf-8")
+    except LookupError:
+        info = codecs.lookup("utf-8")
+    if not info._is_text_encoding:  # type: ignore[attr-defined]
+        info = codecs.lookup("utf-8")
+    return info.incrementaldecoder(errors="replace")
+
+
+class LinkCheck(NamedTuple):
+    # None if the page couldn't be fetched
+    verified: Optional[bool]
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+async def check_link(
+    session: aiohttp.ClientSession,
+    url_to_verify: str,
+    profile_url: str,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+) -> LinkCheck:
+    """
+    Check whether the page at `url_to_verify` has a `rel="me"` link to `profile_url`. The page is
+    streamed and parsed as it's read, stopping at the first match or after `MAX_PAGE_BYTES`.
+
+    `etag` and `last_modified` are the validators from when the page was last verified. If given,
+    the request is conditional and an unmodified page is still verified without reading it.
+    """
+    current_app.logger.debug(
+        f"Verifying URL: {url_to_verify!r}. Expecting to find profile URL: {profile_url!r}"
+    )
+
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    parser = RelMeParser(profile_url)
+    try:
+        async with session.get(url_to_verify, headers=headers) as response:
+            if response.status == HTTPStatus.NOT_MODIFIED and headers:
+                current_app.logger.debug(f"URL {url_to_verify!r} not modified")
+                return LinkCheck(True, etag, last_modified)
+            if response.status == HTTPStatus.TOO_MANY_REQUESTS or response.status >= 500:  # noqa: PLR2004
+                current_app.logger.error(
+                    f"Error fetching URL {url_to_verify!r}: status {response.status}"
+                )
+                return LinkCheck(None)
+            response.raise_for_status()
+            decoder = _decoder(response.charset)
+            remaining = MAX_PAGE_BYTES
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                parser.feed(decoder.decode(chunk[:remaining]))
+                remaining -= len(chunk)
+                if parser.found or remaining <= 0:
+                    break
+    except aiohttp.ClientResponseError as e:
+        current_app.logger.error(f"Error fetching URL {url_to_verify!r}: {e}")
+        return LinkCheck(False)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        current_app.logger.error(f"Error fetching URL {url_to_verify!r}: {e}")
+        return LinkCheck(None)
+    # HTMLParser raises AssertionError on some malformed markup
+    except (UnicodeError, ValueError, AssertionError) as e:
+        current_app.logger.error(f"Error reading URL {url_to_verify!r}: {e}")
+        return LinkCheck(False)
+
+    if parser.found:
+        current_app.logger.debug(f"Verified URL {url_to_verify!r}")
+    else:
+        current_app.logger.debug(f"Failed to verify URL {url_to_verify!r}")
+    return LinkCheck(
+        parser.found, response.headers.get("ETag"), response.headers.get("Last-Modified")
+    )
+
+
+async def verify_url(session: aiohttp.ClientSession, url_to_verify: str, profile_url: str) -> bool:
+    """Whether the page at `url_to_verify` has a `rel="me"` link to `profile_url`"""
+    return (await check_link(session, url_to_verify, profile_url)).verified is True
+
+
+def discard_pending(username: Username) -> None:
+    """
+    Drop the username's queued verifications and scheduled checks, e.g. because its links are
+    being replaced. Ones that the worker is already checking are left to it, and it ignores their
+    results if the link has changed.
+    """
+    pending = (
+        db.select(UrlVerification.id)
+        .filter_by(username_id=username.id)
+        .with_for_update(skip_locked=True)
+    )
+    db.session.execute(db.delete(UrlVerification).where(UrlVerification.id.in_(pending)))
+    scheduled = (
+        db.select(VerifiedLink.id)
+        .filter_by(username_id=username.id)
+        .with_for_update(skip_locked=True)
+    )
+    db.session.execute(db.delete(VerifiedLink).where(VerifiedLink.id.in_(scheduled)))
+
+
+def enqueue_verification(username: Username, field_index: int, url: str, profile_url: str) -> None:
+    """
+    Queue the link in the username's extra field `field_index` to be verified. The job is added to
+    the current session so it's committed together with the link.
+    """
+    db.session.add(UrlVerification(username.id, field_index, url, profile_url))
+
+
+def profile_url_changed(username: Username, profile_url: str) -> None:
+    """
+    Check the username's verified links again soon, now that they need to link to `profile_url`.
+    """
+    db.session.execute(
+        db.update(VerifiedLink)
+        .filter_by(username_id=username.id)
+        .values(
+            profile_url=profile_url,
+            checked_at=datetime.now(timezone.utc) - RECHECK_INTERVAL,
+            etag=None,
+            last_modified=None,
+        )
+    )
+
+
+def pending_fields(username: Username) -> set[int]:
+    """The indices of the username's extra fields that are waiting to be verified"""
+    return set(
+        db.session.scalars(
+            db.select(UrlVerification.field_index).filter_by(username_id=username.id).distinct()
+        )
+    )
+
+
+async def _verify_all(
+    session: aiohttp.ClientSession, links: Sequence[Tuple[str, str]]
+) -> dict[Tuple[str, str], bool]:
+    cache = _result_cache()
+    results: dict[Tuple[str, str], bool] = {}
+    for link in links:
+        if cache.get(link):
+            results[link] = True
+
+    missing = [x for x in links if x not in results]
+    fetched = await asyncio.gather(
+        *(verify_url(session, url, profile_url) for url, profile_url in missing),
+        return_exceptions=True,
+    )
+    for link, result in zip(missing, fetched):
+        if isinstance(result, Exception):
+            current_app.logger.warning(f"Exception raised verifying URL: {result}")
+        verified = result is True
+        if verified:
+            cache.set(link, True)
+        results[link] = verified
+    return results
+
+
+async def process_batch(session: aiohttp.ClientSession) -> bool:
+    """
+    Verify up to `BATCH_SIZE` queued links concurrently. Returns False if there was nothing to do.
+
+    The rows stay locked while their links are fetched so that multiple workers can drain the
+    queue concurrently without checking the same link twice.
+    """
+    jobs = db.session.scalars(
+        db.select(UrlVerification)
+        .order_by(UrlVerification.id.asc())
+        .with_for_update(skip_locked=True)
+        .limit(BATCH_SIZE)
+    ).all()
+
+    if not jobs:
+        db.session.rollback()
+        return False
+
+    results = await _verify_all(session, list(dict.fromkeys((x.url, x.profile_url) for x in jobs)))
+
+    for job in jobs:
+        # the link may have been changed since it was queued
+        if getattr(job.username, f"extra_field_value{job.field_index}") == job.url:
+            verified = results[(job.url, job.profile_url)]
+            setattr(job.username, f"extra_field_verified{job.field_index}", verified)
+            if verified:
+                _schedule_recheck(job)
+        db.session.delete(job)
+    db.session.commit()
+    return True
+
+
+def _schedule_recheck(job: UrlVerification) -> None:
+    values = {
+        "url": job.url,
+        "host": urlsplit(job.url).hostname or "",
+        "profile_url": job.profile_url,
+        "checked_at": datetime.now(timezone.utc),
+        "etag": None,
+        "last_modified": None,
+        "failures": 0,
+    }
+    db.session.execute(
+        insert(VerifiedLink)
+        .values(username_id=job.username_id, field_index=job.field_index, **values)
+        .on_conflict_do_update(index_elements=["username_id", "field_index"], set_=values)
+    )
+
+
+async def _check_host(
+    session: aiohttp.ClientSession, links: Sequence[VerifiedLink]
+) -> list[LinkCheck]:
+    results = []
+    for i, link in enumerate(links):
+        if i:
+            await asyncio.sleep(HOST_DELAY)
+        results.append(
+            await check_link(session, link.url, link.profile_url, link.etag, link.last_modified)
+        )
+    return results
+
+
+async def recheck_batch(session: aiohttp.ClientSession) -> int:
+    """
+    Check the verified links that are due again, oldest first, and unverify the ones that no
+    longer link back to their profile. Returns how many links were checked.
+
+    Hosts are checked concurrently, but the links on each host one at a time.
+    """
+    now = datetime.now(timezone.utc)
+    by_host = (
+        db.func.row_number()
+        .over(partition_by=VerifiedLink.host, order_by=VerifiedLink.checked_at)
+        .label("by_host")
+    )
+    due = (
+        db.select(VerifiedLink.id, by_host)
+        .filter(VerifiedLink.checked_at <= now - RECHECK_INTERVAL)
+        .subquery()
+    )
+    links = db.session.scalars(
+        db.select(VerifiedLink)
+        .filter(VerifiedLink.id.in_(db.select(due.c.id).filter(due.c.by_host <= RECHECK_PER_HOST)))
+        .order_by(VerifiedLink.checked_at.asc())
+        .with_for_update(skip_locked=True)
+        .limit(RECHECK_BATCH_SIZE)
+    ).all()
+
+    if not links:
+        db.session.rollback()
+        return 0
+
+    hosts: dict[str, list[VerifiedLink]] = defaultdict(list)
+    for link in links:
+        hosts[link.host].append(link)
+    checked = await asyncio.gather(
+        *(_check_host(session, x) for x in hosts.values()), return_exceptions=True
+    )
+
+    # (username ID, link) per field index
+    unverified: dict[int, list[Tuple[int, str]]] = defaultdict(list)
+    now = datetime.now(timezone.utc)
+    for host_links, host_results in zip(hosts.values(), checked):
+        if isinstance(host_results, BaseException):
+            current_app.logger.warning(f"Exception raised checking URLs: {host_results}")
+            results = [LinkCheck(None)] * len(host_links)
+        else:
+            results = host_results
+        for link, result in zip(host_links, results):
+            link.checked_at = now
+            if result.verified is None:
+                link.failures += 1
+                if link.failures < MAX_RECHECK_FAILURES:
+                    # due again once the retry delay has passed
+                    retry_delay = RECHECK_RETRY_DELAY * 2 ** (link.failures - 1)
+                    link.checked_at = now - RECHECK_INTERVAL + retry_delay
+                    continue
+            elif result.verified:
+                link.failures = 0
+                link.etag, link.last_modified = result.etag, result.last_modified
+                continue
+            unverified[link.field_index].append((link.username_id, link.url))
+            db.session.delete(link)
+
+    for field_index, rows in unverified.items():
+        values = db.values(
+            db.column("id", db.Integer), db.column("url", db.Text), name="unverified"
+        ).data(rows)
+        db.session.execute(
+            db.update(Username)
+            .filter(Username.id == values.c.id)
+            # unless the link was changed while it was being checked
+            .filter(getattr(Username, f"extra_field_value{field_index}") == values.c.url)
+            .values({f"extra_field_verified{field_index}": False})
+        )
+    db.session.commit()
+    return len(links)
+
+
+async def worker(app: Flask) -> None:
+    # Wait for migrations to finish
+    with app.app_context():
+        engine = sa.create_engine(app.config["SQLALCHEMY_DATABASE_URI"])
+        while not sa.inspect(engine).has_table(UrlVerification.__tablename__):
+            current_app.logger.error(f"Table {UrlVerification.__tablename__} not found")
+            await asyncio.sleep(2)
+        engine.dispose()
+
+    # Start the worker
+    current_app.logger.info("Starting verification worker")
+    with app.app_context():
+        async with new_session(app) as session:
+            next_recheck = time.monotonic()
+            while True:
+                try:
+                    while await process_batch(session):
+                        pass
+                    if time.monotonic() >= next_recheck:
+                        next_recheck = time.monotonic() + RECHECK_PERIOD
+                        await recheck_batch(session)
+                except Exception:
+                    current_app.logger.exception("Error verifying links")
+                    db.session.rollback()
+                await asyncio.sleep(2)
@@ -0,0 +1,42 @@
+"""add default message fields
+
+Revision ID: 3b4f98372e3f
+Revises: 3e73101de57b
+Create Date: 2026-10-19 03:12:48.104597
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3b4f98372e3f"
+down_revision = "3e73101de57b"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Usernames used to get their default fields when their profile was first viewed. Create them
+    # now so that viewing a profile never writes.
+    op.execute(
+        """
+        INSERT INTO field_definitions (
+            username_id, label, field_type, required, enabled, encrypted, choices, sort_order
+        )
+        SELECT usernames.id, defaults.*
+        FROM usernames
+        CROSS JOIN (
+            VALUES
+                ('Contact Method', 'TEXT'::fieldtype, false, true, true, '[]'::jsonb, 0),
+                ('Message', 'MULTILINE_TEXT'::fieldtype, true, true, true, '[]'::jsonb, 1)
+        ) AS defaults
+        WHERE NOT EXISTS (
+            SELECT 1 FROM field_definitions WHERE field_definitions.username_id = usernames.id
+        )
+        """
+    )
+
+
+def downgrade() -> None:
+    # the default fields are the same ones older versions create when the profile is viewed
+    pass
@@ -0,0 +1,44 @@
+"""add directory search index
+
+Revision ID: 3e73101de57b
+Revises: ec511b2bea66
+Create Date: 2026-10-19 01:37:22.804113
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3e73101de57b"
+down_revision = "ec511b2bea66"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # pg_trgm ships with PostgreSQL's contrib modules. Without it, directory searches still work,
+    # only without an index.
+    if not op.get_bind().scalar(
+        sa.text("SELECT true FROM pg_available_extensions WHERE name = 'pg_trgm'")
+    ):
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "idx_usernames_directory_search",
+        "usernames",
+        [
+            sa.text(
+                "(username || ' ' || coalesce(display_name, '') || ' ' || coalesce(bio, ''))"
+                " gin_trgm_ops"
+            )
+        ],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_where=sa.text("show_in_directory"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_usernames_directory_search", table_name="usernames", if_exists=True)
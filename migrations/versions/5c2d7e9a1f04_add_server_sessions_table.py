@@ -0,0 +1,37 @@
+"""add server sessions table
+
+Revision ID: 5c2d7e9a1f04
+Revises: 3b4f98372e3f
+Create Date: 2026-10-19 09:41:17.206351
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5c2d7e9a1f04"
+down_revision = "3b4f98372e3f"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "server_sessions",
+        sa.Column("id", sa.String(length=64), nullable=False),
+        sa.Column("data", sa.LargeBinary(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_server_sessions")),
+    )
+    with op.batch_alter_table("server_sessions", schema=None) as batch_op:
+        batch_op.create_index(
+            batch_op.f("ix_server_sessions_expires_at"), ["expires_at"], unique=False
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("server_sessions", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_server_sessions_expires_at"))
+
+    op.drop_table("server_sessions")
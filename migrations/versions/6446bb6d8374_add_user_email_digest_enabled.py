@@ -0,0 +1,33 @@
+"""add user.email_digest_enabled
+
+Revision ID: 6446bb6d8374
+Revises: e3d11433ea65
+Create Date: 2026-10-18 21:02:17.318904
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "6446bb6d8374"
+down_revision = "e3d11433ea65"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("users", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column(
+                "email_digest_enabled",
+                sa.Boolean(),
+                server_default=sa.text("false"),
+                nullable=False,
+            )
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("users", schema=None) as batch_op:
+        batch_op.drop_column("email_digest_enabled")
@@ -0,0 +1,51 @@
+"""add url verifications table
+
+Revision ID: 8e41b0c7d3a9
+Revises: 5c2d7e9a1f04
+Create Date: 2026-10-19 11:03:52.841190
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "8e41b0c7d3a9"
+down_revision = "5c2d7e9a1f04"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "url_verifications",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("username_id", sa.Integer(), nullable=False),
+        sa.Column("field_index", sa.Integer(), nullable=False),
+        sa.Column("url", sa.Text(), nullable=False),
+        sa.Column("profile_url", sa.Text(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("NOW()"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(
+            ["username_id"],
+            ["usernames.id"],
+            name=op.f("fk_url_verifications_username_id_usernames"),
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_url_verifications")),
+    )
+    with op.batch_alter_table("url_verifications", schema=None) as batch_op:
+        batch_op.create_index(
+            batch_op.f("ix_url_verifications_username_id"), ["username_id"], unique=False
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("url_verifications", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_url_verifications_username_id"))
+
+    op.drop_table("url_verifications")
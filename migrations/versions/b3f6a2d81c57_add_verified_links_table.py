@@ -0,0 +1,53 @@
+"""add verified links table
+
+Revision ID: b3f6a2d81c57
+Revises: 8e41b0c7d3a9
+Create Date: 2026-10-19 15:27:04.512873
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b3f6a2d81c57"
+down_revision = "8e41b0c7d3a9"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "verified_links",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("username_id", sa.Integer(), nullable=False),
+        sa.Column("field_index", sa.Integer(), nullable=False),
+        sa.Column("url", sa.Text(), nullable=False),
+        sa.Column("host", sa.Text(), nullable=False),
+        sa.Column("profile_url", sa.Text(), nullable=False),
+        sa.Column("checked_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("etag", sa.Text(), nullable=True),
+        sa.Column("last_modified", sa.Text(), nullable=True),
+        sa.Column("failures", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["username_id"],
+            ["usernames.id"],
+            name=op.f("fk_verified_links_username_id_usernames"),
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_verified_links")),
+        sa.UniqueConstraint(
+            "username_id", "field_index", name=op.f("uq_verified_links_username_id")
+        ),
+    )
+    with op.batch_alter_table("verified_links", schema=None) as batch_op:
+        batch_op.create_index(
+            batch_op.f("ix_verified_links_checked_at"), ["checked_at"], unique=False
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("verified_links", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_verified_links_checked_at"))
+
+    op.drop_table("verified_links")
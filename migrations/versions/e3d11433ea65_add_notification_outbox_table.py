@@ -0,0 +1,64 @@
+"""add notification outbox table
+
+Revision ID: e3d11433ea65
+Revises: f32aa741ddc4
+Create Date: 2026-10-18 09:12:41.503217
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "e3d11433ea65"
+down_revision = "f32aa741ddc4"
+branch_labels = None
+depends_on = None
+
+notification_status_enum = sa.Enum("PENDING", "FAILED", name="notificationstatus")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "notification_outbox",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("body", sa.Text(), nullable=True),
+        sa.Column("status", notification_status_enum, nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("NOW()"),
+            nullable=False,
+        ),
+        sa.Column(
+            "next_attempt_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("NOW()"),
+            nullable=False,
+        ),
+        sa.Column("error_message", sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["user_id"], ["users.id"], name=op.f("fk_notification_outbox_user_id_users")
+        ),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_notification_outbox")),
+    )
+    with op.batch_alter_table("notification_outbox", schema=None) as batch_op:
+        batch_op.create_index(
+            "idx_notification_outbox_status_next_attempt_at",
+            ["status", "next_attempt_at"],
+            unique=False,
+        )
+        batch_op.create_index(
+            batch_op.f("ix_notification_outbox_user_id"), ["user_id"], unique=False
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("notification_outbox", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_notification_outbox_user_id"))
+        batch_op.drop_index("idx_notification_outbox_status_next_attempt_at")
+
+    op.drop_table("notification_outbox")
+    notification_status_enum.drop(op.get_bind(), checkfirst=True)
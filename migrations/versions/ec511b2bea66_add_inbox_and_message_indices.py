@@ -0,0 +1,49 @@
+"""add inbox and message indices
+
+Revision ID: ec511b2bea66
+Revises: 6446bb6d8374
+Create Date: 2026-10-18 22:14:03.512874
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "ec511b2bea66"
+down_revision = "6446bb6d8374"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("usernames", schema=None) as batch_op:
+        batch_op.create_index(batch_op.f("ix_usernames_user_id"), ["user_id"], unique=False)
+
+    with op.batch_alter_table("messages", schema=None) as batch_op:
+        batch_op.create_index(
+            "idx_messages_username_id_created_at_id",
+            ["username_id", "created_at", "id"],
+            unique=False,
+        )
+        batch_op.create_index(
+            "idx_messages_username_id_status_created_at_id",
+            ["username_id", "status", "created_at", "id"],
+            unique=False,
+        )
+
+    with op.batch_alter_table("field_values", schema=None) as batch_op:
+        batch_op.create_index(
+            batch_op.f("ix_field_values_message_id"), ["message_id"], unique=False
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("field_values", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_field_values_message_id"))
+
+    with op.batch_alter_table("messages", schema=None) as batch_op:
+        batch_op.drop_index("idx_messages_username_id_status_created_at_id")
+        batch_op.drop_index("idx_messages_username_id_created_at_id")
+
+    with op.batch_alter_table("usernames", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_usernames_user_id"))
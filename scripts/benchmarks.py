@@ -0,0 +1,445 @@
+#!/usr/bin/env python
+"""
+Micro-benchmarks for hot paths. Run inside the dev container, e.g.:
+
+    poetry run ./scripts/benchmarks.py crypto
+
+Benchmarks that need the database (e.g., `submit`) use the app's configured database and clean up
+after themselves. The `inbox` benchmark seeds the dev data plus `--messages` messages, so it's best
+run against a scratch database:
+
+    poetry run ./scripts/benchmarks.py inbox --messages 1000000
+"""
+
+import argparse
+import gc
+import json
+import os
+import secrets
+import time
+import timeit
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Generator
+
+from cryptography.fernet import Fernet
+from dev_data import create_users
+from flask import Flask, Response, request
+from sqlalchemy import ClauseElement, text
+
+from hushline import create_app, crypto
+from hushline.crypto import encrypt_field, shutdown_encryption_executor
+from hushline.db import db
+from hushline.model import (
+    FieldDefinition,
+    FieldType,
+    FieldValue,
+    Message,
+    MessageStatus,
+    User,
+    Username,
+)
+from hushline.model.field_value import add_padding
+from hushline.routes.forms import DynamicMessageForm
+from hushline.routes.inbox import inbox_counts_query, inbox_page_query
+from hushline.secure_session import EncryptedSessionInterface
+
+with open(Path(__file__).parent.parent / "tests" / "test_pgp_key.txt") as f:
+    PGP_KEY = f.read()
+
+
+def report(name: str, func: Callable[[], object], number: int) -> float:
+    per_call = min(timeit.repeat(func, number=number, repeat=3)) / number
+    print(f"{name:<50} {per_call * 1_000_000:>12.2f} µs/call")
+    return per_call
+
+
+def bench_crypto(args: argparse.Namespace) -> None:
+    os.environ.setdefault("ENCRYPTION_KEY", Fernet.generate_key().decode())
+    salt = crypto.generate_salt()
+    token = crypto.encrypt_field("x" * 64)
+
+    def uncached(func: Callable[[], object]) -> Callable[[], object]:
+        def inner() -> object:
+            crypto.clear_encryption_key_cache()
+            return func()
+
+        return inner
+
+    report("get_encryption_key() uncached", uncached(crypto.get_encryption_key), args.number)
+    report("get_encryption_key() cached", crypto.get_encryption_key, args.number)
+    report(
+        "get_encryption_key(scope, salt) uncached",
+        uncached(lambda: crypto.get_encryption_key("scope", salt)),
+        max(args.number // 1000, 1),
+    )
+    report(
+        "get_encryption_key(scope, salt) cached",
+        lambda: crypto.get_encryption_key("scope", salt),
+        args.number,
+    )
+    report("decrypt_field() uncached", uncached(lambda: crypto.decrypt_field(token)), args.number)
+    report("decrypt_field() cached", lambda: crypto.decrypt_field(token), args.number)
+
+
+def garbage(func: Callable[[], object], number: int) -> float:
+    """
+    Objects per call of `func` that are only freed by the cyclic garbage collector, e.g. classes.
+    """
+    gc.collect()
+    before = sum(x["collected"] for x in gc.get_stats())
+    for _ in range(number):
+        func()
+    gc.collect()
+    return (sum(x["collected"] for x in gc.get_stats()) - before) / number
+
+
+def bench_pgp(args: argparse.Namespace) -> None:
+    number = max(args.number // 100, 1)
+    value = add_padding("x" * 1024)
+
+    with Flask(__name__).app_context():
+        for field_count in [1, 4, 10]:
+
+            def submission(cached: bool, field_count: int = field_count) -> None:
+                for _ in range(field_count):
+                    if not cached:
+                        crypto.forget_cert(PGP_KEY)
+                    crypto.encrypt_message(value, PGP_KEY)
+
+            before = report(
+                f"{field_count} encrypted field(s), uncached cert",
+                lambda: submission(False),
+                number,
+            )
+            after = report(
+                f"{field_count} encrypted field(s), cached cert", lambda: submission(True), number
+            )
+            print(f"{'':<50} {(before - after) * 1_000_000:>12.2f} µs saved/submission")
+
+
+@contextmanager
+def bench_user(app: Flask, field_count: int) -> Generator[Username, None, None]:
+    """
+    Create a throwaway user with a PGP key and `field_count` encrypted multiline fields.
+    """
+    with app.app_context():
+        user = User(password=secrets.token_urlsafe(32))
+        user.pgp_key = PGP_KEY
+        db.session.add(user)
+        db.session.flush()
+        username = Username(f"bench-{secrets.token_hex(4)}", True, user_id=user.id)
+        db.session.add(username)
+        db.session.flush()
+        for i in range(field_count):
+            db.session.add(
+                FieldDefinition(
+                    username, f"Field {i}", FieldType.MULTILINE_TEXT, False, True, True, []
+                )
+            )
+            db.session.flush()
+        db.session.commit()
+
+        try:
+            yield username
+        finally:
+            message_ids = db.select(Message.id).filter_by(username_id=username.id)
+            db.session.execute(db.delete(FieldValue).where(FieldValue.message_id.in_(message_ids)))
+            db.session.execute(db.delete(Message).filter_by(username_id=username.id))
+            db.session.execute(db.delete(FieldDefinition).filter_by(username_id=username.id))
+            db.session.delete(username)
+            db.session.delete(user)
+            db.session.commit()
+
+
+def bench_submit(args: argparse.Namespace) -> None:
+    app = create_app()
+    app.config["WTF_CSRF_ENABLED"] = False
+    number = max(args.number // 1000, 1)
+
+    with bench_user(app, args.fields) as username:
+        url = f"/to/{username.username}"
+        data = {f"field_{i}": "x" * args.field_size for i in range(args.fields)}
+
+        def submit() -> None:
+            with app.test_client() as client:
+                client.get(url, base_url="https://localhost")
+                with client.session_transaction() as session:
+                    data["captcha_answer"] = session["math_answer"]
+                resp = client.post(url, data=data, base_url="https://localhost")
+                if resp.status_code != 302:  # noqa: PLR2004
+                    raise RuntimeError(f"Submission failed: {resp.status_code}")
+
+        for workers in sorted({0, args.workers}):
+            app.config["PGP_ENCRYPTION_WORKERS"] = workers
+            with app.app_context():
+                shutdown_encryption_executor()
+            name = f"{args.fields} x {args.field_size}B fields, {workers} pool workers"
+            report(name, submit, number)
+
+            total = number * args.concurrency
+            with ThreadPoolExecutor(args.concurrency) as pool:
+                start = time.perf_counter()
+                for future in [pool.submit(submit) for _ in range(total)]:
+                    future.result()
+                elapsed = time.perf_counter() - start
+            print(f"{'':<50} {total / elapsed:>12.2f} submissions/s ({args.concurrency} clients)")
+
+        with app.app_context():
+            shutdown_encryption_executor()
+
+
+def bench_form(args: argparse.Namespace) -> None:
+    app = create_app()
+    number = max(args.number // 10, 1)
+
+    for field_count in [10, 20]:
+        with bench_user(app, field_count) as username, app.test_request_context():
+            fields = list(username.message_fields)
+
+            def uncached(fields: list[FieldDefinition] = fields) -> None:
+                DynamicMessageForm._build_form_class(fields)()
+
+            def cached(fields: list[FieldDefinition] = fields) -> None:
+                DynamicMessageForm(fields).form()
+
+            for name, func in [("new class", uncached), ("cached class", cached)]:
+                report(f"{field_count} fields, {name}", func, number)
+                print(f"{'':<50} {garbage(func, number):>12.2f} objects/call left to the gc")
+
+
+# typical sessions: a submitter with a captcha answer, a logged in user, and one with flashes
+SESSIONS = {
+    "submitter": {"math_answer": "12", "csrf_token": secrets.token_hex(20)},
+    "logged in": {
+        "_permanent": True,
+        "user_id": 1,
+        "session_id": secrets.token_hex(32),
+        "username": "admin",
+        "is_authenticated": True,
+        "csrf_token": secrets.token_hex(20),
+    },
+    "logged in, flashes": {
+        "_permanent": True,
+        "user_id": 1,
+        "session_id": secrets.token_hex(32),
+        "username": "admin",
+        "is_authenticated": True,
+        "csrf_token": secrets.token_hex(20),
+        "_flashes": [["message", "👍 Settings updated successfully." * 4]] * 3,
+    },
+}
+
+
+def bench_session(args: argparse.Namespace) -> None:
+    app = Flask(__name__)
+    app.config["SESSION_FERNET_KEY"] = Fernet.generate_key().decode()
+    interface = EncryptedSessionInterface()
+    name = app.config["SESSION_COOKIE_NAME"]
+
+    for session_name, data in SESSIONS.items():
+        cookie = Fernet(app.config["SESSION_FERNET_KEY"]).encrypt(json.dumps(data).encode())
+        print(f"{session_name}: {len(cookie)}B cookie")
+
+        with app.test_request_context(headers={"Cookie": f"{name}={cookie.decode()}"}):
+
+            def open_session(cached: bool) -> None:
+                if not cached:
+                    app.extensions.pop("session_fernets", None)
+                interface.open_session(app, request)
+
+            def save_session(threshold: int) -> None:
+                app.config["SESSION_REFRESH_THRESHOLD_SECONDS"] = threshold
+                if (session := interface.open_session(app, request)) is None:
+                    raise RuntimeError("Session not opened")
+                interface.save_session(app, session, Response())
+
+            report("  open, new Fernet", lambda: open_session(False), args.number)
+            report("  open, cached Fernet", lambda: open_session(True), args.number)
+            report("  open and save, re-encrypted", lambda: save_session(0), args.number)
+            report("  open and save, unchanged", lambda: save_session(60), args.number)
+
+
+# the indices added for the inbox and message routes, see migration ec511b2bea66
+INBOX_INDICES = [
+    "ix_usernames_user_id",
+    "idx_messages_username_id_created_at_id",
+    "idx_messages_username_id_status_created_at_id",
+    "ix_field_values_message_id",
+]
+
+
+def explain(statement: ClauseElement, number: int) -> tuple[float, set[str]]:
+    """
+    Run `statement` under EXPLAIN ANALYZE `number` times and return the best total time in
+    milliseconds and the indices the plan used. Writes are rolled back after each run.
+    """
+    sql = str(statement.compile(dialect=db.engine.dialect, compile_kwargs={"literal_binds": True}))
+    best = float("inf")
+    for _ in range(number):
+        savepoint = db.session.begin_nested()
+        (result,) = (
+            db.session.connection()
+            .exec_driver_sql(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}")
+            .scalar_one()
+        )
+        savepoint.rollback()
+        best = min(best, result["Planning Time"] + result["Execution Time"])
+
+    indices: set[str] = set()
+    nodes = [result["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if "Index Name" in node:
+            indices.add(node["Index Name"])
+        nodes.extend(node.get("Plans", []))
+    return best, indices
+
+
+def create_messages(count: int) -> None:
+    """
+    Bulk insert `count` messages, spread over every username and over the past year, each with a
+    value for its username's first field. This is for load testing, so it's done in SQL rather than
+    through the models, with one encrypted value shared by every message.
+    """
+    username_ids = db.session.scalars(
+        db.select(Username.id)
+        .filter(db.select(FieldDefinition.id).filter_by(username_id=Username.id).exists())
+        .order_by(Username.id)
+    ).all()
+    if not username_ids:
+        raise RuntimeError("No usernames with fields to add messages to")
+
+    db.session.execute(
+        text(
+            """
+            WITH new_messages AS (
+                INSERT INTO messages (username_id, reply_slug, status, created_at)
+                SELECT
+                    (:username_ids)[1 + g % cardinality(:username_ids)],
+                    md5(random()::text),
+                    statuses[1 + floor(random() * cardinality(statuses))::int],
+                    NOW() - random() * INTERVAL '365 days'
+                FROM
+                    generate_series(1, :count) AS g,
+                    enum_range(NULL::messagestatus) AS statuses
+                RETURNING id, username_id
+            )
+            INSERT INTO field_values (field_definition_id, message_id, _value, encrypted)
+            SELECT field_definition.id, new_messages.id, :value, false
+            FROM new_messages
+            CROSS JOIN LATERAL (
+                SELECT id FROM field_definitions
+                WHERE username_id = new_messages.username_id
+                ORDER BY sort_order, id
+                LIMIT 1
+            ) AS field_definition
+            """
+        ),
+        {
+            "username_ids": list(username_ids),
+            "count": count,
+            "value": encrypt_field("Lorem ipsum dolor sit amet"),
+        },
+    )
+    db.session.commit()
+
+    # like autovacuum would, so that plans match a long-lived database's
+    with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE messages, field_values, usernames"))
+    print(f"Messages added: {count}")
+
+
+def bench_inbox(args: argparse.Namespace) -> None:
+    app = create_app()
+    number = max(args.number // 1000, 1)
+
+    with app.app_context():
+        create_users()
+        max_message_id = db.session.scalar(db.select(db.func.max(Message.id))) or 0
+        create_messages(args.messages)
+
+        try:
+            # the admin has an alias, so this covers merging the inboxes of several usernames
+            user = db.session.scalars(
+                db.select(User).join(Username).filter(Username._username == "admin")
+            ).one()
+            page_size = app.config["INBOX_PAGE_SIZE"]
+            user_usernames = db.select(Username.id).filter(Username.user_id == user.id)
+            user_messages = db.select(Message).filter(Message.username_id.in_(user_usernames))
+            middle = db.session.scalars(
+                user_messages.order_by(Message.created_at.desc(), Message.id.desc()).offset(
+                    len(db.session.scalars(user_messages.with_only_columns(Message.id)).all()) // 2
+                )
+            ).first()
+            if middle is None:
+                raise RuntimeError("Not enough messages to benchmark")
+
+            queries: dict[str, ClauseElement] = {
+                "inbox, first page": inbox_page_query(user, None, None, page_size),
+                "inbox, deep page": inbox_page_query(
+                    user, None, (middle.created_at, middle.id), page_size
+                ),
+                "inbox, status filter": inbox_page_query(
+                    user, MessageStatus.ARCHIVED, None, page_size
+                ),
+                "inbox, counts": inbox_counts_query(user),
+                "message": db.select(Message)
+                .join(Username)
+                .filter(Username.user_id == user.id, Message.id == middle.id),
+                "message, field values": db.select(FieldValue).filter(
+                    FieldValue.message_id == middle.id
+                ),
+                "delete message": db.delete(FieldValue).where(FieldValue.message_id == middle.id),
+                "update message status": db.update(Message)
+                .where(Message.id == middle.id, Message.username_id.in_(user_usernames))
+                .values(status=MessageStatus.ACCEPTED),
+            }
+
+            print(f"{args.messages} messages, best of {number} runs")
+            print(f"{'':<30} {'before':>13} {'after':>13}  indices used")
+            for name, statement in queries.items():
+                # DDL is transactional, so the indices are back after the rollback
+                db.session.execute(text(f"DROP INDEX IF EXISTS {', '.join(INBOX_INDICES)}"))
+                before, _ = explain(statement, number)
+                db.session.rollback()
+
+                after, indices = explain(statement, number)
+                db.session.rollback()
+
+                print(
+                    f"{name:<30} {before:>10.3f} ms {after:>10.3f} ms  {', '.join(sorted(indices))}"
+                )
+        finally:
+            # field values are deleted by the cascade
+            db.session.rollback()
+            db.session.execute(db.delete(Message).filter(Message.id > max_message_id))
+            db.session.commit()
+
+
+BENCHMARKS = {
+    "crypto": bench_crypto,
+    "form": bench_form,
+    "inbox": bench_inbox,
+    "pgp": bench_pgp,
+    "session": bench_session,
+    "submit": bench_submit,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("-n", "--number", type=int, default=10_000, help="iterations per run")
+    parser.add_argument("--fields", type=int, default=4, help="fields per submission")
+    parser.add_argument("--field-size", type=int, default=100_000, help="bytes per field")
+    parser.add_argument("--workers", type=int, default=4, help="encryption pool size")
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent clients")
+    parser.add_argument("--messages", type=int, default=1_000_000, help="messages to seed")
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -309,6 +309,8 @@ def create_users() -> None:
             db.session.add(un1)
             db.session.add(un2)
             db.session.commit()
+            un1.create_default_field_defs()
+            un2.create_default_field_defs()
 
             print(f"Test user created:\n  username = {username}\n  password = {password}")
         else:
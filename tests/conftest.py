@@ -1,14 +1,28 @@
+import asyncio
 import os
 import random
+import socket
+import ssl
 import string
 import time
 from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from threading import Thread
 from typing import TYPE_CHECKING, Any, Callable, Generator
 from uuid import uuid4
 
 import flask_migrate
 import pytest
 from _pytest._py.path import LocalPath
+from aiohttp import web
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import SMTP, AuthResult, Envelope, LoginPassword
+from aiosmtpd.smtp import Session as SMTPSession
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
 from flask import Flask
 from flask.testing import FlaskClient
 from pytest_mock import MockFixture
@@ -17,9 +31,19 @@ from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import Session, sessionmaker
 
 from hushline import create_app
-from hushline.crypto import _SCRYPT_PARAMS
+from hushline.crypto import _SCRYPT_PARAMS, clear_encryption_key_cache
 from hushline.db import db
-from hushline.model import AuthenticationLog, FieldValue, Message, Tier, User, Username
+from hushline.email import SMTPConfig, create_smtp_config
+from hushline.http_client import shutdown_http_client
+from hushline.model import (
+    AuthenticationLog,
+    FieldValue,
+    Message,
+    SMTPEncryption,
+    Tier,
+    User,
+    Username,
+)
 
 if TYPE_CHECKING:
     from _pytest.config.argparsing import Parser
@@ -177,6 +201,8 @@ def database(request: pytest.FixtureRequest, _db_template: None) -> str:
 @pytest.fixture(autouse=True)
 def _insecure_scrypt_params(mocker: MockFixture) -> None:
     mocker.patch.dict(_SCRYPT_PARAMS, {"n": 2, "r": 1, "p": 1}, clear=True)
+    # derived keys are cached, so don't let keys from other params leak between tests
+    clear_encryption_key_cache()
 
 
 @pytest.fixture()
@@ -212,6 +238,7 @@ def app(
 
     with app.app_context():
         yield app
+        shutdown_http_client()
 
 
 @pytest.fixture()
@@ -314,6 +341,147 @@ def _pgp_user(client: FlaskClient, user: User) -> None:
     db.session.commit()
 
 
+SMTP_USERNAME = "hushline"
+SMTP_PASSWORD = "hushline-smtp-password"
+
+
+class SMTPRecorder:
+    """
+    aiosmtpd handler that keeps every message it receives
+    """
+
+    def __init__(self) -> None:
+        self.envelopes: list[Envelope] = []
+        self.logins = 0
+
+    async def handle_DATA(self, server: SMTP, session: SMTPSession, envelope: Envelope) -> str:
+        self.envelopes.append(envelope)
+        return "250 Message accepted for delivery"
+
+    def authenticate(  # noqa: PLR0913
+        self, server: SMTP, session: SMTPSession, envelope: Envelope, mechanism: str, auth_data: Any
+    ) -> AuthResult:
+        success = isinstance(auth_data, LoginPassword) and (
+            auth_data.login.decode(),
+            auth_data.password.decode(),
+        ) == (SMTP_USERNAME, SMTP_PASSWORD)
+        if success:
+            self.logins += 1
+        return AuthResult(success=success, handled=False)
+
+
+def self_signed_tls_context(tmp_path: Path) -> ssl.SSLContext:
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.now(timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - timedelta(minutes=1))
+        .not_valid_after(now + timedelta(hours=1))
+        .sign(key, hashes.SHA256())
+    )
+    cert_path = tmp_path / "smtpd.crt"
+    key_path = tmp_path / "smtpd.key"
+    cert_path.write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+    key_path.write_bytes(
+        key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+    )
+
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(cert_path, key_path)
+    return context
+
+
+@pytest.fixture()
+def smtpd(tmp_path: Path) -> Generator[Controller, None, None]:
+    """
+    A local SMTP server that requires STARTTLS and a login, like the ones users configure
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    handler = SMTPRecorder()
+    controller = Controller(
+        handler,
+        hostname="127.0.0.1",
+        port=port,
+        tls_context=self_signed_tls_context(tmp_path),
+        require_starttls=True,
+        authenticator=handler.authenticate,
+    )
+    controller.start()
+    try:
+        yield controller
+    finally:
+        controller.stop()
+
+
+@pytest.fixture()
+def http_server() -> Generator[Callable[[web.Application], str], None, None]:
+    """
+    Serves aiohttp apps on local ports for code that makes outbound requests. Call it with an app
+    to get the URL it's served at.
+    """
+    loop = asyncio.new_event_loop()
+    thread = Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    runners: list[web.AppRunner] = []
+
+    async def start(server_app: web.Application) -> str:
+        runner = web.AppRunner(server_app)
+        await runner.setup()
+        runners.append(runner)
+        await web.TCPSite(runner, "127.0.0.1", 0).start()
+        host, port = runner.addresses[0][:2]
+        return f"http://{host}:{port}/"
+
+    def serve(server_app: web.Application) -> str:
+        return asyncio.run_coroutine_threadsafe(start(server_app), loop).result()
+
+    try:
+        yield serve
+    finally:
+        for runner in runners:
+            asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+@pytest.fixture()
+def smtp_config(smtpd: Controller) -> SMTPConfig:
+    return create_smtp_config(
+        SMTP_USERNAME,
+        smtpd.hostname,
+        smtpd.port,
+        SMTP_PASSWORD,
+        "notifications@example.com",
+        encryption=SMTPEncryption.StartTLS,
+    )
+
+
+@pytest.fixture()
+def _smtp_user(user: User, smtpd: Controller) -> None:
+    user.email = "user@example.com"
+    user.enable_email_notifications = True
+    user.smtp_server = smtpd.hostname
+    user.smtp_port = smtpd.port
+    user.smtp_username = SMTP_USERNAME
+    user.smtp_password = SMTP_PASSWORD
+    user.smtp_sender = "notifications@example.com"
+    user.smtp_encryption = SMTPEncryption.StartTLS
+    db.session.commit()
+
+
 @pytest.fixture()
 def user_alias(app: Flask, user: User) -> Username:
     uuid_ish = str(uuid4())[0:12]
@@ -1,10 +1,14 @@
 import random
 import string
-from typing import Any, Callable, Mapping, Optional, Sequence, Tuple, TypeVar
+from contextlib import contextmanager
+from typing import Any, Callable, Generator, Mapping, Optional, Sequence, Tuple, TypeVar
 
 from flask import url_for
 from flask.testing import FlaskClient
 from flask_wtf import FlaskForm
+from sqlalchemy import event
+
+from hushline.db import db
 
 T = TypeVar("T")
 
@@ -82,3 +86,20 @@ def get_captcha_from_session(client: FlaskClient, username: str) -> str:
         captcha_answer = session.get("math_answer")
         assert captcha_answer
         return captcha_answer
+
+
+@contextmanager
+def count_queries() -> Generator[list[str], None, None]:
+    """
+    Collect the SQL statements executed inside the block.
+    """
+    statements: list[str] = []
+
+    def before_cursor_execute(_conn: Any, _cursor: Any, statement: str, *_args: Any) -> None:
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
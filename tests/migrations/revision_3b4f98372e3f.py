@@ -0,0 +1,65 @@
+from sqlalchemy import text
+
+from hushline.db import db
+
+
+def load_usernames() -> None:
+    db.session.execute(
+        text(
+            """
+        INSERT INTO users (id, is_admin, password_hash)
+        VALUES (1, false, '$scrypt$')
+        """
+        )
+    )
+    db.session.execute(
+        text(
+            """
+        INSERT INTO usernames (id, user_id, username, is_primary, is_verified, show_in_directory)
+        VALUES (1, 1, 'legacy', true, false, false), (2, 1, 'customized', false, false, false)
+        """
+        )
+    )
+    db.session.execute(
+        text(
+            """
+        INSERT INTO field_definitions (
+            username_id, label, field_type, required, enabled, encrypted, choices, sort_order
+        )
+        VALUES (2, 'Only field', 'TEXT', true, true, false, '[]', 0)
+        """
+        )
+    )
+    db.session.commit()
+
+
+def field_labels(username_id: int) -> list[str]:
+    return list(
+        db.session.scalars(
+            text(
+                """
+            SELECT label FROM field_definitions
+            WHERE username_id = :username_id
+            ORDER BY sort_order
+            """
+            ),
+            {"username_id": username_id},
+        )
+    )
+
+
+class UpgradeTester:
+    def load_data(self) -> None:
+        load_usernames()
+
+    def check_upgrade(self) -> None:
+        assert field_labels(1) == ["Contact Method", "Message"]
+        assert field_labels(2) == ["Only field"]
+
+
+class DowngradeTester:
+    def load_data(self) -> None:
+        load_usernames()
+
+    def check_downgrade(self) -> None:
+        assert field_labels(2) == ["Only field"]
@@ -0,0 +1,71 @@
+import re
+
+import pytest
+from flask import url_for
+from flask.testing import FlaskClient
+from helpers import count_queries
+from werkzeug.test import TestResponse
+
+from hushline.db import db
+from hushline.model import User
+
+USER_BY_ID = re.compile(r"FROM users\s+WHERE users\.id =")
+
+
+def get_counting_queries(client: FlaskClient, url: str) -> tuple[TestResponse, list[str]]:
+    # the test client shares the test's session, so start from an empty identity map like a
+    # request would
+    db.session.expunge_all()
+    with count_queries() as statements:
+        resp = client.get(url)
+    return resp, statements
+
+
+@pytest.mark.usefixtures("_authenticated_user")
+@pytest.mark.parametrize(
+    "endpoint",
+    [
+        "inbox",
+        "settings.profile",
+        "settings.auth",
+        "settings.notifications",
+        "settings.encryption",
+        "settings.replies",
+        "settings.advanced",
+    ],
+)
+def test_user_is_loaded_once_per_request(client: FlaskClient, endpoint: str) -> None:
+    resp, statements = get_counting_queries(client, url_for(endpoint))
+    assert resp.status_code == 200
+    assert len([x for x in statements if USER_BY_ID.search(x)]) == 1
+
+
+@pytest.mark.usefixtures("_authenticated_admin_user")
+def test_admin_is_loaded_once_per_request(client: FlaskClient) -> None:
+    resp, statements = get_counting_queries(client, url_for("settings.admin"))
+    assert resp.status_code == 200
+    assert len([x for x in statements if USER_BY_ID.search(x)]) == 1
+
+
+@pytest.mark.usefixtures("_authenticated_user")
+def test_inbox_query_count(client: FlaskClient) -> None:
+    client.get(url_for("inbox"))  # warm up the app's caches
+
+    resp, statements = get_counting_queries(client, url_for("inbox"))
+    assert resp.status_code == 200
+    # the user, their primary username, a page of messages and the message counts
+    assert len(statements) == 4, statements
+
+
+@pytest.mark.usefixtures("_authenticated_user")
+def test_deleted_user_is_logged_out(client: FlaskClient, user: User) -> None:
+    db.session.delete(user.primary_username)
+    db.session.delete(user)
+    db.session.commit()
+
+    resp = client.get(url_for("inbox"), follow_redirects=True)
+    assert resp.status_code == 200
+    assert resp.request.path == url_for("login")
+    assert "User not found" in resp.text
+    with client.session_transaction() as session:
+        assert "user_id" not in session
@@ -0,0 +1,74 @@
+from typing import Any
+
+import pytest
+from pytest_mock import MockFixture
+
+from hushline.cache import LRUCache, lazy_cache
+
+
+def test_get_set() -> None:
+    cache: LRUCache[str, int] = LRUCache(2)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_evicts_least_recently_used() -> None:
+    cache: LRUCache[str, int] = LRUCache(2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+    assert len(cache) == 2
+
+
+def test_pop_and_clear() -> None:
+    cache: LRUCache[str, int] = LRUCache(2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    assert cache.pop("a") == 1
+    assert cache.pop("a") is None
+
+    cache.clear()
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_invalid_size() -> None:
+    with pytest.raises(ValueError, match="maxsize"):
+        LRUCache(0)
+
+
+def test_ttl(mocker: MockFixture) -> None:
+    now = mocker.patch("hushline.cache.time.monotonic", return_value=100.0)
+    cache: LRUCache[str, int] = LRUCache(2, ttl=10)
+    cache.set("a", 1)
+
+    now.return_value = 109.0
+    assert cache.get("a") == 1
+
+    now.return_value = 110.0
+    assert cache.get("a") is None
+    assert "a" not in cache
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    with pytest.raises(ValueError, match="ttl"):
+        LRUCache(1, ttl=0)
+
+
+def test_lazy_cache(mocker: MockFixture) -> None:
+    namespace: dict[str, Any] = {}
+    cache = lazy_cache(namespace, "cache", 2, ttl=10)
+    assert namespace == {"cache": cache}
+    assert (cache.maxsize, cache.ttl) == (2, 10)
+
+    # later uses get the same cache without creating another
+    new_cache = mocker.patch("hushline.cache.LRUCache")
+    assert lazy_cache(namespace, "cache", 2, ttl=10) is cache
+    new_cache.assert_not_called()
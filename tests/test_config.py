@@ -8,6 +8,7 @@ from hushline.config import (
     _STRING_CFG_PREFIX,
     AliasMode,
     ConfigParseError,
+    EncryptionExecutor,
     load_config,
 )
 
@@ -55,3 +56,32 @@ def test_parse_alias_mode() -> None:
 
     with pytest.raises(ConfigParseError, match="Not a valid value"):
         AliasMode.parse("wat")
+
+
+def test_pgp_encryption_pool_config() -> None:
+    env = dict(**os.environ)
+    env.pop("PGP_ENCRYPTION_WORKERS", None)
+    env.pop("PGP_ENCRYPTION_EXECUTOR", None)
+
+    cfg = load_config(env)
+    assert cfg["PGP_ENCRYPTION_WORKERS"] == 0
+    assert cfg["PGP_ENCRYPTION_EXECUTOR"] == EncryptionExecutor.PROCESS
+
+    env["PGP_ENCRYPTION_WORKERS"] = "4"
+    env["PGP_ENCRYPTION_EXECUTOR"] = "thread"
+    cfg = load_config(env)
+    assert cfg["PGP_ENCRYPTION_WORKERS"] == 4
+    assert cfg["PGP_ENCRYPTION_EXECUTOR"] == EncryptionExecutor.THREAD
+
+    env["PGP_ENCRYPTION_EXECUTOR"] = "wat"
+    with pytest.raises(ConfigParseError, match="Not a valid value"):
+        load_config(env)
+
+
+def test_smtp_pool_config() -> None:
+    env = dict(**os.environ)
+    env.pop("SMTP_POOL_IDLE_TIMEOUT", None)
+    assert load_config(env)["SMTP_POOL_IDLE_TIMEOUT"] == 60
+
+    env["SMTP_POOL_IDLE_TIMEOUT"] = "0"
+    assert load_config(env)["SMTP_POOL_IDLE_TIMEOUT"] == 0
@@ -0,0 +1,164 @@
+import os
+from concurrent.futures import BrokenExecutor
+
+import pytest
+from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+from flask import Flask
+from pysequoia import Cert
+from pytest_mock import MockFixture
+
+from hushline.config import EncryptionExecutor
+from hushline.crypto import (
+    clear_encryption_key_cache,
+    decrypt_field,
+    encrypt_field,
+    encrypt_message,
+    encrypt_messages,
+    forget_cert,
+    generate_salt,
+    get_encryption_executor,
+    get_encryption_key,
+    is_valid_pgp_key,
+    load_cert,
+    shutdown_encryption_executor,
+)
+from hushline.model import User
+
+
+@pytest.fixture()
+def _encryption_key(mocker: MockFixture) -> None:
+    mocker.patch.dict(os.environ, {"ENCRYPTION_KEY": Fernet.generate_key().decode()})
+    clear_encryption_key_cache()
+
+
+@pytest.mark.usefixtures("_encryption_key")
+def test_default_key_is_cached() -> None:
+    assert get_encryption_key() is get_encryption_key()
+
+
+@pytest.mark.usefixtures("_encryption_key")
+def test_derived_key_is_cached_per_scope_and_salt(mocker: MockFixture) -> None:
+    scrypt = mocker.patch("hushline.crypto.Scrypt", wraps=Scrypt)
+    salt = generate_salt()
+
+    key = get_encryption_key("scope", salt)
+    assert get_encryption_key(b"scope", salt) is key
+    assert scrypt.call_count == 1
+
+    assert get_encryption_key("other-scope", salt) is not key
+    assert get_encryption_key("scope", generate_salt()) is not key
+    assert scrypt.call_count == 3
+
+
+@pytest.mark.usefixtures("_encryption_key")
+def test_clear_cache() -> None:
+    salt = generate_salt()
+    default_key = get_encryption_key()
+    derived_key = get_encryption_key("scope", salt)
+
+    clear_encryption_key_cache()
+
+    assert get_encryption_key() is not default_key
+    assert get_encryption_key("scope", salt) is not derived_key
+
+
+@pytest.mark.usefixtures("_encryption_key")
+def test_key_rotation_changes_default_key(mocker: MockFixture) -> None:
+    key = get_encryption_key()
+    mocker.patch.dict(os.environ, {"ENCRYPTION_KEY": Fernet.generate_key().decode()})
+    assert get_encryption_key() is not key
+
+
+@pytest.mark.usefixtures("_encryption_key")
+def test_scoped_round_trip() -> None:
+    salt = generate_salt()
+    encrypted = encrypt_field("hello", "scope", salt)
+    assert decrypt_field(encrypted, "scope", salt) == "hello"
+    assert decrypt_field(encrypt_field("hello"), None, None) == "hello"
+
+
+def test_missing_key(mocker: MockFixture) -> None:
+    mocker.patch.dict(os.environ, clear=True)
+    with pytest.raises(ValueError, match="ENCRYPTION_KEY"):
+        get_encryption_key()
+
+
+@pytest.fixture()
+def pgp_key() -> str:
+    with open("tests/test_pgp_key.txt") as f:
+        return f.read()
+
+
+def test_load_cert_is_cached(mocker: MockFixture, pgp_key: str) -> None:
+    from_bytes = mocker.patch("hushline.crypto.Cert.from_bytes", wraps=Cert.from_bytes)
+    forget_cert(pgp_key)
+
+    cert = load_cert(pgp_key)
+    assert load_cert(pgp_key) is cert
+    assert from_bytes.call_count == 1
+
+    forget_cert(pgp_key)
+    assert load_cert(pgp_key) is not cert
+    assert from_bytes.call_count == 2
+
+
+def test_invalid_key_not_cached(app: Flask) -> None:
+    assert not is_valid_pgp_key("not a key")
+    assert not is_valid_pgp_key("not a key")
+    with pytest.raises(Exception):  # noqa: PT011
+        load_cert("not a key")
+
+
+def test_encrypt_message_uses_cached_cert(app: Flask, mocker: MockFixture, pgp_key: str) -> None:
+    from_bytes = mocker.patch("hushline.crypto.Cert.from_bytes", wraps=Cert.from_bytes)
+    forget_cert(pgp_key)
+
+    for _ in range(4):
+        assert encrypt_message("hello", pgp_key)
+    assert from_bytes.call_count == 1
+
+
+def test_changing_user_pgp_key_forgets_cert(user: User, pgp_key: str) -> None:
+    user.pgp_key = pgp_key
+    cert = load_cert(pgp_key)
+
+    user.pgp_key = None
+    assert load_cert(pgp_key) is not cert
+
+
+@pytest.mark.parametrize("executor_kind", list(EncryptionExecutor))
+def test_encrypt_messages_on_pool(
+    app: Flask, pgp_key: str, executor_kind: EncryptionExecutor
+) -> None:
+    app.config["PGP_ENCRYPTION_WORKERS"] = 2
+    app.config["PGP_ENCRYPTION_EXECUTOR"] = executor_kind
+    try:
+        results = encrypt_messages(["one", "two", "three"], pgp_key)
+        assert app.extensions["pgp_encryption_executor"] is get_encryption_executor()
+    finally:
+        shutdown_encryption_executor()
+
+    assert len(results) == 3
+    assert all(x and x.startswith("-----BEGIN PGP MESSAGE-----") for x in results)
+
+
+def test_encrypt_messages_inline_by_default(app: Flask, pgp_key: str) -> None:
+    assert not app.config["PGP_ENCRYPTION_WORKERS"]
+    assert get_encryption_executor() is None
+    assert all(encrypt_messages(["one", "two"], pgp_key))
+    assert "pgp_encryption_executor" not in app.extensions
+
+
+def test_encrypt_messages_falls_back_to_inline(
+    app: Flask, mocker: MockFixture, pgp_key: str
+) -> None:
+    app.config["PGP_ENCRYPTION_WORKERS"] = 2
+    app.config["PGP_ENCRYPTION_EXECUTOR"] = EncryptionExecutor.THREAD
+    executor = get_encryption_executor()
+    assert executor is not None
+    mocker.patch.object(executor, "submit", side_effect=BrokenExecutor("broken"))
+
+    results = encrypt_messages(["one", "two"], pgp_key)
+    assert all(x and x.startswith("-----BEGIN PGP MESSAGE-----") for x in results)
+    assert "pgp_encryption_executor" not in app.extensions
@@ -1,5 +1,8 @@
-from flask import url_for
+from typing import Any
+
+from flask import Flask, url_for
 from flask.testing import FlaskClient
+from helpers import count_queries
 
 from hushline.db import db
 from hushline.model import User
@@ -21,3 +24,147 @@ def test_directory_lists_only_opted_in_users(client: FlaskClient, user: User) ->
     db.session.commit()
     response = client.get(url_for("directory"))
     assert user.primary_username.username not in response.text
+
+
+def test_directory_users_json(client: FlaskClient, user: User, admin_user: User) -> None:
+    for x in [user, admin_user]:
+        x.primary_username.show_in_directory = True
+    user.primary_username.bio = "Hello"
+    db.session.commit()
+
+    response = client.get(url_for("directory_users"))
+    assert response.status_code == 200
+    assert response.json == [
+        {
+            "primary_username": admin_user.primary_username.username,
+            "display_name": admin_user.primary_username.username,
+            "bio": None,
+            "is_admin": True,
+            "is_verified": False,
+        },
+        {
+            "primary_username": user.primary_username.username,
+            "display_name": user.primary_username.username,
+            "bio": "Hello",
+            "is_admin": False,
+            "is_verified": False,
+        },
+    ]
+
+
+def test_directory_users_json_is_conditional(client: FlaskClient, user: User) -> None:
+    user.primary_username.show_in_directory = True
+    db.session.commit()
+
+    response = client.get(url_for("directory_users"))
+    etag = response.headers["ETag"]
+    assert etag
+
+    response = client.get(url_for("directory_users"), headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert not response.data
+
+    # the snapshot is rebuilt when a listed profile changes
+    user.primary_username.display_name = "New Name"
+    db.session.commit()
+
+    response = client.get(url_for("directory_users"), headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json
+    assert response.json[0]["display_name"] == "New Name"
+
+
+def test_directory_snapshot_is_cached(client: FlaskClient, user: User) -> None:
+    user.primary_username.show_in_directory = True
+    db.session.commit()
+    client.get(url_for("directory_users"))
+
+    with count_queries() as statements:
+        response = client.get(url_for("directory_users"))
+    assert response.status_code == 200
+    assert statements == []
+
+    # admins are listed first, so this changes the directory too
+    user.is_admin = True
+    db.session.commit()
+    response = client.get(url_for("directory_users"))
+    assert response.json
+    assert response.json[0]["is_admin"]
+
+
+def test_directory_is_paginated(
+    app: Flask, client: FlaskClient, user: User, user2: User, admin_user: User
+) -> None:
+    app.config["DIRECTORY_PAGE_SIZE"] = 2
+    for x in [user, user2, admin_user]:
+        x.primary_username.show_in_directory = True
+    db.session.commit()
+    # admins first, then by name
+    usernames = [admin_user.primary_username.username] + sorted(
+        x.primary_username.username for x in [user, user2]
+    )
+
+    response = client.get(url_for("directory"))
+    assert response.status_code == 200
+    assert all(x in response.text for x in usernames[:2])
+    assert usernames[2] not in response.text
+    assert url_for("directory", page=2) in response.text
+
+    response = client.get(url_for("directory", page=2))
+    assert response.status_code == 200
+    assert usernames[2] in response.text
+    assert all(x not in response.text for x in usernames[:2])
+    assert url_for("directory", page=1) in response.text
+
+    assert client.get(url_for("directory", page=3)).status_code == 404
+
+
+def test_directory_search(client: FlaskClient, user: User, user2: User, admin_user: User) -> None:
+    user.primary_username.show_in_directory = True
+    user.primary_username.bio = "Reporting on 100% of the news_room"
+    user2.primary_username.show_in_directory = True
+    user2.primary_username.display_name = "News Desk"
+    user2.primary_username.is_verified = True
+    # not listed, so never found
+    admin_user.primary_username.bio = "Newsroom"
+    db.session.commit()
+
+    def search(**params: Any) -> list[str]:
+        response = client.get(url_for("directory_search", **params))
+        assert response.status_code == 200, response.text
+        assert response.json
+        return [x["primary_username"] for x in response.json["users"]]
+
+    assert search(q="NEWS") == [user2.primary_username.username, user.primary_username.username]
+    assert search(q="news", verified="true") == [user2.primary_username.username]
+    assert search(q=user.primary_username.username[-6:]) == [user.primary_username.username]
+    # LIKE wildcards are matched literally
+    assert search(q="100%") == [user.primary_username.username]
+    assert search(q="s_r") == [user.primary_username.username]
+    assert search(q="%") == [user.primary_username.username]
+    assert search(q="nothing like this") == []
+
+    response = client.get(url_for("directory_search", q="x" * 101))
+    assert response.status_code == 400
+
+
+def test_directory_search_is_paginated(
+    app: Flask, client: FlaskClient, user: User, user2: User, admin_user: User
+) -> None:
+    app.config["DIRECTORY_PAGE_SIZE"] = 2
+    for x in [user, user2, admin_user]:
+        x.primary_username.show_in_directory = True
+    db.session.commit()
+
+    all_params: list[dict[str, Any]] = [{"q": "test-"}, {}]
+    for params in all_params:
+        response = client.get(url_for("directory_search", **params))
+        assert response.json
+        assert len(response.json["users"]) == 2
+        assert response.json["next_url"]
+
+        response = client.get(response.json["next_url"])
+        assert response.json
+        assert len(response.json["users"]) == 1
+        assert response.json["next_url"] is None
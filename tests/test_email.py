@@ -0,0 +1,128 @@
+import socket
+import time
+
+import pytest
+from aiosmtpd.controller import Controller
+from flask import Flask
+from pytest_mock import MockFixture
+
+from hushline.email import (
+    SMTPConfig,
+    SMTPConnectionPool,
+    create_smtp_config,
+    get_smtp_pool,
+    send_email,
+)
+
+
+def send(smtp_config: SMTPConfig, body: str = "hello") -> bool:
+    return send_email("user@example.com", "Subject", body, smtp_config)
+
+
+@pytest.mark.usefixtures("app")
+def test_send_email_reuses_connection(smtpd: Controller, smtp_config: SMTPConfig) -> None:
+    for i in range(3):
+        assert send(smtp_config, f"message {i}")
+
+    assert len(smtpd.handler.envelopes) == 3
+    assert smtpd.handler.logins == 1
+
+
+def test_send_email_without_pooling(app: Flask, smtpd: Controller, smtp_config: SMTPConfig) -> None:
+    app.config["SMTP_POOL_IDLE_TIMEOUT"] = 0
+
+    assert send(smtp_config)
+    assert send(smtp_config)
+
+    assert len(smtpd.handler.envelopes) == 2
+    assert smtpd.handler.logins == 2
+
+
+def test_pool_closes_idle_connections(
+    smtpd: Controller, smtp_config: SMTPConfig, mocker: MockFixture
+) -> None:
+    pool = SMTPConnectionPool(idle_timeout=60)
+    with pool.connection(smtp_config) as server:
+        stale = server
+
+    mocker.patch("hushline.email.time.monotonic", return_value=time.monotonic() + 61)
+    with pool.connection(smtp_config) as server:
+        assert server is not stale
+
+    assert stale.sock is None
+    assert smtpd.handler.logins == 2
+    pool.close()
+
+
+def test_pool_closes_idle_connections_of_other_keys(
+    smtpd: Controller, smtp_config: SMTPConfig, mocker: MockFixture
+) -> None:
+    pool = SMTPConnectionPool(idle_timeout=60)
+    with pool.connection(smtp_config) as server:
+        stale = server
+
+    other_config = create_smtp_config(
+        "someone else",
+        smtp_config.server,
+        smtp_config.port,
+        smtp_config.password,
+        smtp_config.sender,
+        encryption=smtp_config.encryption,
+    )
+    mocker.patch("hushline.email.time.monotonic", return_value=time.monotonic() + 61)
+    assert pool._checkout(other_config) is None
+
+    assert stale.sock is None
+    assert pool._idle == {}
+
+
+def test_pool_checks_connections_with_noop(smtpd: Controller, smtp_config: SMTPConfig) -> None:
+    pool = SMTPConnectionPool(idle_timeout=60)
+    with pool.connection(smtp_config) as server:
+        stale = server
+    stale.sock.shutdown(socket.SHUT_RDWR)  # type: ignore[union-attr]
+
+    with pool.connection(smtp_config) as server:
+        assert server is not stale
+        assert server.noop()[0] == 250
+
+    assert smtpd.handler.logins == 2
+    pool.close()
+
+
+@pytest.mark.usefixtures("app")
+def test_send_email_reconnects_when_connection_drops_while_sending(
+    smtpd: Controller, smtp_config: SMTPConfig, mocker: MockFixture
+) -> None:
+    assert send(smtp_config)
+
+    # the pooled connection passes the liveness check but is gone by the time the message is sent
+    ((stale, _),) = get_smtp_pool()._idle[smtp_config.pool_key]
+    mocker.patch.object(stale, "noop", return_value=(250, b"OK"))
+    stale.sock.shutdown(socket.SHUT_RDWR)  # type: ignore[union-attr]
+
+    assert send(smtp_config)
+
+    assert len(smtpd.handler.envelopes) == 2
+    assert smtpd.handler.logins == 2
+
+
+@pytest.mark.usefixtures("app")
+def test_pool_does_not_share_connections_across_passwords(
+    smtpd: Controller, smtp_config: SMTPConfig
+) -> None:
+    assert send(smtp_config)
+
+    other_config = create_smtp_config(
+        smtp_config.username,
+        smtp_config.server,
+        smtp_config.port,
+        "not the password",
+        smtp_config.sender,
+        encryption=smtp_config.encryption,
+    )
+    assert other_config.pool_key != smtp_config.pool_key
+    assert not send(other_config)
+
+    assert len(smtpd.handler.envelopes) == 1
+    assert smtpd.handler.logins == 1
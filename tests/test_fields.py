@@ -1,8 +1,12 @@
 from typing import List
 
 import pytest
+from flask import g
 from flask.testing import FlaskClient
+from pytest_mock import MockFixture
 
+from hushline.crypto import decrypt_field as decrypt_field_orig
+from hushline.crypto import encrypt_messages as encrypt_messages_orig
 from hushline.db import db
 from hushline.model import FieldDefinition, FieldType, FieldValue, Message, User, Username
 
@@ -154,3 +158,80 @@ def test_field_value_unencryption(user: User) -> None:
     db.session.commit()
 
     assert field_value.value == "this is a test value"
+
+
+def test_field_value_decryption_is_memoized(user: User, mocker: MockFixture) -> None:
+    username = user.primary_username
+    field_definition = FieldDefinition(username, "Plain", FieldType.TEXT, False, True, False, [])
+    message = Message(username_id=username.id)
+    db.session.add_all([field_definition, message])
+    db.session.flush()
+    field_value = FieldValue(field_definition, message, "first", False)
+
+    decrypt_field = mocker.patch(
+        "hushline.model.field_value.decrypt_field", wraps=decrypt_field_orig
+    )
+    assert field_value.value == "first"
+    assert field_value.value == "first"
+    decrypt_field.assert_called_once()
+
+    field_value.value = "second"
+    assert field_value.value == "second"
+    assert decrypt_field.call_count == 2
+
+    # only the most recently used values are kept
+    mocker.patch("hushline.model.field_value.DECRYPTED_VALUES_CACHE_SIZE", 1)
+    del g.decrypted_field_values
+    for value in ["third", "fourth"]:
+        field_value.value = value
+        assert field_value.value == value
+    assert len(g.decrypted_field_values) == 1
+
+
+@pytest.mark.usefixtures("_pgp_user")
+def test_field_value_insert_many(user: User, mocker: MockFixture) -> None:
+    username = user.primary_username
+    encrypted_field = username.message_fields[0]
+    plain_field = FieldDefinition(username, "Plain", FieldType.TEXT, False, True, False, [])
+    db.session.add(plain_field)
+
+    message = Message(username_id=username.id)
+    db.session.add(message)
+    db.session.flush()
+
+    encrypt_messages = mocker.patch(
+        "hushline.model.field_value.encrypt_messages", wraps=encrypt_messages_orig
+    )
+    stored = FieldValue.insert_many(
+        message,
+        [
+            (encrypted_field, "contact"),
+            (plain_field, ["a", "b"]),
+            (encrypted_field, "-----BEGIN PGP MESSAGE-----\n\nalready encrypted"),
+        ],
+        user.pgp_key,
+    )
+    db.session.commit()
+
+    # all PGP encryption happened in a single batch
+    encrypt_messages.assert_called_once()
+    assert len(encrypt_messages.call_args.args[0]) == 1
+
+    assert stored[0].startswith("-----BEGIN PGP MESSAGE-----")
+    assert stored[1] == "a\nb"
+    assert stored[2] == "-----BEGIN PGP MESSAGE-----\n\nalready encrypted"
+
+    db.session.refresh(message)
+    assert [x.value for x in sorted(message.field_values, key=lambda x: x.id)] == stored
+
+
+def test_field_value_insert_many_requires_pgp_key(user: User) -> None:
+    username = user.primary_username
+    encrypted_field = username.message_fields[0]
+
+    message = Message(username_id=username.id)
+    db.session.add(message)
+    db.session.flush()
+
+    with pytest.raises(ValueError, match="User does not have a PGP key"):
+        FieldValue.insert_many(message, [(encrypted_field, "value")], user.pgp_key)
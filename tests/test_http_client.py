@@ -0,0 +1,89 @@
+import asyncio
+from typing import Callable
+
+import aiohttp
+import pytest
+from aiohttp import web
+from flask import Flask
+
+from hushline.http_client import get_http_client, new_session, shutdown_http_client
+
+Serve = Callable[[web.Application], str]
+
+
+class EchoServer:
+    def __init__(self) -> None:
+        self.active = 0
+        self.max_active = 0
+        self.app = web.Application()
+        self.app.router.add_get("/", self.echo)
+        self.app.router.add_get("/peer", self.peer)
+        self.app.router.add_get("/slow", self.slow)
+
+    async def echo(self, request: web.Request) -> web.Response:
+        return web.Response(text=request.query.get("q", ""))
+
+    async def peer(self, request: web.Request) -> web.Response:
+        assert request.transport is not None
+        return web.Response(text=str(request.transport.get_extra_info("peername")))
+
+    async def slow(self, request: web.Request) -> web.Response:
+        self.active += 1
+        self.max_active = max(self.active, self.max_active)
+        try:
+            await asyncio.sleep(float(request.query["for"]))
+        finally:
+            self.active -= 1
+        return web.Response(text="done")
+
+
+@pytest.mark.usefixtures("app")
+def test_get_text(http_server: Serve) -> None:
+    url = http_server(EchoServer().app)
+    client = get_http_client()
+    assert get_http_client() is client
+
+    # parameters are escaped
+    assert client.get_text(url, params={"q": "a b&c=d"}) == (200, "a b&c=d")
+    assert client.get_text(url + "missing").status == 404
+
+
+@pytest.mark.usefixtures("app")
+def test_connections_are_reused(http_server: Serve) -> None:
+    url = http_server(EchoServer().app) + "peer"
+    client = get_http_client()
+    assert client.get_text(url).text == client.get_text(url).text
+
+
+def test_timeout(app: Flask, http_server: Serve) -> None:
+    url = http_server(EchoServer().app) + "slow"
+    app.config["OUTBOUND_HTTP_TIMEOUT_SECONDS"] = 0.1
+    with pytest.raises(asyncio.TimeoutError):
+        get_http_client().get_text(url, params={"for": "1"})
+
+
+def test_shutdown(app: Flask) -> None:
+    client = get_http_client()
+    shutdown_http_client()
+    assert "http_client" not in app.extensions
+    assert get_http_client() is not client
+
+
+@pytest.mark.asyncio()
+async def test_new_session(app: Flask, http_server: Serve) -> None:
+    server = EchoServer()
+    url = http_server(server.app) + "slow"
+    app.config["OUTBOUND_HTTP_MAX_CONNECTIONS"] = 10
+    app.config["OUTBOUND_HTTP_MAX_CONNECTIONS_PER_HOST"] = 2
+
+    async with new_session(app) as session:
+        assert isinstance(session.connector, aiohttp.TCPConnector)
+        assert session.connector.use_dns_cache
+        assert session.timeout.total == app.config["OUTBOUND_HTTP_TIMEOUT_SECONDS"]
+
+        async def get() -> str:
+            async with session.get(url, params={"for": "0.1"}) as response:
+                return await response.text()
+
+        assert await asyncio.gather(*(get() for _ in range(5))) == ["done"] * 5
+    assert server.max_active == 2
@@ -1,9 +1,20 @@
 import pytest
-from flask import url_for
+from bs4 import BeautifulSoup
+from flask import Flask, url_for
 from flask.testing import FlaskClient
+from helpers import count_queries
 
 from hushline.db import db
-from hushline.model import FieldValue, Message, MessageStatus, User, Username
+from hushline.model import (
+    FieldDefinition,
+    FieldType,
+    FieldValue,
+    Message,
+    MessageStatus,
+    User,
+    Username,
+)
+from hushline.routes.inbox import get_inbox_counts
 
 
 @pytest.mark.usefixtures("_authenticated_user")
@@ -116,3 +127,168 @@ def test_filter_on_status(client: FlaskClient, user: User, user_alias: Username)
         for other_msg in messages:
             if other_msg.id != msg.id:
                 assert f'href="{url_for("message", id=other_msg.id)}"' not in resp.text
+
+
+def make_messages(username: Username, count: int) -> list[Message]:
+    messages = []
+    for _ in range(count):
+        message = Message(username_id=username.id)
+        db.session.add(message)
+        messages.append(message)
+    db.session.commit()
+    # newest first, ties (same transaction) broken by id
+    return sorted(messages, key=lambda x: (x.created_at, x.id), reverse=True)
+
+
+@pytest.mark.usefixtures("_authenticated_user")
+def test_inbox_pagination(app: Flask, client: FlaskClient, user: User) -> None:
+    app.config["INBOX_PAGE_SIZE"] = 2
+    messages = make_messages(user.primary_username, 5)
+
+    seen: list[int] = []
+    url = url_for("inbox")
+    for _ in range(3):
+        resp = client.get(url)
+        assert resp.status_code == 200
+        soup = BeautifulSoup(resp.text, "html.parser")
+        seen.extend(
+            int(str(x["href"]).rsplit("/", 1)[-1]) for x in soup.select("article a.stretched-link")
+        )
+        if (load_more := soup.select_one("a.load-more")) is None:
+            break
+        url = str(load_more["href"])
+
+    assert seen == [x.id for x in messages]
+    assert load_more is None
+
+
+@pytest.mark.usefixtures("_authenticated_user")
+def test_inbox_json_pagination(app: Flask, client: FlaskClient, user: User) -> None:
+    app.config["INBOX_PAGE_SIZE"] = 2
+    messages = make_messages(user.primary_username, 4)
+    messages[0].status = MessageStatus.ARCHIVED
+    db.session.commit()
+    pending = [x for x in messages if x.status == MessageStatus.PENDING]
+
+    resp = client.get(url_for("inbox_json", status=MessageStatus.PENDING.value))
+    assert resp.status_code == 200
+    assert resp.json
+    assert [x["id"] for x in resp.json["messages"]] == [x.id for x in pending[:2]]
+    assert resp.json["messages"][0]["url"] == url_for("message", id=pending[0].id)
+    assert resp.json["messages"][0]["username"] == user.primary_username.username
+
+    resp = client.get(resp.json["next_url"])
+    assert resp.status_code == 200
+    assert resp.json
+    assert [x["id"] for x in resp.json["messages"]] == [x.id for x in pending[2:]]
+    assert resp.json["next_cursor"] is None
+    assert resp.json["next_url"] is None
+
+
+@pytest.mark.usefixtures("_authenticated_user")
+def test_inbox_invalid_cursor(client: FlaskClient) -> None:
+    for cursor in ["wat", "1-2-3", "99999999999999999999999-1"]:
+        assert client.get(url_for("inbox", cursor=cursor)).status_code == 400
+        assert client.get(url_for("inbox_json", cursor=cursor)).status_code == 400
+
+
+def test_inbox_counts(user: User, user2: User, user_alias: Username) -> None:
+    assert get_inbox_counts(user) == ([(x, 0) for x in MessageStatus], 2)
+
+    messages = make_messages(user.primary_username, 2) + make_messages(user_alias, 1)
+    messages[0].status = MessageStatus.ACCEPTED
+    make_messages(user2.primary_username, 1)
+    db.session.commit()
+
+    message_statuses, alias_count = get_inbox_counts(user)
+    assert dict(message_statuses) == {
+        MessageStatus.PENDING: 2,
+        MessageStatus.ACCEPTED: 1,
+        MessageStatus.DECLINED: 0,
+        MessageStatus.ARCHIVED: 0,
+    }
+    assert alias_count == 2
+
+
+def make_message_with_values(username: Username, values: list[str]) -> Message:
+    message = Message(username_id=username.id)
+    db.session.add(message)
+    db.session.flush()
+    for i, value in enumerate(values):
+        field_definition = FieldDefinition(
+            username, f"Field {i}", FieldType.TEXT, False, True, False, []
+        )
+        db.session.add(field_definition)
+        db.session.add(FieldValue(field_definition, message, value, False))
+    db.session.commit()
+    return message
+
+
+@pytest.mark.usefixtures("_authenticated_user")
+def test_message_loads_field_values_eagerly(client: FlaskClient, user: User) -> None:
+    client.get(url_for("inbox"))  # warm up the app's caches
+    query_counts = []
+    for value_count in [1, 4]:
+        message = make_message_with_values(
+            user.primary_username, [f"value {i}" for i in range(value_count)]
+        )
+        with count_queries() as statements:
+            resp = client.get(url_for("message", id=message.id))
+        assert resp.status_code == 200
+        for i in range(value_count):
+            assert f"value {i}" in resp.text
+        query_counts.append(len(statements))
+
+    # the number of queries doesn't depend on the number of fields
+    assert query_counts[0] == query_counts[1]
+
+
+@pytest.mark.usefixtures("_authenticated_user")
+def test_inbox_previews(app: Flask, client: FlaskClient, user: User) -> None:
+    message = make_message_with_values(user.primary_username, ["first value", "second value"])
+
+    resp = client.get(url_for("inbox"))
+    assert resp.status_code == 200
+    assert "first value" not in resp.text
+    resp = client.get(url_for("inbox_json"))
+    assert resp.json
+    assert "preview" not in resp.json["messages"][0]
+
+    app.config["INBOX_PREVIEWS_ENABLED"] = True
+    resp = client.get(url_for("inbox"))
+    assert resp.status_code == 200
+    soup = BeautifulSoup(resp.text, "html.parser")
+    (preview,) = soup.select("article .preview")
+    assert " ".join(preview.text.split()) == "Field 0: first value"
+    assert "second value" not in resp.text
+
+    resp = client.get(url_for("inbox_json"))
+    assert resp.json
+    (json_message,) = resp.json["messages"]
+    assert json_message["id"] == message.id
+    assert json_message["preview"] == {
+        "label": "Field 0",
+        "encrypted": False,
+        "value": "first value",
+    }
+
+    message.field_values[0].encrypted = True
+    db.session.commit()
+    resp = client.get(url_for("inbox"))
+    assert "🔒 Encrypted" in resp.text
+    assert "first value" not in resp.text
+
+
+@pytest.mark.usefixtures("_authenticated_user")
+def test_inbox_previews_query_count(app: Flask, client: FlaskClient, user: User) -> None:
+    app.config["INBOX_PREVIEWS_ENABLED"] = True
+    client.get(url_for("inbox"))  # warm up the app's caches
+    query_counts = []
+    for _ in range(2):
+        make_message_with_values(user.primary_username, ["a", "b"])
+        with count_queries() as statements:
+            assert client.get(url_for("inbox")).status_code == 200
+        query_counts.append(len(statements))
+
+    # the number of queries doesn't depend on the number of messages
+    assert query_counts[0] == query_counts[1]
@@ -0,0 +1,60 @@
+import threading
+
+from markupsafe import Markup
+
+from hushline import md
+from hushline.md import md_to_html
+
+
+def test_md_to_html_sanitizes() -> None:
+    html = md_to_html("**hi** <script>alert(1)</script> [link](https://example.com)")
+    assert html == Markup(
+        "<p><strong>hi</strong> &lt;script&gt;alert(1)&lt;/script&gt; "
+        '<a href="https://example.com">link</a></p>'
+    )
+
+
+def test_md_to_html_passes_markup_through() -> None:
+    markup = Markup("<script>kept</script>")
+    assert md_to_html(markup) is markup
+
+
+def test_md_to_html_is_cached() -> None:
+    md.html_cache.clear()
+
+    first = md_to_html("# A heading")
+    assert md_to_html("# A heading") is first
+    assert (md.html_cache.hits, md.html_cache.misses) == (1, 1)
+
+    # renderer state (e.g. footnotes, references) doesn't leak between texts
+    assert md_to_html("[a]: https://example.com\n\n[link][a]") == Markup(
+        '<p><a href="https://example.com">link</a></p>'
+    )
+    assert md_to_html("[link][a]") == Markup("<p>[link][a]</p>")
+
+
+def test_md_to_html_does_not_cache_long_texts() -> None:
+    md.html_cache.clear()
+    text = "a" * (md.HTML_CACHE_MAX_LENGTH + 1)
+    assert md_to_html(text) == Markup(f"<p>{text}</p>")
+    assert len(md.html_cache) == 0
+
+
+def test_md_to_html_threads() -> None:
+    # every text is new, so each thread renders with its own renderer at the same time
+    results: dict[str, Markup] = {}
+
+    def render(thread: int) -> None:
+        for i in range(50):
+            text = f"*{thread}-{i}*"
+            results[text] = md_to_html(text)
+
+    threads = [threading.Thread(target=render, args=(x,)) for x in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 200
+    for text, html in results.items():
+        assert html == Markup(f"<p><em>{text.strip('*')}</em></p>")
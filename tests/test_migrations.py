@@ -27,6 +27,13 @@ SKIPPABLE_REVISIONS = [
     "06b343c38386",  # only renames indices and tables, no data changed
     "6071f1eea074",  # simple add/drop on columns, no data migrated
     "f32aa741ddc4",  # simple add/drop on columns, no data migrated
+    "e3d11433ea65",  # new table, no data migrated
+    "6446bb6d8374",  # simple add/drop on columns, no data migrated
+    "ec511b2bea66",  # only adds indices, no data changed
+    "3e73101de57b",  # only adds an index, no data changed
+    "5c2d7e9a1f04",  # new table, no data migrated
+    "8e41b0c7d3a9",  # new table, no data migrated
+    "b3f6a2d81c57",  # new table, no data migrated
 ]
 DISALLOWED_DOWNGRADES = [
     "4a53667aff6e",  # downgrading is disabled to prevent accidental data loss
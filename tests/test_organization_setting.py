@@ -0,0 +1,69 @@
+from flask import Flask
+from helpers import count_queries
+
+from hushline.db import db
+from hushline.model import OrganizationSetting
+
+
+def test_fetch_is_cached(app: Flask) -> None:
+    assert OrganizationSetting.fetch_one(OrganizationSetting.BRAND_NAME) == "🤫 Hush Line"
+
+    with count_queries() as statements:
+        assert OrganizationSetting.fetch(
+            OrganizationSetting.BRAND_NAME, OrganizationSetting.HOMEPAGE_USER_NAME
+        ) == {
+            OrganizationSetting.BRAND_NAME: "🤫 Hush Line",
+            OrganizationSetting.HOMEPAGE_USER_NAME: None,
+        }
+        OrganizationSetting.fetch_one(OrganizationSetting.BRAND_NAME)
+    assert statements == []
+
+
+def test_upsert_invalidates_cache(app: Flask) -> None:
+    assert OrganizationSetting.fetch_one(OrganizationSetting.BRAND_NAME) == "🤫 Hush Line"
+
+    # uncommitted changes are visible to the session making them, but aren't cached
+    OrganizationSetting.upsert(OrganizationSetting.BRAND_NAME, "Uncommitted")
+    assert OrganizationSetting.fetch_one(OrganizationSetting.BRAND_NAME) == "Uncommitted"
+    db.session.rollback()
+    assert OrganizationSetting.fetch_one(OrganizationSetting.BRAND_NAME) == "🤫 Hush Line"
+
+    OrganizationSetting.upsert(OrganizationSetting.BRAND_NAME, "Committed")
+    db.session.commit()
+    with count_queries() as statements:
+        for _ in range(2):
+            assert OrganizationSetting.fetch_one(OrganizationSetting.BRAND_NAME) == "Committed"
+    assert len(statements) == 1
+
+
+def test_invalidate_cache_after_delete(app: Flask) -> None:
+    OrganizationSetting.upsert(OrganizationSetting.HOMEPAGE_USER_NAME, "someone")
+    db.session.commit()
+    assert OrganizationSetting.fetch_one(OrganizationSetting.HOMEPAGE_USER_NAME) == "someone"
+
+    OrganizationSetting.invalidate_cache()
+    db.session.execute(db.delete(OrganizationSetting))
+    db.session.commit()
+    assert OrganizationSetting.fetch_one(OrganizationSetting.HOMEPAGE_USER_NAME) is None
+
+
+def test_fetched_values_are_copies(app: Flask) -> None:
+    prompts = OrganizationSetting.fetch_one(OrganizationSetting.GUIDANCE_PROMPTS)
+    prompts.append({"heading_text": "changed", "prompt_text": "", "index": 1})
+
+    assert OrganizationSetting.fetch_one(OrganizationSetting.GUIDANCE_PROMPTS) == [
+        {"heading_text": "", "prompt_text": "", "index": 0}
+    ]
+
+
+def test_fetch_template_is_compiled_once(app: Flask) -> None:
+    key = OrganizationSetting.BRAND_PROFILE_HEADER_TEMPLATE
+    template = OrganizationSetting.fetch_template(key)
+    assert template.render({"display_name_or_username": "Alice"}) == "Submit a message to Alice"
+    assert OrganizationSetting.fetch_template(key) is template
+
+    OrganizationSetting.upsert(key, "Write to {{ username }}")
+    db.session.commit()
+    template = OrganizationSetting.fetch_template(key)
+    assert template.render({"username": "bob"}) == "Write to bob"
+    assert OrganizationSetting.fetch_template(key) is template
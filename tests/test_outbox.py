@@ -0,0 +1,256 @@
+from datetime import datetime, timedelta, timezone
+from email import message_from_bytes
+
+import pytest
+from aiosmtpd.controller import Controller
+from flask import Flask, url_for
+from flask.testing import FlaskClient
+from helpers import get_captcha_from_session
+from pytest_mock import MockFixture
+
+from hushline import outbox
+from hushline.db import db
+from hushline.model import NotificationStatus, OutboxNotification, User
+
+plaintext_new_message_body = "You have a new Hush Line message! Please log in to read it."
+
+
+def queued_notifications(user: User) -> list[OutboxNotification]:
+    return list(db.session.scalars(db.select(OutboxNotification).filter_by(user_id=user.id)).all())
+
+
+@pytest.mark.usefixtures("_pgp_user")
+@pytest.mark.usefixtures("_smtp_user")
+def test_submit_message_queues_notification(
+    client: FlaskClient, user: User, smtpd: Controller, mocker: MockFixture
+) -> None:
+    user.email_include_message_content = False
+    db.session.commit()
+    send_email = mocker.patch("hushline.outbox.send_email")
+
+    response = client.post(
+        url_for("profile", username=user.primary_username.username),
+        data={
+            "field_0": "I prefer Signal.",
+            "field_1": "This is a test message.",
+            "captcha_answer": get_captcha_from_session(client, user.primary_username.username),
+        },
+        follow_redirects=True,
+    )
+    assert response.status_code == 200, response.text
+    assert "Message submitted successfully." in response.text
+
+    # nothing is sent from the request itself
+    send_email.assert_not_called()
+    assert smtpd.handler.envelopes == []
+
+    (notification,) = queued_notifications(user)
+    assert notification.status == NotificationStatus.PENDING
+    assert notification.body == plaintext_new_message_body
+    assert notification._body != plaintext_new_message_body  # encrypted at rest
+
+
+@pytest.mark.usefixtures("_smtp_user")
+def test_process_next_sends_notification(user: User, smtpd: Controller) -> None:
+    user.email_include_message_content = True
+    user.email_encrypt_entire_body = False
+    outbox.enqueue_notification(user, "hello from the outbox")
+    db.session.commit()
+
+    assert outbox.process_next()
+
+    (envelope,) = smtpd.handler.envelopes
+    assert envelope.rcpt_tos == ["user@example.com"]
+    assert envelope.mail_from == "notifications@example.com"
+    assert b"hello from the outbox" in envelope.content
+    assert queued_notifications(user) == []
+
+    assert not outbox.process_next()
+
+
+@pytest.mark.usefixtures("_smtp_user")
+def test_process_next_retries_with_backoff(app: Flask, user: User, smtpd: Controller) -> None:
+    app.config["NOTIFICATIONS_MAX_ATTEMPTS"] = 2
+    user.smtp_password = "wrong password"
+    outbox.enqueue_notification(user, "hello from the outbox")
+    db.session.commit()
+
+    assert outbox.process_next()
+
+    (notification,) = queued_notifications(user)
+    assert notification.status == NotificationStatus.PENDING
+    assert notification.attempts == 1
+    assert notification.error_message
+    assert notification.next_attempt_at > datetime.now(timezone.utc)
+
+    # not due yet
+    assert not outbox.process_next()
+
+    notification.next_attempt_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db.session.commit()
+    assert outbox.process_next()
+
+    (notification,) = queued_notifications(user)
+    assert notification.status == NotificationStatus.FAILED
+    assert notification.attempts == 2
+    assert notification.body is None
+    assert smtpd.handler.envelopes == []
+
+    # failed notifications are not retried
+    assert not outbox.process_next()
+
+
+@pytest.mark.usefixtures("_smtp_user")
+def test_process_next_drops_notification_when_disabled(user: User, smtpd: Controller) -> None:
+    outbox.enqueue_notification(user, "hello from the outbox")
+    user.enable_email_notifications = False
+    db.session.commit()
+
+    assert outbox.process_next()
+    assert queued_notifications(user) == []
+    assert smtpd.handler.envelopes == []
+
+
+def test_retry_delay(app: Flask) -> None:
+    app.config["NOTIFICATIONS_RETRY_DELAY_SECONDS"] = 60
+    assert outbox.retry_delay(1) == timedelta(minutes=1)
+    assert outbox.retry_delay(3) == timedelta(minutes=4)
+    assert outbox.retry_delay(100) == outbox.MAX_RETRY_DELAY
+
+
+@pytest.mark.usefixtures("_smtp_user")
+def test_digest_sent_once_enough_messages_arrive(app: Flask, user: User, smtpd: Controller) -> None:
+    app.config["NOTIFICATIONS_DIGEST_MAX_MESSAGES"] = 3
+    user.email_digest_enabled = True
+    user.email_include_message_content = True
+    user.email_encrypt_entire_body = False
+    for i in range(2):
+        outbox.enqueue_notification(user, f"message {i}")
+    db.session.commit()
+
+    # held back until the digest is due
+    assert outbox.process_next()
+    assert not outbox.process_next()
+    assert smtpd.handler.envelopes == []
+    assert len(queued_notifications(user)) == 2
+
+    outbox.enqueue_notification(user, "message 2")
+    db.session.commit()
+    assert outbox.process_next()
+
+    (envelope,) = smtpd.handler.envelopes
+    assert b"Subject: New Hush Line Messages Received" in envelope.content
+    for i in range(3):
+        assert f"message {i}".encode() in envelope.content
+    assert smtpd.handler.logins == 1
+    assert queued_notifications(user) == []
+
+
+@pytest.mark.usefixtures("_smtp_user")
+def test_digest_sent_after_interval(user: User, smtpd: Controller) -> None:
+    user.email_digest_enabled = True
+    user.email_include_message_content = False
+    for _ in range(2):
+        outbox.enqueue_notification(user, plaintext_new_message_body)
+    db.session.commit()
+
+    assert outbox.process_next()
+    assert not outbox.process_next()
+    assert smtpd.handler.envelopes == []
+
+    for notification in queued_notifications(user):
+        assert notification.next_attempt_at > datetime.now(timezone.utc)
+        notification.created_at -= timedelta(days=1)
+        notification.next_attempt_at -= timedelta(days=1)
+    db.session.commit()
+
+    assert outbox.process_next()
+    (envelope,) = smtpd.handler.envelopes
+    assert b"You have 2 new Hush Line messages! Please log in to read them." in envelope.content
+    assert plaintext_new_message_body.encode() not in envelope.content
+    assert queued_notifications(user) == []
+
+
+@pytest.mark.usefixtures("_smtp_user")
+def test_digest_of_encrypted_bodies_has_no_plaintext(
+    app: Flask, user: User, smtpd: Controller
+) -> None:
+    app.config["NOTIFICATIONS_DIGEST_MAX_MESSAGES"] = 2
+    user.email_digest_enabled = True
+    user.email_include_message_content = True
+    user.email_encrypt_entire_body = True
+    bodies = [f"-----BEGIN PGP MESSAGE-----\n\n{i}\n-----END PGP MESSAGE-----" for i in range(2)]
+    for body in bodies:
+        outbox.enqueue_notification(user, body)
+    db.session.commit()
+
+    assert outbox.process_next()
+
+    (envelope,) = smtpd.handler.envelopes
+    message = message_from_bytes(envelope.content)
+    (part,) = (x for x in message.walk() if x.get_content_type() == "text/plain")
+    payload = part.get_payload(decode=True)
+    assert isinstance(payload, bytes)
+    assert payload.decode().replace("\r\n", "\n") == "\n\n".join(bodies)
+
+
+@pytest.mark.parametrize(
+    ("include_content", "encrypt_entire_body"), [(False, False), (False, True), (True, True)]
+)
+@pytest.mark.usefixtures("_smtp_user")
+def test_plaintext_body_not_sent_after_settings_change(
+    user: User, smtpd: Controller, include_content: bool, encrypt_entire_body: bool
+) -> None:
+    user.email_include_message_content = True
+    user.email_encrypt_entire_body = False
+    outbox.enqueue_notification(user, "Message\n\nsecret plaintext")
+    db.session.commit()
+
+    user.email_include_message_content = include_content
+    user.email_encrypt_entire_body = encrypt_entire_body
+    db.session.commit()
+    assert outbox.process_next()
+
+    (envelope,) = smtpd.handler.envelopes
+    assert plaintext_new_message_body.encode() in envelope.content
+    assert b"secret plaintext" not in envelope.content
+
+
+@pytest.mark.usefixtures("_smtp_user")
+def test_digest_checks_bodies_against_current_settings(
+    app: Flask, user: User, smtpd: Controller
+) -> None:
+    app.config["NOTIFICATIONS_DIGEST_MAX_MESSAGES"] = 3
+    user.email_digest_enabled = True
+    user.email_include_message_content = True
+    user.email_encrypt_entire_body = False
+    outbox.enqueue_notification(user, "secret plaintext")
+    outbox.enqueue_notification(user, plaintext_new_message_body)
+    db.session.commit()
+
+    # queued before the user turned on "encrypt entire body"
+    user.email_encrypt_entire_body = True
+    encrypted_body = "-----BEGIN PGP MESSAGE-----\n\n0\n-----END PGP MESSAGE-----"
+    outbox.enqueue_notification(user, encrypted_body)
+    db.session.commit()
+    assert outbox.process_next()
+
+    (envelope,) = smtpd.handler.envelopes
+    message = message_from_bytes(envelope.content)
+    (part,) = (x for x in message.walk() if x.get_content_type() == "text/plain")
+    payload = part.get_payload(decode=True)
+    assert isinstance(payload, bytes)
+    assert payload.decode().replace("\r\n", "\n") == "\n\n".join(
+        [plaintext_new_message_body, plaintext_new_message_body, encrypted_body]
+    )
+
+    # and a digest of only generic bodies is summarized
+    user.email_include_message_content = False
+    for body in ("secret plaintext", encrypted_body, plaintext_new_message_body):
+        outbox.enqueue_notification(user, body)
+    db.session.commit()
+    assert outbox.process_next()
+
+    envelope = smtpd.handler.envelopes[1]
+    assert b"You have 3 new Hush Line messages! Please log in to read them." in envelope.content
+    assert b"secret plaintext" not in envelope.content
@@ -4,10 +4,11 @@ import pytest
 from bs4 import BeautifulSoup
 from flask import Flask, url_for
 from flask.testing import FlaskClient
-from helpers import get_captcha_from_session
+from helpers import count_queries, get_captcha_from_session
 
 from hushline.db import db
 from hushline.model import Message, OrganizationSetting, User, Username
+from hushline.routes.forms import DynamicMessageForm
 
 msg_contact_method = "I prefer Signal."
 msg_content = "This is a test message."
@@ -75,6 +76,27 @@ def test_profile_submit_message(client: FlaskClient, user: User) -> None:
     assert pgp_message_sig in response.text, response.text
 
 
+@pytest.mark.usefixtures("_pgp_user")
+def test_profile_captcha_is_answered_once(client: FlaskClient, user: User) -> None:
+    profile_url = url_for("profile", username=user.primary_username.username)
+    captcha_answer = get_captcha_from_session(client, user.primary_username.username)
+
+    # the same problem is shown until it's been answered
+    client.get(profile_url)
+    with client.session_transaction() as session:
+        assert session["math_answer"] == captcha_answer
+
+    data = {"field_0": msg_contact_method, "field_1": msg_content, "captcha_answer": "0"}
+    response = client.post(profile_url, data=data, follow_redirects=True)
+    assert "Incorrect CAPTCHA" in response.text
+
+    # the answer can't be tried again
+    data["captcha_answer"] = captcha_answer
+    response = client.post(profile_url, data=data, follow_redirects=True)
+    assert "Incorrect CAPTCHA" in response.text
+    assert not db.session.scalars(db.select(Message)).all()
+
+
 @pytest.mark.usefixtures("_authenticated_user")
 @pytest.mark.usefixtures("_pgp_user")
 def test_profile_submit_message_to_alias(
@@ -150,3 +172,32 @@ def test_profile_extra_fields(client: FlaskClient, app: Flask, user: User) -> No
         or "&lt;script&gt;alert('xss')&lt;/script&gt;" in html_str
     )
     assert "<script>alert('xss')</script>" not in html_str
+
+
+def test_profile_page_does_not_write(client: FlaskClient, user: User) -> None:
+    # even without any fields, the defaults aren't created on the read path
+    for field in user.primary_username.message_fields:
+        db.session.delete(field)
+    db.session.commit()
+
+    with count_queries() as statements:
+        resp = client.get(url_for("profile", username=user.primary_username.username))
+    assert resp.status_code == 200
+    assert [x for x in statements if not x.lstrip().startswith("SELECT")] == []
+
+
+def test_profile_form_class_is_cached(user: User, user2: User) -> None:
+    username = user.primary_username
+    form = DynamicMessageForm.for_username(username)
+    assert DynamicMessageForm.for_username(username).F is form.F
+    # same fields, same class
+    assert DynamicMessageForm.for_username(user2.primary_username).F is form.F
+    assert form.field_from_name("field_1") is username.message_fields[1]
+    assert form.field_from_name("field_2") is None
+
+    username.message_fields[0].label = "Signal username"
+    db.session.commit()
+
+    new_form_class = DynamicMessageForm.for_username(username).F
+    assert new_form_class is not form.F
+    assert new_form_class.field_0.args[0] == "Signal username"  # type: ignore[attr-defined]
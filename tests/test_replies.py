@@ -1,13 +1,13 @@
 from uuid import uuid4
 
 import pytest
-from flask import url_for
+from flask import Flask, url_for
 from flask.testing import FlaskClient
 
 from hushline.db import db
 from hushline.model import Message, MessageStatus, MessageStatusText, User
 from hushline.settings.forms import SetMessageStatusTextForm
-from tests.helpers import form_to_data
+from tests.helpers import count_queries, form_to_data
 
 
 def test_default_replies(client: FlaskClient, user: User, message: Message) -> None:
@@ -28,12 +28,7 @@ def test_custom_replies(client: FlaskClient, user: User, message: Message) -> No
     for status in MessageStatus:
         text = str(uuid4())
         message.status = status
-        msg_status_txt = MessageStatusText(
-            user_id=user.id,  # type: ignore[call-arg]
-            status=status,  # type: ignore[call-arg]
-            markdown=text,  # type: ignore[call-arg]
-        )
-        db.session.add(msg_status_txt)
+        MessageStatusText.upsert(user.id, status, text)
         db.session.commit()
 
         resp = client.get(url_for("message_reply", slug=message.reply_slug))
@@ -43,6 +38,37 @@ def test_custom_replies(client: FlaskClient, user: User, message: Message) -> No
         assert status.default_text not in resp.text
 
 
+def test_reply_page_caches_status_texts(
+    app: Flask, client: FlaskClient, user: User, message: Message
+) -> None:
+    url = url_for("message_reply", slug=message.reply_slug)
+    assert client.get(url).status_code == 200
+
+    # once the texts are cached, only the message (and its username) is loaded
+    with count_queries() as statements:
+        resp = client.get(url)
+    assert resp.status_code == 200
+    assert message.status.default_text in resp.text
+    assert not [x for x in statements if "message_status_text" in x]
+    assert len([x for x in statements if "FROM messages" in x]) == 1
+    assert not [x for x in statements if "FROM usernames" in x]
+
+    text = str(uuid4())
+    MessageStatusText.upsert(user.id, message.status, text)
+    # the old texts are still cached until the change is committed
+    assert MessageStatusText.markdown_for_user(user.id) == {message.status: text}
+    with app.app_context():
+        assert MessageStatusText.markdown_for_user(user.id) == {}
+    db.session.commit()
+    assert text in client.get(url).text
+
+    MessageStatusText.upsert(user.id, message.status, "")
+    db.session.commit()
+    resp = client.get(url)
+    assert text not in resp.text
+    assert message.status.default_text in resp.text
+
+
 @pytest.mark.usefixtures("_authenticated_user")
 def test_set_custom_replies(client: FlaskClient, user: User) -> None:
     # Make the user an admin for this test
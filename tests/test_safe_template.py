@@ -1,8 +1,17 @@
+import random
 import typing
+from typing import Callable, Mapping, Optional
 
 import pytest
 
-from hushline.safe_template import TemplateError, safe_render_template
+from hushline.safe_template import (
+    VAR_END,
+    VAR_START,
+    VARIABLE_SYNTAX,
+    TemplateError,
+    compile_template,
+    safe_render_template,
+)
 
 
 def test_empty() -> None:
@@ -54,3 +63,80 @@ def test_multiple_vars() -> None:
         "hello {{ name }}. my name is {{ self }}. :)", {"name": "world", "self": "bob"}
     )
     assert result == "hello world. my name is bob. :)"
+
+
+def test_compiled_template_renders_many_times() -> None:
+    template = compile_template("hello {{ name }}!")
+    assert template.render({"name": "world"}) == "hello world!"
+    assert template.render({"name": None}) == "hello !"
+    with pytest.raises(TemplateError, match="Variable not defined: name"):
+        template.render({})
+
+
+def reference_render(template_string: str, variables: Mapping[str, Optional[str]]) -> str:
+    """
+    The original, uncompiled implementation that the compiled templates must be equivalent to.
+    """
+    for name, value in variables.items():
+        if not VARIABLE_SYNTAX.search(name):
+            raise TemplateError(f"Variable with invalid syntax: {name}")
+        if not isinstance(value, str) and value is not None:
+            raise ValueError(f"Variable {name} was not a string: {value}")
+
+    out = ""
+
+    while template_string:
+        var_start_idx = template_string.find(VAR_START)
+
+        if var_start_idx < 0:
+            if template_string.find(VAR_END) >= 0:
+                raise TemplateError("Invalid syntax. Extra variable substitution braces.")
+
+            out += template_string
+            break
+
+        if var_start_idx != 0:
+            out += template_string[0:var_start_idx]
+
+        var_end_idx = template_string.find(VAR_END)
+        if var_end_idx < 0:
+            raise TemplateError("Invalid syntax. Variable substitution braces not closed.")
+
+        var_name = template_string[var_start_idx + 2 : var_end_idx].strip()
+        if var_name not in variables:
+            raise TemplateError(f"Variable not defined: {var_name}")
+
+        out += variables[var_name] or ""
+        template_string = template_string[var_end_idx + 2 :]
+
+    return out
+
+
+# pieces that random templates are made of, biased towards the syntax's edge cases
+TEMPLATE_FRAGMENTS = ["{{", "}}", "{", "}", " ", "name", "other", "bad name", "text", "\n", "é"]
+VARIABLE_NAMES = ["name", "other", "bad name", "1st"]
+
+
+def outcome(func: Callable[[], str]) -> tuple[str, str]:
+    try:
+        return "ok", func()
+    except (TemplateError, ValueError) as e:
+        return type(e).__name__, str(e)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_compiled_template_matches_reference(seed: int) -> None:
+    rng = random.Random(seed)
+    for _ in range(250):
+        template_string = "".join(rng.choice(TEMPLATE_FRAGMENTS) for _ in range(rng.randrange(12)))
+        variables = {
+            name: rng.choice([None, "", "value", "{{ name }}"])
+            for name in VARIABLE_NAMES
+            if rng.random() < 0.4
+        }
+
+        expected = outcome(lambda: reference_render(template_string, variables))
+        assert outcome(lambda: compile_template(template_string).render(variables)) == expected, (
+            template_string,
+            variables,
+        )
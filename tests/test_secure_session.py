@@ -1,15 +1,25 @@
+import json
+from datetime import datetime, timezone
 from typing import Generator
 
 import pytest
 from cryptography.fernet import Fernet
 from flask import Flask, request, session, url_for
+from flask.sessions import SessionInterface
 from flask.testing import FlaskClient
+from pytest_mock import MockFixture
 
-from hushline.secure_session import EncryptedSessionInterface
+from hushline.secure_session import (
+    ROTATION_GRACE,
+    EncryptedSessionInterface,
+    ServerSideSessionInterface,
+)
+from hushline.session_store import MemorySessionStore
 
 FERNET_KEY = Fernet.generate_key().decode("utf-8")
 ARG_KEY = "x"
 SESSION_KEY = "y"
+LIST_KEY = "z"
 MISSING = "missing"
 
 
@@ -17,12 +27,16 @@ class Fixtures:
     HAS_SESSION_KEY = True
 
     @pytest.fixture()
-    def app(self) -> Generator[Flask, None, None]:
+    def session_interface(self) -> SessionInterface:
+        return EncryptedSessionInterface()
+
+    @pytest.fixture()
+    def app(self, session_interface: SessionInterface) -> Generator[Flask, None, None]:
         app_ = Flask(__name__)
         if self.HAS_SESSION_KEY:
             app_.config["SESSION_FERNET_KEY"] = FERNET_KEY
         app_.config["SERVER_NAME"] = "localhost.tld"
-        app_.session_interface = EncryptedSessionInterface()
+        app_.session_interface = session_interface
 
         @app_.route("/session", methods=["GET", "POST", "DELETE"])
         def has_session() -> str:
@@ -32,6 +46,19 @@ class Fixtures:
                 del session[SESSION_KEY]
             return session.get(SESSION_KEY, MISSING)
 
+        @app_.route("/permanent", methods=["POST"])
+        def permanent() -> str:
+            session.permanent = True
+            session[SESSION_KEY] = request.args[ARG_KEY]
+            session[LIST_KEY] = []
+            return ""
+
+        @app_.route("/append", methods=["POST"])
+        def append() -> str:
+            # changes a mutable value without marking the session as modified
+            session[LIST_KEY].append(request.args[ARG_KEY])
+            return ""
+
         @app_.route("/no-session", methods=["GET", "POST"])
         def no_session() -> str:
             return ""
@@ -68,6 +95,140 @@ class TestSessionEnabled(Fixtures):
         assert resp.status_code == 200
         assert resp.text == MISSING
 
+    def test_unchanged_session_is_not_sent_again(self, app: Flask, client: FlaskClient) -> None:
+        app.config["SESSION_REFRESH_THRESHOLD_SECONDS"] = 60
+        resp = client.post(url_for("permanent", **{ARG_KEY: "a"}))  # type: ignore[arg-type]
+        assert "Set-Cookie" in resp.headers
+
+        resp = client.get(url_for("has_session"))
+        assert resp.text == "a"
+        assert "Set-Cookie" not in resp.headers
+
+        # changed without marking the session as modified
+        resp = client.post(url_for("append", **{ARG_KEY: "b"}))  # type: ignore[arg-type]
+        assert "Set-Cookie" in resp.headers
+        with client.session_transaction() as sess:
+            assert sess[LIST_KEY] == ["b"]
+
+    def test_unchanged_session_is_refreshed(self, app: Flask, client: FlaskClient) -> None:
+        app.config["SESSION_REFRESH_THRESHOLD_SECONDS"] = 0
+        client.post(url_for("permanent", **{ARG_KEY: "a"}))  # type: ignore[arg-type]
+
+        resp = client.get(url_for("has_session"))
+        assert resp.text == "a"
+        assert "Set-Cookie" in resp.headers
+
+    def test_key_rotation(self, app: Flask, client: FlaskClient) -> None:
+        app.config["SESSION_REFRESH_THRESHOLD_SECONDS"] = 60
+        client.post(url_for("permanent", **{ARG_KEY: "a"}))  # type: ignore[arg-type]
+
+        new_key = Fernet.generate_key().decode("utf-8")
+        app.config["SESSION_FERNET_KEY"] = f"{new_key},{FERNET_KEY}"
+
+        # sessions encrypted with the old key still work, and are re-encrypted with the new one
+        resp = client.get(url_for("has_session"))
+        assert resp.text == "a"
+        assert "Set-Cookie" in resp.headers
+        cookie = client.get_cookie(app.config["SESSION_COOKIE_NAME"], domain="localhost.tld")
+        assert cookie is not None
+        assert Fernet(new_key).decrypt(cookie.value)
+
+        # the old key can be removed
+        app.config["SESSION_FERNET_KEY"] = new_key
+        resp = client.get(url_for("has_session"))
+        assert resp.text == "a"
+        assert "Set-Cookie" not in resp.headers
+
+    def test_fernets_are_cached(self, app: Flask, client: FlaskClient) -> None:
+        client.post(url_for("has_session", **{ARG_KEY: "a"}))  # type: ignore[arg-type]
+        fernets = app.extensions["session_fernets"]
+
+        client.get(url_for("has_session"))
+        assert app.extensions["session_fernets"] is fernets
+
+
+class TestServerSideSession(Fixtures):
+    @pytest.fixture()
+    def store(self) -> MemorySessionStore:
+        return MemorySessionStore(touch_interval=3600)
+
+    @pytest.fixture()
+    def session_interface(self, store: MemorySessionStore) -> SessionInterface:
+        return ServerSideSessionInterface(store)
+
+    def session_id(self, client: FlaskClient) -> str | None:
+        cookie = client.get_cookie("session", domain="localhost.tld")
+        return cookie.value if cookie else None
+
+    def test_get_set(self, client: FlaskClient, store: MemorySessionStore) -> None:
+        resp = client.post(url_for("has_session", **{ARG_KEY: "a"}))  # type: ignore[arg-type]
+        assert resp.text == "a"
+        sid = self.session_id(client)
+        assert sid in store.sessions
+        # the session is encrypted
+        data = store.sessions[sid][0]
+        assert b'"a"' not in data
+        assert json.loads(Fernet(FERNET_KEY).decrypt(data)) == {SESSION_KEY: "a"}
+
+        resp = client.get(url_for("has_session"))
+        assert resp.text == "a"
+
+        resp = client.delete(url_for("has_session"))
+        assert resp.text == MISSING
+        assert self.session_id(client) is None
+        assert store.sessions == {}
+
+    def test_lazy_loading(
+        self, client: FlaskClient, store: MemorySessionStore, mocker: MockFixture
+    ) -> None:
+        client.post(url_for("has_session", **{ARG_KEY: "a"}))  # type: ignore[arg-type]
+        load = mocker.spy(store, "load")
+        touch = mocker.spy(store, "touch")
+
+        resp = client.get(url_for("no_session"))
+        assert "Set-Cookie" not in resp.headers
+        assert "Cookie" not in resp.vary
+        load.assert_not_called()
+        touch.assert_called_once()
+
+        client.get(url_for("has_session"))
+        load.assert_called_once()
+
+    def test_unchanged_session_is_not_saved(
+        self, client: FlaskClient, store: MemorySessionStore, mocker: MockFixture
+    ) -> None:
+        client.post(url_for("permanent", **{ARG_KEY: "a"}))  # type: ignore[arg-type]
+        sid = self.session_id(client)
+        save = mocker.spy(store, "save")
+
+        resp = client.get(url_for("has_session"))
+        assert resp.text == "a"
+        save.assert_not_called()
+        assert self.session_id(client) == sid
+
+        # changed without marking the session as modified
+        client.post(url_for("append", **{ARG_KEY: "b"}))  # type: ignore[arg-type]
+        save.assert_called_once()
+        with client.session_transaction() as sess:
+            assert sess[LIST_KEY] == ["b"]
+
+    def test_changed_session_gets_new_id(
+        self, client: FlaskClient, store: MemorySessionStore
+    ) -> None:
+        client.post(url_for("has_session", **{ARG_KEY: "a"}))  # type: ignore[arg-type]
+        old_sid = self.session_id(client)
+        assert old_sid is not None
+
+        client.post(url_for("has_session", **{ARG_KEY: "b"}))  # type: ignore[arg-type]
+        new_sid = self.session_id(client)
+        assert new_sid != old_sid
+        # requests sent with the old ID still work for a little while
+        assert store.sessions[old_sid][1] <= datetime.now(timezone.utc) + ROTATION_GRACE
+
+        client.set_cookie("session", "not a session ID", domain="localhost.tld")
+        resp = client.get(url_for("has_session"))
+        assert resp.text == MISSING
+
 
 class TestNoSessionEnabled(Fixtures):
     HAS_SESSION_KEY = False
@@ -0,0 +1,144 @@
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+import pytest
+from flask import Flask, url_for
+from flask.testing import FlaskClient
+from pytest_mock import MockFixture
+
+from hushline.db import db
+from hushline.model import ServerSession, User
+from hushline.secure_session import ServerSideSessionInterface
+from hushline.session_store import DatabaseSessionStore, MemorySessionStore, SessionStore
+
+
+@pytest.fixture(params=["memory", "database"])
+def store(request: pytest.FixtureRequest, app: Flask) -> SessionStore:
+    if request.param == "memory":
+        return MemorySessionStore(touch_interval=3600)
+    return DatabaseSessionStore(touch_interval=3600)
+
+
+def from_now(seconds: int) -> datetime:
+    return datetime.now(timezone.utc) + timedelta(seconds=seconds)
+
+
+def test_save_load_delete(store: SessionStore) -> None:
+    assert store.load("a") is None
+
+    store.save("a", b"data", from_now(60))
+    assert store.load("a") == b"data"
+
+    store.save("a", b"new data", from_now(60))
+    assert store.load("a") == b"new data"
+
+    store.delete("a")
+    assert store.load("a") is None
+
+
+def test_expired_sessions_are_not_loaded(store: SessionStore) -> None:
+    store.save("a", b"data", from_now(-1))
+    assert store.load("a") is None
+
+    store.save("b", b"data", from_now(60))
+    store.expire("b", from_now(-1))
+    assert store.load("b") is None
+
+    # expiring only ever shortens a session
+    store.save("c", b"data", from_now(60))
+    store.expire("c", from_now(3600))
+    store.expire("c", from_now(-1))
+    assert store.load("c") is None
+
+
+def test_touches_are_batched(store: SessionStore) -> None:
+    store.save("a", b"data", from_now(-1))
+    store.touch("a", from_now(60))
+
+    # not written until the interval has passed, but already used by this process
+    assert (stored := store._get("a")) is not None
+    assert stored[1] < from_now(0)
+    assert store.load("a") == b"data"
+
+    store.flush()
+    assert (stored := store._get("a")) is not None
+    assert stored[1] > from_now(0)
+
+    # written right away without an interval, and never shortens the session
+    store.touch_interval = 0
+    store.touch("a", from_now(-1))
+    assert store._pending == {}
+    assert store.load("a") == b"data"
+
+
+def test_sweep(store: SessionStore) -> None:
+    store.save("a", b"data", from_now(-1))
+    store.save("b", b"data", from_now(60))
+    assert store.sweep() == 1
+    assert store.sweep() == 0
+    assert store.load("b") == b"data"
+
+
+@pytest.fixture()
+def env_var_modifier() -> Callable[[MockFixture], None]:
+    def modifier(mocker: MockFixture) -> None:
+        mocker.patch.dict("os.environ", {"SESSION_BACKEND": "database"})
+
+    return modifier
+
+
+def test_database_sessions(app: Flask, client: FlaskClient, user: User, user_password: str) -> None:
+    assert isinstance(app.session_interface, ServerSideSessionInterface)
+
+    resp = client.post(
+        url_for("login"),
+        data={"username": user.primary_username.username, "password": user_password},
+    )
+    assert resp.status_code == 302
+    cookie = client.get_cookie(app.config["SESSION_COOKIE_NAME"], domain="localhost")
+    assert cookie is not None
+    # only the session's ID is in the cookie
+    assert len(cookie.value) == 43
+    assert db.session.get(ServerSession, cookie.value) is not None
+
+    resp = client.get(url_for("inbox"))
+    assert resp.status_code == 200
+
+    resp = client.get(url_for("logout"), follow_redirects=True)
+    assert "You have been logged out successfully" in resp.text
+    # the logged in session is gone, the new one only holds the flash
+    db.session.expire_all()
+    assert db.session.get(ServerSession, cookie.value) is None
+
+    resp = client.get(url_for("inbox"))
+    assert resp.status_code == 302
+
+
+def test_anonymous_requests_dont_load_the_session(
+    app: Flask, client: FlaskClient, user: User, mocker: MockFixture
+) -> None:
+    assert isinstance(app.session_interface, ServerSideSessionInterface)
+    load = mocker.spy(app.session_interface.store, "load")
+    save = mocker.spy(app.session_interface.store, "save")
+    profile_url = url_for("profile", username=user.primary_username.username)
+
+    # viewing a profile starts a session for its CAPTCHA ...
+    resp = client.get(profile_url)
+    assert resp.status_code == 200
+    cookie = client.get_cookie(app.config["SESSION_COOKIE_NAME"], domain="localhost")
+    assert cookie is not None
+    assert save.call_count == 1
+
+    # ... which isn't changed by viewing it again
+    resp = client.get(profile_url)
+    assert resp.status_code == 200
+    assert save.call_count == 1
+    assert load.call_count == 1
+    new_cookie = client.get_cookie(app.config["SESSION_COOKIE_NAME"], domain="localhost")
+    assert new_cookie is not None
+    assert new_cookie.value == cookie.value
+
+    # requests that don't use the session don't load it
+    resp = client.get(url_for("health"))
+    assert resp.status_code == 200
+    assert load.call_count == 1
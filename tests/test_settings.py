@@ -1,12 +1,15 @@
 from base64 import b64decode
 from io import BytesIO
+from typing import Callable
 from unittest.mock import ANY, MagicMock, patch
 from uuid import uuid4
 
 import pytest
+from aiohttp import web
 from bs4 import BeautifulSoup
 from flask import Flask, url_for
 from flask.testing import FlaskClient
+from pytest_mock import MockFixture
 
 from hushline.config import AliasMode, FieldsMode
 from hushline.db import db
@@ -26,6 +29,7 @@ from hushline.settings import (
     EmailForwardingForm,
     NewAliasForm,
     PGPKeyForm,
+    PGPProtonForm,
     SetHomepageUsernameForm,
     UpdateBrandAppNameForm,
     UpdateBrandLogoForm,
@@ -38,6 +42,7 @@ from hushline.settings import (
     UserGuidancePromptContentForm,
 )
 from hushline.settings.branding import ToggleDonateButtonForm
+from hushline.settings.notifications import ToggleDigestForm
 from tests.helpers import form_to_data
 
 
@@ -189,6 +194,41 @@ def test_add_pgp_key(client: FlaskClient, user: User, user_password: str) -> Non
     assert updated_user.user.pgp_key == new_pgp_key
 
 
+@pytest.mark.usefixtures("_authenticated_user")
+def test_add_pgp_key_from_proton(
+    client: FlaskClient,
+    user: User,
+    mocker: MockFixture,
+    http_server: Callable[[web.Application], str],
+) -> None:
+    with open("tests/test_pgp_key.txt") as file:
+        pgp_key = file.read()
+
+    async def lookup(request: web.Request) -> web.Response:
+        if request.query == {"op": "get", "search": "user+tag@proton.me"}:
+            return web.Response(text=pgp_key)
+        return web.Response(status=404)
+
+    server_app = web.Application()
+    server_app.router.add_get("/pks/lookup", lookup)
+    mocker.patch("hushline.settings.proton.PROTON_PKS_URL", http_server(server_app) + "pks/lookup")
+    not_proton = form_to_data(PGPProtonForm(data={"email": "someone@example.com"}))
+    proton = form_to_data(PGPProtonForm(data={"email": "user+tag@proton.me"}))
+
+    response = client.post(
+        url_for("settings.update_pgp_key_proton"), data=not_proton, follow_redirects=True
+    )
+    assert "This isn&#39;t a Proton Mail email address" in response.text
+    assert user.pgp_key is None
+
+    response = client.post(
+        url_for("settings.update_pgp_key_proton"), data=proton, follow_redirects=True
+    )
+    assert "PGP key updated successfully" in response.text
+    db.session.refresh(user)
+    assert user.pgp_key == pgp_key
+
+
 @pytest.mark.usefixtures("_authenticated_user")
 def test_add_invalid_pgp_key(client: FlaskClient, user: User) -> None:
     invalid_pgp_key = "NOT A VALID PGP KEY BLOCK"
@@ -207,6 +247,32 @@ def test_add_invalid_pgp_key(client: FlaskClient, user: User) -> None:
     assert updated_user.user.pgp_key != invalid_pgp_key
 
 
+@pytest.mark.usefixtures("_authenticated_user")
+def test_toggle_digest(client: FlaskClient, user: User) -> None:
+    user.enable_email_notifications = True
+    db.session.commit()
+
+    resp = client.post(
+        url_for("settings.notifications"),
+        data={"digest": True, ToggleDigestForm.submit.name: ""},
+        follow_redirects=True,
+    )
+    assert resp.status_code == 200
+    assert "New message notifications will be sent as a digest" in resp.text, resp.text
+    db.session.refresh(user)
+    assert user.email_digest_enabled
+
+    resp = client.post(
+        url_for("settings.notifications"),
+        data={ToggleDigestForm.submit.name: ""},
+        follow_redirects=True,
+    )
+    assert resp.status_code == 200
+    assert "A notification will be sent for every new message" in resp.text, resp.text
+    db.session.refresh(user)
+    assert not user.email_digest_enabled
+
+
 @pytest.mark.usefixtures("_authenticated_user")
 @patch("hushline.email.smtplib.SMTP")
 def test_update_smtp_settings_no_pgp(SMTP: MagicMock, client: FlaskClient, user: User) -> None:
@@ -0,0 +1,46 @@
+from pytest_mock import MockFixture
+
+from hushline.crypto import decrypt_field as decrypt_field_orig
+from hushline.crypto import encrypt_field
+from hushline.db import db
+from hushline.model import User
+
+
+def test_decrypted_values_are_cached(mocker: MockFixture, user: User) -> None:
+    user.email = "test@example.com"
+    user.smtp_server = "smtp.example.com"
+    db.session.commit()
+
+    decrypt_field = mocker.patch("hushline.model.user.decrypt_field", wraps=decrypt_field_orig)
+    db.session.expire_all()
+    user.__dict__.pop("_decrypted_value_cache", None)
+
+    for _ in range(3):
+        assert user.email == "test@example.com"
+        assert user.smtp_server == "smtp.example.com"
+    assert decrypt_field.call_count == 2
+
+
+def test_setter_invalidates_cache(user: User) -> None:
+    user.email = "old@example.com"
+    assert user.email == "old@example.com"
+
+    user.email = "new@example.com"
+    assert user.email == "new@example.com"
+
+    user.email = None
+    assert user.email is None
+
+    user.pgp_key = "key"
+    db.session.commit()
+    user.pgp_key = None
+    db.session.commit()
+    assert user.pgp_key is None
+
+
+def test_cache_invalidated_by_column_change(user: User) -> None:
+    user.smtp_username = "first"
+    assert user.smtp_username == "first"
+
+    user._smtp_username = encrypt_field("second")
+    assert user.smtp_username == "second"
@@ -1,20 +1,35 @@
+import asyncio
 import multiprocessing
 import socket
 import time
 import traceback
 import urllib.parse
-from typing import Generator
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncGenerator, Awaitable, Callable, Generator
+from unittest.mock import ANY
 
 import aiohttp
 import pytest
 import requests
+from aiohttp import web
+from aiohttp.test_utils import TestServer
 from flask import Flask, request, url_for
 from flask.testing import FlaskClient
 from markupsafe import Markup
+from pytest_mock import MockFixture
 
+from hushline import verification
 from hushline.db import db
-from hushline.model import User
-from hushline.settings.common import create_profile_forms, verify_url
+from hushline.model import UrlVerification, User, VerifiedLink
+from hushline.settings.common import create_profile_forms
+from hushline.verification import (
+    RECHECK_INTERVAL,
+    RelMeParser,
+    process_batch,
+    recheck_batch,
+    verify_url,
+)
 from tests.helpers import form_to_data
 
 app = Flask(__name__)
@@ -61,6 +76,12 @@ def await_verification_app(port: int) -> None:
     raise Exception("App could not be reached")
 
 
+async def run_worker() -> None:
+    async with aiohttp.ClientSession() as sess:
+        while await process_batch(sess):
+            pass
+
+
 @pytest.mark.local_only()
 @pytest.fixture(scope="module")
 def verification_server() -> Generator[int, None, None]:
@@ -81,35 +102,23 @@ def verification_server() -> Generator[int, None, None]:
 @pytest.mark.asyncio()
 async def test_verify_url(user: User, verification_server: int) -> None:
     username = user.primary_username
-    assert username.extra_field_verified1 is False  # precondition
-
     profile_url = url_for("profile", username=username.username, _external=True)
     encoded_url = urllib.parse.quote(profile_url)
     url_to_verify = f"http://{HOSTNAME}:{verification_server}/?profile={encoded_url}"
 
     async with aiohttp.ClientSession() as sess:
-        await verify_url(sess, username, 1, url_to_verify, profile_url)
-    db.session.commit()
-
-    db.session.refresh(username)
-    assert username.extra_field_verified1 is True
+        assert await verify_url(sess, url_to_verify, profile_url)
 
 
 @pytest.mark.local_only()
 @pytest.mark.asyncio()
 async def test_verify_url_fail(user: User, verification_server: int) -> None:
     username = user.primary_username
-    username.extra_field_verified1 = True
-
     profile_url = url_for("profile", username=username.username, _external=True)
     url_to_verify = f"http://{HOSTNAME}:{verification_server}/"
 
     async with aiohttp.ClientSession() as sess:
-        await verify_url(sess, username, 1, url_to_verify, profile_url)
-    db.session.commit()
-
-    db.session.refresh(username)
-    assert username.extra_field_verified1 is False
+        assert not await verify_url(sess, url_to_verify, profile_url)
 
 
 @pytest.mark.local_only()
@@ -132,7 +141,9 @@ def test_verify_url_request(client: FlaskClient, user: User, verification_server
     )
     assert resp.status_code == 200
     assert "Bio and fields updated successfully" in resp.text, resp.text
+    assert "Verifying…" in resp.text
 
+    asyncio.run(run_worker())
     db.session.refresh(user.primary_username)
     assert user.primary_username.extra_field_label1 == label
     assert user.primary_username.extra_field_value1 == value
@@ -160,7 +171,355 @@ def test_verify_url_request_fail(client: FlaskClient, user: User, verification_s
     assert resp.status_code == 200
     assert "Bio and fields updated successfully" in resp.text
 
+    asyncio.run(run_worker())
     db.session.refresh(user.primary_username)
     assert user.primary_username.extra_field_label1 == label
     assert user.primary_username.extra_field_value1 == value
     assert user.primary_username.extra_field_verified1 is False
+
+
+PROFILE_URL = "https://hushline.example/to/someone"
+
+Handler = Callable[[web.Request], Awaitable[web.StreamResponse]]
+
+
+def rel_me_page(profile_url: str = PROFILE_URL, rel: str = "me") -> str:
+    return (
+        f'<html><body><a href="/">home</a><a rel="{rel}" href="{profile_url}">me</a></body></html>'
+    )
+
+
+def test_rel_me_parser() -> None:
+    page = rel_me_page(rel="nofollow me")
+    parser = RelMeParser(PROFILE_URL)
+    # fed in pieces, as the page is streamed
+    for i in range(0, len(page), 7):
+        parser.feed(page[i : i + 7])
+    assert parser.found
+
+    for page in [rel_me_page(rel="nofollow"), rel_me_page(profile_url=PROFILE_URL + "/other")]:
+        parser = RelMeParser(PROFILE_URL)
+        parser.feed(page)
+        assert not parser.found
+
+
+@asynccontextmanager
+async def page_server(handler: Handler) -> AsyncGenerator[str, None]:
+    server_app = web.Application()
+    server_app.router.add_get("/", handler)
+    async with TestServer(server_app) as server:
+        yield str(server.make_url("/"))
+
+
+async def verify_page(handler: Handler) -> bool:
+    async with page_server(handler) as url, aiohttp.ClientSession() as sess:
+        return await verify_url(sess, url, PROFILE_URL)
+
+
+@pytest.mark.asyncio()
+@pytest.mark.usefixtures("app")
+async def test_verify_url_pages() -> None:
+    async def linked(request: web.Request) -> web.Response:
+        return web.Response(text=rel_me_page(), content_type="text/html")
+
+    async def not_linked(request: web.Request) -> web.Response:
+        return web.Response(text=rel_me_page(rel="nofollow"), content_type="text/html")
+
+    async def not_found(request: web.Request) -> web.Response:
+        return web.Response(text=rel_me_page(), content_type="text/html", status=404)
+
+    async def link_after_cap(request: web.Request) -> web.Response:
+        padding = "<p>" + "x" * verification.MAX_PAGE_BYTES + "</p>"
+        return web.Response(text=padding + rel_me_page(), content_type="text/html")
+
+    async def base64_charset(request: web.Request) -> web.Response:
+        return web.Response(
+            body=rel_me_page().encode(), headers={"Content-Type": "text/html; charset=base64"}
+        )
+
+    async def utf16_without_bom(request: web.Request) -> web.Response:
+        return web.Response(
+            body=rel_me_page().encode("utf-16-le"),
+            headers={"Content-Type": "text/html; charset=utf-16"},
+        )
+
+    async def malformed(request: web.Request) -> web.Response:
+        return web.Response(text="<![foo[ x ]]>" + rel_me_page(), content_type="text/html")
+
+    assert await verify_page(linked)
+    # charsets that aren't text encodings are ignored
+    assert await verify_page(base64_charset)
+    assert not await verify_page(utf16_without_bom)
+    assert not await verify_page(malformed)
+    assert not await verify_page(not_linked)
+    assert not await verify_page(not_found)
+    assert not await verify_page(link_after_cap)
+
+
+@pytest.mark.asyncio()
+@pytest.mark.usefixtures("app")
+async def test_verify_url_stops_at_link() -> None:
+    async def endless(request: web.Request) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "text/html"})
+        await response.prepare(request)
+        await response.write(rel_me_page().encode())
+        # the rest of the page never arrives
+        await asyncio.sleep(60)
+        return response
+
+    assert await asyncio.wait_for(verify_page(endless), timeout=2)
+
+
+@pytest.mark.usefixtures("_authenticated_user")
+def test_update_bio_queues_verification(client: FlaskClient, user: User) -> None:
+    username = user.primary_username
+    username.extra_field_verified1 = True
+    db.session.commit()
+
+    _, _, profile_form = create_profile_forms(username)
+    profile_form.extra_field_label1.data = "Website"
+    profile_form.extra_field_value1.data = "https://example.com/"
+    profile_form.extra_field_label2.data = "Signal"
+    profile_form.extra_field_value2.data = "signaluser.123"
+
+    for _ in range(2):
+        resp = client.post(
+            url_for("settings.profile"), data=form_to_data(profile_form), follow_redirects=True
+        )
+        assert resp.status_code == 200
+        assert "Bio and fields updated successfully" in resp.text
+        assert "Verifying…" in resp.text
+
+    db.session.refresh(username)
+    assert username.extra_field_verified1 is False
+    # saving again replaced the queued verification
+    (job,) = db.session.scalars(db.select(UrlVerification)).all()
+    assert (job.username_id, job.field_index, job.url) == (username.id, 1, "https://example.com/")
+    assert job.profile_url == url_for("profile", username=username.username, _external=True)
+
+
+@pytest.mark.asyncio()
+async def test_process_batch(user: User, mocker: MockFixture) -> None:
+    username = user.primary_username
+    username.extra_field_value1 = "https://example.com/1"
+    username.extra_field_value2 = "https://example.com/2"
+    verification.enqueue_verification(username, 1, username.extra_field_value1, PROFILE_URL)
+    verification.enqueue_verification(username, 2, "https://example.com/changed", PROFILE_URL)
+    db.session.commit()
+    assert verification.pending_fields(username) == {1, 2}
+
+    verify = mocker.patch(
+        "hushline.verification.verify_url",
+        side_effect=lambda session, url, profile_url: url == "https://example.com/1",
+    )
+    async with aiohttp.ClientSession() as sess:
+        assert await process_batch(sess)
+        assert not await process_batch(sess)
+
+    db.session.refresh(username)
+    assert username.extra_field_verified1 is True
+    # the link was changed after it was queued
+    assert username.extra_field_verified2 is False
+    assert verification.pending_fields(username) == set()
+    assert verify.call_count == 2
+    # the verified link will be checked again
+    (link,) = db.session.scalars(db.select(VerifiedLink)).all()
+    assert (link.field_index, link.url, link.host) == (1, "https://example.com/1", "example.com")
+
+    # links that verified are cached, ones that didn't are fetched again
+    verification.enqueue_verification(username, 1, username.extra_field_value1, PROFILE_URL)
+    verification.enqueue_verification(username, 2, "https://example.com/changed", PROFILE_URL)
+    db.session.commit()
+    async with aiohttp.ClientSession() as sess:
+        assert await process_batch(sess)
+    assert verify.call_count == 3
+    verify.assert_called_with(ANY, "https://example.com/changed", PROFILE_URL)
+
+
+class ProfilePage:
+    """A page linking back to the profile, with an ETag"""
+
+    def __init__(self) -> None:
+        self.profile_url = PROFILE_URL
+        self.etag = '"v1"'
+        self.status: int | None = None
+        self.responses: list[int] = []
+        self.app = web.Application()
+        self.app.router.add_get("/", self.handle)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if self.status is not None:
+            response = web.Response(status=self.status)
+        elif request.headers.get("If-None-Match") == self.etag:
+            response = web.Response(status=304)
+        else:
+            response = web.Response(
+                text=rel_me_page(self.profile_url),
+                content_type="text/html",
+                headers={"ETag": self.etag},
+            )
+        self.responses.append(response.status)
+        return response
+
+
+async def verify_links(user: User, urls: list[str]) -> list[VerifiedLink]:
+    username = user.primary_username
+    for i, url in enumerate(urls, 1):
+        setattr(username, f"extra_field_value{i}", url)
+        verification.enqueue_verification(username, i, url, PROFILE_URL)
+    db.session.commit()
+    async with aiohttp.ClientSession() as sess:
+        assert await process_batch(sess)
+    return list(db.session.scalars(db.select(VerifiedLink).order_by(VerifiedLink.field_index)))
+
+
+def make_due(*links: VerifiedLink) -> None:
+    for link in links:
+        link.checked_at = datetime.now(timezone.utc) - RECHECK_INTERVAL
+    db.session.commit()
+
+
+@pytest.mark.asyncio()
+async def test_recheck_batch(user: User, http_server: Callable[[web.Application], str]) -> None:
+    page = ProfilePage()
+    (link,) = await verify_links(user, [http_server(page.app)])
+    assert user.primary_username.extra_field_verified1 is True
+
+    async with aiohttp.ClientSession() as sess:
+        # not due yet
+        assert await recheck_batch(sess) == 0
+
+        make_due(link)
+        assert await recheck_batch(sess) == 1
+        assert link.etag == page.etag
+        assert link.checked_at > datetime.now(timezone.utc) - RECHECK_INTERVAL
+
+        # unchanged pages aren't sent again
+        make_due(link)
+        assert await recheck_batch(sess) == 1
+        assert page.responses == [200, 200, 304]
+
+        # the link back was removed
+        page.profile_url, page.etag = "https://elsewhere.example/", '"v2"'
+        make_due(link)
+        assert await recheck_batch(sess) == 1
+
+    db.session.refresh(user.primary_username)
+    assert user.primary_username.extra_field_verified1 is False
+    assert db.session.scalars(db.select(VerifiedLink)).all() == []
+
+
+@pytest.mark.asyncio()
+async def test_recheck_failures(user: User, http_server: Callable[[web.Application], str]) -> None:
+    page = ProfilePage()
+    (link,) = await verify_links(user, [http_server(page.app)])
+
+    page.status = 503
+    async with aiohttp.ClientSession() as sess:
+        for failures in range(1, verification.MAX_RECHECK_FAILURES):
+            make_due(link)
+            assert await recheck_batch(sess) == 1
+            assert link.failures == failures
+            db.session.refresh(user.primary_username)
+            assert user.primary_username.extra_field_verified1 is True
+            # tried again after a delay, not a whole interval
+            retry_delay = verification.RECHECK_RETRY_DELAY * 2 ** (failures - 1)
+            due_at = link.checked_at + RECHECK_INTERVAL
+            assert abs(due_at - datetime.now(timezone.utc) - retry_delay) < timedelta(minutes=1)
+
+        make_due(link)
+        assert await recheck_batch(sess) == 1
+
+    db.session.refresh(user.primary_username)
+    assert user.primary_username.extra_field_verified1 is False
+
+
+@pytest.mark.asyncio()
+async def test_recheck_exception(
+    user: User, mocker: MockFixture, http_server: Callable[[web.Application], str]
+) -> None:
+    url = http_server(ProfilePage().app)
+    broken_url = url.replace("127.0.0.1", "localhost")
+    link, broken_link = await verify_links(user, [url, broken_url])
+    assert broken_link.host == "localhost"
+    make_due(link, broken_link)
+
+    check_link = verification.check_link
+
+    async def check_or_raise(
+        session: aiohttp.ClientSession, url: str, profile_url: str, *validators: Any
+    ) -> verification.LinkCheck:
+        if url == broken_url:
+            raise RuntimeError("broken")
+        return await check_link(session, url, profile_url, *validators)
+
+    mocker.patch("hushline.verification.check_link", side_effect=check_or_raise)
+    async with aiohttp.ClientSession() as sess:
+        assert await recheck_batch(sess) == 2
+
+    # counted as a failure to fetch the page
+    assert (link.failures, broken_link.failures) == (0, 1)
+    db.session.refresh(user.primary_username)
+    assert user.primary_username.extra_field_verified2 is True
+
+
+@pytest.mark.asyncio()
+async def test_recheck_per_host(
+    user: User, mocker: MockFixture, http_server: Callable[[web.Application], str]
+) -> None:
+    mocker.patch("hushline.verification.HOST_DELAY", 0)
+    url = http_server(ProfilePage().app)
+    links = await verify_links(user, [f"{url}?field={i}" for i in range(1, 4)])
+    make_due(*links)
+
+    async with aiohttp.ClientSession() as sess:
+        assert await recheck_batch(sess) == verification.RECHECK_PER_HOST
+        assert await recheck_batch(sess) == 1
+        assert await recheck_batch(sess) == 0
+
+
+@pytest.mark.asyncio()
+async def test_recheck_after_changes(
+    user: User, mocker: MockFixture, http_server: Callable[[web.Application], str]
+) -> None:
+    mocker.patch("hushline.verification.HOST_DELAY", 0)
+    page = ProfilePage()
+    link_1, link_2 = await verify_links(user, [http_server(page.app), http_server(page.app)])
+    username = user.primary_username
+
+    # changing the username makes the links link to the wrong profile
+    verification.profile_url_changed(username, "https://hushline.example/to/renamed")
+    db.session.commit()
+    assert link_1.profile_url == "https://hushline.example/to/renamed"
+
+    # ... but the second link was changed while it was being checked
+    username.extra_field_value2 = "https://example.com/"
+    db.session.commit()
+
+    async with aiohttp.ClientSession() as sess:
+        assert await recheck_batch(sess) == 2
+
+    db.session.refresh(username)
+    assert username.extra_field_verified1 is False
+    assert username.extra_field_verified2 is True
+
+    # neither link verifies any more, so they aren't checked again
+    assert db.session.scalars(db.select(VerifiedLink)).all() == []
+
+
+@pytest.mark.asyncio()
+async def test_discard_pending_drops_rechecks(
+    user: User, http_server: Callable[[web.Application], str]
+) -> None:
+    link_1, link_2 = await verify_links(
+        user, [http_server(ProfilePage().app), http_server(ProfilePage().app)]
+    )
+
+    # the worker is checking the first link again
+    with db.engine.connect() as conn:
+        conn.execute(db.select(VerifiedLink).filter_by(id=link_1.id).with_for_update())
+        db.session.execute(db.text("SET LOCAL lock_timeout = '1s'"))
+        verification.discard_pending(user.primary_username)
+        db.session.commit()
+
+    assert db.session.scalars(db.select(VerifiedLink.id)).all() == [link_1.id]